@@ -0,0 +1,4 @@
+
+from .stubs import BenchmarkRecorder, StubMonitor, StubHandler, StubConductor
+from .runner_benchmark import run_scenario, run_benchmarks, compare_results, \
+    read_results, write_results
@@ -0,0 +1,81 @@
+
+"""
+This file allows the MeowRunner benchmarks to be run from the command line,
+using 'python -m meow_base.benchmarks'. Results are printed, optionally
+written to a file, and compared against a baseline, which is the one kept
+alongside the benchmarks unless another is given. The exit code is 1 if any
+regressions against the baseline are found.
+
+Author(s): David Marchant
+"""
+import argparse
+import json
+import sys
+
+from meow_base.benchmarks.runner_benchmark import run_benchmarks, \
+    compare_results, read_results, write_results, DEFAULT_RATE, \
+    DEFAULT_EVENTS, DEFAULT_QUEUE_SIZES, DEFAULT_COMPONENT_COUNTS, \
+    DEFAULT_TIMEOUT, DEFAULT_TOLERANCE, DEFAULT_BASELINE
+
+
+def main(args:list=None)->int:
+    parser = argparse.ArgumentParser(
+        prog="python -m meow_base.benchmarks",
+        description="Benchmark MeowRunner event and job dispatch."
+    )
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+        help="events sent per second")
+    parser.add_argument("--events", type=int, default=DEFAULT_EVENTS,
+        help="events sent per scenario")
+    parser.add_argument("--queue-sizes", type=int, nargs="+",
+        default=DEFAULT_QUEUE_SIZES,
+        help="events already queued when each scenario starts")
+    parser.add_argument("--components", type=int, nargs="+",
+        default=DEFAULT_COMPONENT_COUNTS,
+        help="numbers of handlers and conductors")
+    parser.add_argument("--poll", action="store_true",
+        help="use polling rather than push dispatch")
+    parser.add_argument("--no-saturate", action="store_true",
+        help="do not also run each scenario with a saturated monitor")
+    parser.add_argument("--batch-size", type=int, default=1,
+        help="most events sent by the monitor at once")
+    parser.add_argument("--no-trace-memory", action="store_true",
+        help="do not trace peak memory, which slows the runner")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+        help="seconds to wait for each scenario to finish")
+    parser.add_argument("--output", help="file to write results to")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+        help="results file to compare against")
+    parser.add_argument("--no-baseline", action="store_true",
+        help="do not compare results against a baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+        help="fraction a result may be worse than its baseline")
+    parsed = parser.parse_args(args)
+
+    results = run_benchmarks(
+        rate=parsed.rate,
+        events=parsed.events,
+        queue_sizes=parsed.queue_sizes,
+        component_counts=parsed.components,
+        push_dispatch=not parsed.poll,
+        trace_memory=not parsed.no_trace_memory,
+        timeout=parsed.timeout,
+        batch_size=parsed.batch_size,
+        saturate=not parsed.no_saturate
+    )
+
+    if parsed.output:
+        write_results(results, parsed.output)
+    print(json.dumps(results["results"], indent=2))
+
+    if parsed.baseline and not parsed.no_baseline:
+        regressions = compare_results(results, read_results(parsed.baseline),
+            tolerance=parsed.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
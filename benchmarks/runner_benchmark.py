@@ -0,0 +1,295 @@
+
+"""
+This file contains functions to benchmark how quickly a MeowRunner dispatches
+events and jobs, using the stub components. Results are written as JSON, so
+that they can be compared against those of a previous run to catch any
+regressions, such as the baseline kept alongside this file.
+
+Author(s): David Marchant
+"""
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+
+from time import time
+from typing import Any, Dict, List, Union
+
+from meow_base.benchmarks.stubs import BenchmarkRecorder, StubMonitor, \
+    StubHandler, StubConductor
+from meow_base.core.runner import MeowRunner
+from meow_base.functionality.file_io import make_dir, rmtree
+from meow_base.functionality.validation import check_type, valid_natural
+from meow_base.patterns.file_event_pattern import FileEventPattern
+from meow_base.recipes.python_recipe import PythonRecipe
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Default scenario dimensions. The rate is kept below the throughput of a 
+# saturated runner, so that latencies are not dominated by queueing
+DEFAULT_RATE = 20
+DEFAULT_EVENTS = 500
+DEFAULT_QUEUE_SIZES = [0, 1000]
+DEFAULT_COMPONENT_COUNTS = [1, 4]
+
+# Time to wait for every job to be dispatched before giving up, in seconds
+DEFAULT_TIMEOUT = 120
+
+# Fraction by which a result may be worse than its baseline before it is
+# reported as a regression
+DEFAULT_TOLERANCE = 0.3
+
+# Smallest increase in latency reported as a regression, in seconds, as 
+# latencies far below this vary by more than any tolerance between runs
+MIN_LATENCY_REGRESSION = 0.05
+
+# Results of the default benchmarks, compared against unless another baseline
+# is given
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Suffix of the names of scenarios run with a saturated monitor
+SATURATED_SUFFIX = "-saturated"
+
+# Result fields compared against a baseline, and if a higher value is better
+COMPARED_FIELDS = {
+    "throughput": True,
+    "latency_p50": False,
+    "latency_p99": False,
+    "peak_memory": False
+}
+
+# Result fields which must match for a result to be compared to a baseline
+MATCHED_FIELDS = ["rate", "events", "push_dispatch", "batch_size"]
+
+# Result fields compared for scenarios that are saturated or start with 
+# events already queued. Their latencies are mostly the time events spend 
+# queued behind those before them, so are not compared
+QUEUED_COMPARED_FIELDS = ["throughput", "peak_memory"]
+
+
+def get_scenario_name(queue_size:int, handlers:int, conductors:int, 
+        saturated:bool=False)->str:
+    name = f"queue_{queue_size}-handlers_{handlers}-conductors_{conductors}"
+    if saturated:
+        name += SATURATED_SUFFIX
+    return name
+
+def percentile(values:List[float], percent:float)->Union[float,None]:
+    """Function to get the value at the given percentile of a list of values,
+    using the nearest rank."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+def run_scenario(rate:float=DEFAULT_RATE, events:int=DEFAULT_EVENTS,
+        queue_size:int=0, handlers:int=1, conductors:int=1,
+        push_dispatch:bool=True, trace_memory:bool=True,
+        timeout:float=DEFAULT_TIMEOUT, work_dir:str=None,
+        batch_size:int=1)->Dict[str,Any]:
+    """Function to benchmark a single MeowRunner setup. queue_size events are
+    queued within the runner before it is started, after which a stub monitor
+    sends events at the given rate, or all at once if rate is None. The 
+    runner is stopped once a job has been dispatched for every event, or the 
+    timeout is reached. Throughput is the number of jobs completed by the 
+    conductors per second, so only measures the runner itself when the
+    monitor is saturated, as otherwise it cannot exceed the rate. Latency is
+    the time from an event being sent, to its job being given to a 
+    conductor, and is only measured for events sent by the monitor. If 
+    trace_memory is set, the peak memory allocated by Python during the run 
+    is also recorded, though this will slow the runner somewhat. Events are 
+    sent by the monitor in batches of up to batch_size."""
+    check_type(rate, float, alt_types=[int], or_none=True, 
+        hint="run_scenario.rate")
+    if rate is not None and rate <= 0:
+        raise ValueError(f"run_scenario.rate must be greater than 0. "
+            f"Got {rate}")
+    valid_natural(events, hint="run_scenario.events")
+    valid_natural(queue_size, hint="run_scenario.queue_size")
+    for count, hint in [(handlers, "handlers"), (conductors, "conductors")]:
+        valid_natural(count, hint=f"run_scenario.{hint}")
+        if count < 1:
+            raise ValueError(f"run_scenario.{hint} must be at least 1. "
+                f"Got {count}")
+    check_type(push_dispatch, bool, hint="run_scenario.push_dispatch")
+    check_type(trace_memory, bool, hint="run_scenario.trace_memory")
+
+    cleanup = work_dir is None
+    if cleanup:
+        work_dir = tempfile.mkdtemp(prefix="meow_benchmark_")
+    job_queue_dir = os.path.join(work_dir, "job_queue")
+    job_output_dir = os.path.join(work_dir, "job_output")
+    make_dir(job_queue_dir, ensure_clean=True)
+    make_dir(job_output_dir, ensure_clean=True)
+
+    pattern = FileEventPattern(
+        "benchmark_pattern", "*", "benchmark_recipe", "input")
+    recipe = PythonRecipe("benchmark_recipe", ["pass"])
+
+    recorder = BenchmarkRecorder(queue_size + events)
+    monitor = StubMonitor(
+        {pattern.name: pattern}, {recipe.name: recipe}, rate, events,
+        batch_size=batch_size)
+    runner = MeowRunner(
+        monitor,
+        [StubHandler(recorder) for _ in range(handlers)],
+        [StubConductor(recorder) for _ in range(conductors)],
+        job_queue_dir=job_queue_dir,
+        job_output_dir=job_output_dir,
+        push_dispatch=push_dispatch
+    )
+
+    try:
+        if trace_memory:
+            tracemalloc.start()
+
+        for i in range(queue_size):
+            runner._enqueue_event(monitor.create_benchmark_event(-i - 1))
+
+        start = time()
+        runner.start()
+        completed = recorder.done.wait(timeout)
+        runner.stop()
+        end = max(recorder.dispatched.values(), default=time())
+
+        peak_memory = None
+        if trace_memory:
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if cleanup:
+            rmtree(work_dir)
+
+    # Preloaded events were created before the runner started, so are
+    # excluded from the latencies
+    latencies = recorder.latencies(since=start)
+
+    dispatched = len(recorder.dispatched)
+    duration = end - start
+    return {
+        "rate": rate,
+        "saturated": rate is None,
+        "events": events,
+        "queue_size": queue_size,
+        "handlers": handlers,
+        "conductors": conductors,
+        "push_dispatch": push_dispatch,
+        "batch_size": batch_size,
+        "completed": completed,
+        "dispatched": dispatched,
+        "duration": duration,
+        "throughput": dispatched / duration if duration > 0 else None,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies, default=None),
+        "peak_memory": peak_memory,
+        "max_rss": _get_max_rss()
+    }
+
+def run_benchmarks(rate:float=DEFAULT_RATE, events:int=DEFAULT_EVENTS,
+        queue_sizes:List[int]=DEFAULT_QUEUE_SIZES,
+        component_counts:List[int]=DEFAULT_COMPONENT_COUNTS,
+        push_dispatch:bool=True, trace_memory:bool=True,
+        timeout:float=DEFAULT_TIMEOUT, batch_size:int=1, 
+        saturate:bool=True)->Dict[str,Any]:
+    """Function to run a scenario for every combination of queue size and
+    component count. Each component count is used for both the number of
+    handlers and the number of conductors. If saturate is set, each 
+    combination is also run with a saturated monitor, to measure throughput.
+    Results are keyed by scenario name, alongside some information on the 
+    system they were gathered on."""
+    check_type(saturate, bool, hint="run_benchmarks.saturate")
+    rates = [(rate, False)]
+    if saturate:
+        rates.append((None, True))
+    results = {}
+    for queue_size in queue_sizes:
+        for count in component_counts:
+            for scenario_rate, saturated in rates:
+                name = get_scenario_name(queue_size, count, count, 
+                    saturated=saturated)
+                results[name] = run_scenario(
+                    rate=scenario_rate,
+                    events=events,
+                    queue_size=queue_size,
+                    handlers=count,
+                    conductors=count,
+                    push_dispatch=push_dispatch,
+                    trace_memory=trace_memory,
+                    timeout=timeout,
+                    batch_size=batch_size
+                )
+    return {
+        "system": {
+            "python": sys.version,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count()
+        },
+        "time": time(),
+        "results": results
+    }
+
+def compare_results(results:Dict[str,Any], baseline:Dict[str,Any],
+        tolerance:float=DEFAULT_TOLERANCE)->List[str]:
+    """Function to compare benchmark results against a baseline, as produced
+    by run_benchmarks. A description of each regression is returned, being
+    any compared field worse than its baseline value by more than the given
+    fraction, or any scenario that did not dispatch all of its jobs. Only
+    throughput and memory are compared for scenarios that are saturated or
+    start with events already queued. Scenarios not within the baseline, or 
+    run with different settings to it, are ignored."""
+    check_type(tolerance, float, alt_types=[int],
+        hint="compare_results.tolerance")
+    regressions = []
+    for name, result in results["results"].items():
+        if name not in baseline["results"]:
+            continue
+        expected = baseline["results"][name]
+        if any(result.get(f) != expected.get(f) for f in MATCHED_FIELDS):
+            continue
+        if not result["completed"]:
+            regressions.append(f"{name}: only {result['dispatched']} jobs "
+                "were dispatched before timing out")
+        queued = result.get("saturated", False) \
+            or result.get("queue_size", 0) > 0
+        for field, higher_better in COMPARED_FIELDS.items():
+            if queued and field not in QUEUED_COMPARED_FIELDS:
+                continue
+            current, previous = result.get(field), expected.get(field)
+            if current is None or not previous:
+                continue
+            if higher_better:
+                worse = current < previous * (1 - tolerance)
+            else:
+                worse = current > previous * (1 + tolerance)
+                if field.startswith("latency"):
+                    worse = worse \
+                        and current - previous >= MIN_LATENCY_REGRESSION
+            if worse:
+                regressions.append(f"{name}: {field} was {current:.6g}, "
+                    f"compared to a baseline of {previous:.6g}")
+    return regressions
+
+def write_results(results:Dict[str,Any], filepath:str)->None:
+    with open(filepath, "w") as f:
+        json.dump(results, f, indent=2)
+
+def read_results(filepath:str)->Dict[str,Any]:
+    with open(filepath, "r") as f:
+        return json.load(f)
+
+def _get_max_rss()->Union[int,None]:
+    """Function to get the peak resident memory of this process so far, in
+    kilobytes. This is not available on all platforms."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
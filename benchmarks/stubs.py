@@ -0,0 +1,207 @@
+
+"""
+This file contains stub monitor, handler and conductor definitions, used to
+benchmark a MeowRunner. These do as little work of their own as possible, so
+that the time measured is that spent by the runner dispatching events and jobs
+between them.
+
+Author(s): David Marchant
+"""
+import os
+
+from threading import Event, Lock, Thread
+from time import time
+from typing import Any, Dict, List, Tuple
+
+from meow_base.core.base_conductor import BaseConductor
+from meow_base.core.base_handler import BaseHandler
+from meow_base.core.base_monitor import BaseMonitor
+from meow_base.core.base_pattern import BasePattern
+from meow_base.core.base_recipe import BaseRecipe
+from meow_base.core.rule import Rule
+from meow_base.core.vars import EVENT_TYPE, EVENT_TIME, JOB_ID, JOB_TYPE, \
+    META_FILE
+from meow_base.functionality.file_io import make_dir, threadsafe_write_status
+from meow_base.functionality.meow import create_event, \
+    create_job_metadata_dict
+from meow_base.functionality.validation import check_type, valid_natural
+from meow_base.patterns.file_event_pattern import FileEventPattern
+from meow_base.recipes.python_recipe import PythonRecipe
+
+# Event and job type used by the stub components
+EVENT_TYPE_BENCHMARK = "benchmark"
+JOB_TYPE_BENCHMARK = "benchmark"
+
+
+class BenchmarkRecorder:
+    # Time each event was created, keyed by the job directory created for it
+    created:Dict[str,float]
+    # Time each job was given to a conductor, keyed by job directory
+    dispatched:Dict[str,float]
+    # Set once the expected number of jobs have been dispatched
+    done:Event
+    # Number of jobs after which done is set
+    expected:int
+    # A lock to solve race conditions, as the recorder is shared between all
+    # stub handlers and conductors
+    _lock:Lock
+    def __init__(self, expected:int)->None:
+        """BenchmarkRecorder Constructor. This is shared by the stub handlers
+        and conductors of a benchmark, to record when each event was created
+        and when the resulting job was dispatched."""
+        valid_natural(expected, hint="BenchmarkRecorder.expected")
+        self.expected = expected
+        self.created = {}
+        self.dispatched = {}
+        self.done = Event()
+        self._lock = Lock()
+        if expected == 0:
+            self.done.set()
+
+    def job_created(self, job_dir:str, event_time:float)->None:
+        with self._lock:
+            self.created[job_dir] = event_time
+
+    def job_dispatched(self, job_dir:str)->None:
+        now = time()
+        with self._lock:
+            self.dispatched[job_dir] = now
+            if len(self.dispatched) >= self.expected:
+                self.done.set()
+
+    def latencies(self, since:float=0)->List[float]:
+        """Function to get the time between each event being created and its
+        job being dispatched, in seconds. Only events created at or after 
+        since are included."""
+        with self._lock:
+            return [self.dispatched[j] - self.created[j]
+                for j in self.dispatched 
+                if j in self.created and self.created[j] >= since]
+
+
+class StubMonitor(BaseMonitor):
+    # Number of events sent per second. If None, events are sent as fast as
+    # the runner will take them
+    rate:float
+    # Number of events sent in total
+    count:int
+    # The thread sending events, if one is running
+    _inject_thread:Thread
+    def __init__(self, patterns:Dict[str,BasePattern],
+            recipes:Dict[str,BaseRecipe], rate:float, count:int,
+            name:str="", batch_size:int=1)->None:
+        """StubMonitor Constructor. Once started, count events are sent to
+        the runner at the given rate, for the first rule of the monitor. If
+        rate is None, they are instead all sent straight away, so that the 
+        runner is saturated. No files are monitored."""
+        super().__init__(patterns, recipes, name=name, batch_size=batch_size)
+        check_type(rate, float, alt_types=[int], or_none=True, 
+            hint="StubMonitor.rate")
+        if rate is not None and rate <= 0:
+            raise ValueError(
+                f"StubMonitor.rate must be greater than 0. Got {rate}")
+        self.rate = rate
+        valid_natural(count, hint="StubMonitor.count")
+        self.count = count
+        self._stop_event = Event()
+        self._inject_thread = None
+
+    def get_rule(self)->Rule:
+        """Function to get the rule events are created for."""
+        return list(self._rules.values())[0]
+
+    def create_benchmark_event(self, index:int)->Dict[str,Any]:
+        return create_event(EVENT_TYPE_BENCHMARK, f"event_{index}",
+            self.get_rule(), time())
+
+    def start(self)->None:
+        self._stop_event.clear()
+        self._inject_thread = Thread(
+            target=self._inject,
+            daemon=True,
+            name="stub_monitor_thread"
+        )
+        self._inject_thread.start()
+
+    def stop(self)->None:
+        self._stop_event.set()
+        if self._inject_thread is not None:
+            self._inject_thread.join()
+            self._inject_thread = None
+        self.flush_events()
+
+    def _inject(self)->None:
+        """Function to send events on a fixed schedule. Each event is sent
+        at a time relative to the start, so that time spent sending does not
+        slow the overall rate. Without a rate, events are sent without 
+        waiting."""
+        start = time()
+        for i in range(self.count):
+            if self.rate is not None:
+                delay = start + i / self.rate - time()
+                if delay > 0 and self._stop_event.wait(delay):
+                    return
+            if self._stop_event.is_set():
+                return
+            self.send_event_to_runner(self.create_benchmark_event(i))
+
+    def _get_valid_pattern_types(self)->List[type]:
+        return [FileEventPattern]
+
+    def _get_valid_recipe_types(self)->List[type]:
+        return [PythonRecipe]
+
+
+class StubHandler(BaseHandler):
+    # Recorder shared with the other stub components
+    recorder:BenchmarkRecorder
+    def __init__(self, recorder:BenchmarkRecorder, name:str="",
+            pause_time:int=1)->None:
+        """StubHandler Constructor. Each event is turned into a job directory
+        containing only a metadata file, which is then sent to the runner."""
+        super().__init__(name=name, pause_time=pause_time)
+        check_type(recorder, BenchmarkRecorder,
+            hint="StubHandler.recorder")
+        self.recorder = recorder
+
+    def valid_handle_criteria(self, event:Dict[str,Any])->Tuple[bool,str]:
+        if event[EVENT_TYPE] == EVENT_TYPE_BENCHMARK:
+            return True, ""
+        return False, f"Event type '{event[EVENT_TYPE]}' is not benchmark."
+
+    def get_created_job_type(self)->str:
+        return JOB_TYPE_BENCHMARK
+
+    def create_job_recipe_file(self, job_dir:str, event:Dict[str,Any],
+            params_dict:Dict[str,Any])->str:
+        # No recipe is written, as jobs are never executed
+        return ""
+
+    def handle(self, event:Dict[str,Any])->None:
+        job = create_job_metadata_dict(JOB_TYPE_BENCHMARK, event)
+        job_dir = os.path.join(self.job_queue_dir, job[JOB_ID])
+        make_dir(job_dir)
+        threadsafe_write_status(job, os.path.join(job_dir, META_FILE))
+        self.recorder.job_created(job_dir, event[EVENT_TIME])
+        self.send_job_to_runner(job_dir)
+
+
+class StubConductor(BaseConductor):
+    # Recorder shared with the other stub components
+    recorder:BenchmarkRecorder
+    def __init__(self, recorder:BenchmarkRecorder, name:str="",
+            pause_time:int=1)->None:
+        """StubConductor Constructor. Jobs are not executed, only recorded as
+        having been dispatched."""
+        super().__init__(name=name, pause_time=pause_time)
+        check_type(recorder, BenchmarkRecorder,
+            hint="StubConductor.recorder")
+        self.recorder = recorder
+
+    def valid_execute_criteria(self, job:Dict[str,Any])->Tuple[bool,str]:
+        if job[JOB_TYPE] == JOB_TYPE_BENCHMARK:
+            return True, ""
+        return False, f"Job type '{job[JOB_TYPE]}' is not benchmark."
+
+    def execute(self, job_dir:str)->None:
+        self.recorder.job_dispatched(job_dir)
@@ -53,6 +53,9 @@ class BaseConductor:
     # A count, for how long a conductor will wait if told that there are no 
     # jobs in the runner, before polling again. Default is 5 seconds.
     pause_time: int
+    # The channel on which a request for a job has been sent to the runner 
+    # but not yet answered, if any
+    _pending_request: VALID_CHANNELS
     #Variable to store a bool for recived signals
     recieved_signal: int
     #Varible to decide of processing should be done remotely
@@ -71,6 +74,7 @@ class BaseConductor:
         self.name = name    
         self._is_valid_pause_time(pause_time)
         self.pause_time = pause_time
+        self._pending_request = None
         self.remote = remote
         self.slurmArgs = slurmArgs
         self.job_queue_dir = job_queue_dir
@@ -97,9 +101,15 @@ class BaseConductor:
         valid_natural(pause_time, hint="BaseHandler.pause_time")
 
     def prompt_runner_for_job(self)->Union[Dict[str,Any],Any]:
-        self.to_runner_job.send(1)
+        # Only send a new request if the last one has been answered, as a 
+        # runner using push dispatch will hold onto requests until it has a 
+        # job to send
+        if self._pending_request is not self.to_runner_job:
+            self.to_runner_job.send(1)
+            self._pending_request = self.to_runner_job
 
         if self.to_runner_job.poll(self.pause_time):
+            self._pending_request = None
             return self.to_runner_job.recv()
         return None
 
@@ -47,6 +47,9 @@ class BaseHandler:
     # A count, for how long a handler will wait if told that there are no 
     # events in the runner, before polling again. Default is 5 seconds.
     pause_time: int
+    # The channel on which a request for a event has been sent to the runner 
+    # but not yet answered, if any
+    _pending_request: VALID_CHANNELS
     def __init__(self, name:str='', pause_time:int=5)->None:
         """BaseHandler Constructor. This will check that any class inheriting 
         from it implements its validation functions."""
@@ -59,6 +62,7 @@ class BaseHandler:
         self.name = name
         self._is_valid_pause_time(pause_time)
         self.pause_time = pause_time
+        self._pending_request = None
 
     def __new__(cls, *args, **kwargs):
         """A check that this base class is not instantiated itself, only 
@@ -81,9 +85,15 @@ class BaseHandler:
         valid_natural(pause_time, hint="BaseHandler.pause_time")
 
     def prompt_runner_for_event(self)->Union[Dict[str,Any],Any]:
-        self.to_runner_event.send(1)
+        # Only send a new request if the last one has been answered, as a 
+        # runner using push dispatch will hold onto requests until it has a 
+        # event to send
+        if self._pending_request is not self.to_runner_event:
+            self.to_runner_event.send(1)
+            self._pending_request = self.to_runner_event
 
         if self.to_runner_event.poll(self.pause_time):
+            self._pending_request = None
             return self.to_runner_event.recv()
         return None
 
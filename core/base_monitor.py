@@ -6,65 +6,235 @@ from for all monitor instances.
 Author(s): David Marchant
 """
 
+from collections import OrderedDict
 from copy import deepcopy
-from threading import Lock
-from typing import Union, Dict, List
+from threading import Lock, Event, RLock, Thread, Timer
+from typing import Any, Union, Dict, List, Set, Tuple
 
 from meow_base.core.base_pattern import BasePattern
 from meow_base.core.base_recipe import BaseRecipe
-from meow_base.core.rule import Rule
-from meow_base.core.vars import VALID_CHANNELS, \
+from meow_base.core.rule import Rule, register_rule, pin_rule
+from meow_base.core.vars import VALID_CHANNELS, EVENT_RULE, \
     VALID_MONITOR_NAME_CHARS, get_drt_imp_msg 
 from meow_base.functionality.validation import check_implementation, \
-    valid_string, check_type, check_types, valid_dict_multiple_types
+    valid_string, check_type, check_types, valid_dict_multiple_types, \
+    valid_natural, valid_list
 from meow_base.functionality.meow import create_rules, create_rule
 from meow_base.functionality.naming import generate_monitor_id
 
+# Default longest time an event waits for the rest of its batch, in seconds
+DEFAULT_BATCH_TIME = 0.05
+
+
+def _index_add(index:Dict[str,Set[str]], key:str, value:str)->None:
+    """Adds 'value' to the set held in 'index' under 'key'."""
+    if key in index:
+        index[key].add(value)
+    else:
+        index[key] = {value}
+
+def _index_discard(index:Dict[str,Set[str]], key:str, value:str)->None:
+    """Removes 'value' from the set held in 'index' under 'key', dropping 
+    the set once it is empty."""
+    if key in index:
+        index[key].discard(value)
+        if not index[key]:
+            del index[key]
+
+
+class ReadOnlyDict(dict):
+    """A dict that cannot be changed once created. Monitors return their 
+    patterns, recipes and rules as these, so that they can be read without 
+    locking and returned without being copied. A changeable copy can be made
+    with 'copy'."""
+    def _read_only(self, *args, **kwargs)->None:
+        raise TypeError(f"{type(self).__name__} cannot be modified")
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __ior__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+    def __reduce__(self):
+        return (ReadOnlyDict, (dict(self),))
+
+    def __copy__(self)->"ReadOnlyDict":
+        return self
+
+    def __deepcopy__(self, memo:Dict[int,Any])->"ReadOnlyDict":
+        return ReadOnlyDict(deepcopy(dict(self), memo))
+
+
+class SnapshotDict:
+    """A dict only changed whilst holding a given lock, but read as 
+    ReadOnlyDict snapshots. Rather than the whole dict being copied on every
+    change, a snapshot is only copied when first read after a change, so 
+    adding or removing an item costs the same however many items there are.
+    Snapshots are copied whilst holding the lock, but otherwise reading a 
+    snapshot needs no locking."""
+    __slots__ = ("_items", "_snapshot", "_lock")
+    def __init__(self, items:Dict[Any,Any], lock:RLock)->None:
+        self._items = dict(items)
+        self._snapshot = ReadOnlyDict(self._items)
+        self._lock = lock
+
+    def snapshot(self)->ReadOnlyDict:
+        """Function to get a read-only snapshot of the items, which is only 
+        copied if they have changed since the last one was taken."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    snapshot = ReadOnlyDict(self._items)
+                    self._snapshot = snapshot
+        return snapshot
+
+    def __contains__(self, key:Any)->bool:
+        return key in self._items
+
+    def __getitem__(self, key:Any)->Any:
+        return self._items[key]
+
+    def __len__(self)->int:
+        return len(self._items)
+
+    def update(self, items:Dict[Any,Any])->None:
+        """Function to add or replace the given items. Must be called whilst
+        holding the lock."""
+        self._items.update(items)
+        self._snapshot = None
+
+    def pop(self, key:Any)->Any:
+        """Function to remove and return the item with the given key. Must be
+        called whilst holding the lock."""
+        item = self._items.pop(key)
+        self._snapshot = None
+        return item
+
 
 class BaseMonitor:
     # An identifier for a monitor within the runner. Can be manually set in 
     # the constructor, or autogenerated if no name provided.
     name:str
-    # A collection of patterns
-    _patterns: Dict[str, BasePattern]
-    # A collection of recipes
-    _recipes: Dict[str, BaseRecipe]
-    # A collection of rules derived from _patterns and _recipes
-    _rules: Dict[str, Rule]
+    # A collection of patterns. This is only changed whilst holding 
+    # '_patterns_lock', and is read as a snapshot through '_patterns' 
+    _pattern_defs: SnapshotDict
+    # A collection of recipes. This is only changed whilst holding 
+    # '_recipes_lock', and is read as a snapshot through '_recipes'
+    _recipe_defs: SnapshotDict
+    # A collection of rules derived from the patterns and recipes. This is 
+    # only changed whilst holding '_rules_lock', and is read as a snapshot 
+    # through '_rules'
+    _rule_defs: SnapshotDict
+    # Names of the patterns referring to each recipe name, whether or not 
+    # that recipe exists. Only used whilst holding '_patterns_lock'
+    _patterns_by_recipe:Dict[str,Set[str]]
+    # Names of the rules created from each pattern. Only used whilst holding 
+    # '_rules_lock'
+    _rules_by_pattern:Dict[str,Set[str]]
+    # Names of the rules created from each recipe. Only used whilst holding 
+    # '_rules_lock'
+    _rules_by_recipe:Dict[str,Set[str]]
     # A channel for sending messages to the runner event queue. Note that this 
     # is not initialised within the constructor, but within the runner when the
     # monitor is passed to it unless the monitor is running independently of a
     # runner.
     to_runner_event: VALID_CHANNELS
-    #A lock to solve race conditions on '_patterns'
-    _patterns_lock:Lock
-    #A lock to solve race conditions on '_recipes'
-    _recipes_lock:Lock
-    #A lock to solve race conditions on '_rules'
-    _rules_lock:Lock
+    #A lock to solve race conditions on '_pattern_defs'
+    _patterns_lock:RLock
+    #A lock to solve race conditions on '_recipe_defs'
+    _recipes_lock:RLock
+    #A lock to solve race conditions on '_rule_defs'
+    _rules_lock:RLock
+    # A lock to solve race conditions on 'to_runner_event', as sending is not 
+    # thread safe and events may be sent from several threads at once
+    _send_lock:Lock
+    # Set by the runner when it has too many events queued, during which time 
+    # events are held by the monitor rather than sent
+    _throttled:Event
+    # Events held whilst throttled, in the order they were held
+    _held_events:Dict[Any,Any]
+    #A lock to solve race conditions on '_held_events'
+    _held_events_lock:Lock
+    # A thread sending held events to the runner, if one is running
+    _release_thread:Thread
+    # Config option, if existing definitions are checked against the rules 
+    # when the monitor is started
+    apply_retroactive:bool
+    # Set by the runner whilst the monitor is running within another process,
+    # which would not see any changes to its definitions made from this one
+    _runs_elsewhere:bool
+    # Config option, the most events sent to the runner together as a single
+    # list. If 1, each event is sent as soon as it is produced
+    batch_size:int
+    # Config option, the longest an event is kept waiting for the rest of 
+    # its batch, in seconds
+    batch_time:float
+    # Events waiting to be sent to the runner as a batch
+    _batch:List[Dict[str,Any]]
+    # A lock to solve race conditions on '_batch'
+    _batch_lock:Lock
+    # Timer sending the current batch once 'batch_time' has passed, if any 
+    # events are waiting
+    _batch_timer:Timer
     def __init__(self, patterns:Dict[str,BasePattern], 
-            recipes:Dict[str,BaseRecipe], name:str="")->None:
+            recipes:Dict[str,BaseRecipe], name:str="", batch_size:int=1, 
+            batch_time:float=DEFAULT_BATCH_TIME)->None:
         """BaseMonitor Constructor. This will check that any class inheriting 
         from it implements its validation functions. It will then call these on
-        the input parameters."""
+        the input parameters. If batch_size is more than 1, events are sent to
+        the runner in lists of up to that many, with each event waiting at 
+        most batch_time seconds for its list to fill. This greatly reduces the
+        cost of sending bursts of events."""
         check_implementation(type(self).start, BaseMonitor)
         check_implementation(type(self).stop, BaseMonitor)
         check_implementation(type(self)._get_valid_pattern_types, BaseMonitor)
         self._is_valid_patterns(patterns)
         check_implementation(type(self)._get_valid_recipe_types, BaseMonitor)
         self._is_valid_recipes(recipes)
+        self._patterns_lock = RLock()
+        self._recipes_lock = RLock()
+        self._rules_lock = RLock()
         # Ensure that patterns and recipes cannot be trivially modified from 
         # outside the monitor, as this will cause internal consistency issues
-        self._patterns = deepcopy(patterns)
-        self._recipes = deepcopy(recipes)
-        self._rules = create_rules(patterns, recipes)
+        self._pattern_defs = SnapshotDict(
+            deepcopy(patterns), self._patterns_lock)
+        self._recipe_defs = SnapshotDict(deepcopy(recipes), self._recipes_lock)
+        self._rule_defs = SnapshotDict(
+            create_rules(patterns, recipes), self._rules_lock)
+        # Reverse indexes, so that adding or removing a definition only looks
+        # up the rules it affects, rather than checking every definition
+        self._patterns_by_recipe = {}
+        for pattern in self._patterns.values():
+            _index_add(self._patterns_by_recipe, pattern.recipe, pattern.name)
+        self._rules_by_pattern = {}
+        self._rules_by_recipe = {}
+        for rule in self._rules.values():
+            register_rule(rule)
+            _index_add(self._rules_by_pattern, rule.pattern.name, rule.name)
+            _index_add(self._rules_by_recipe, rule.recipe.name, rule.name)
         if not name:
             name = generate_monitor_id()
         self._is_valid_name(name)
         self.name = name
-        self._patterns_lock = Lock()
-        self._recipes_lock = Lock()
-        self._rules_lock = Lock()
+        self._send_lock = Lock()
+        self._throttled = Event()
+        self._held_events = OrderedDict()
+        self._held_events_lock = Lock()
+        self._release_thread = None
+        self.apply_retroactive = True
+        self._runs_elsewhere = False
+        self._is_valid_batching(batch_size, batch_time)
+        self.batch_size = batch_size
+        self.batch_time = batch_time
+        self._batch = []
+        self._batch_lock = Lock()
+        self._batch_timer = None
         
     def __new__(cls, *args, **kwargs):
         """A check that this base class is not instantiated itself, only 
@@ -74,12 +244,41 @@ class BaseMonitor:
             raise TypeError(msg)
         return object.__new__(cls)
 
+    @property
+    def _patterns(self)->ReadOnlyDict:
+        """The current patterns, as a snapshot which is never changed."""
+        return self._pattern_defs.snapshot()
+
+    @property
+    def _recipes(self)->ReadOnlyDict:
+        """The current recipes, as a snapshot which is never changed."""
+        return self._recipe_defs.snapshot()
+
+    @property
+    def _rules(self)->ReadOnlyDict:
+        """The current rules, as a snapshot which is never changed."""
+        return self._rule_defs.snapshot()
+
     def _is_valid_name(self, name:str)->None:
         """Validation check for 'name' variable from main constructor. Is 
         automatically called during initialisation. This does not need to be 
         overridden by child classes."""
         valid_string(name, VALID_MONITOR_NAME_CHARS)
 
+    def _is_valid_batching(self, batch_size:int, batch_time:float)->None:
+        """Validation check for 'batch_size' and 'batch_time' variables from 
+        main constructor. This does not need to be overridden by child 
+        classes."""
+        valid_natural(batch_size, hint="BaseMonitor.batch_size")
+        if batch_size < 1:
+            raise ValueError("BaseMonitor.batch_size must be at least 1. "
+                f"Got {batch_size}")
+        check_type(batch_time, float, alt_types=[int], 
+            hint="BaseMonitor.batch_time")
+        if batch_time < 0:
+            raise ValueError("BaseMonitor.batch_time cannot be negative. "
+                f"Got {batch_time}")
+
     def _is_valid_patterns(self, patterns:Dict[str,BasePattern])->None:
         """Validation check for 'patterns' variable from main constructor."""
         valid_dict_multiple_types(
@@ -110,110 +309,285 @@ class BaseMonitor:
         compatible recipes are used. Must be implmented by any child class."""        
         raise NotImplementedError        
 
-    def _identify_new_rules(self, new_pattern:BasePattern=None, 
-            new_recipe:BaseRecipe=None)->None:
-        """Function to determine if a new rule can be created given a new 
-        pattern or recipe, in light of other existing patterns or recipes in 
-        the monitor."""
-
-        if new_pattern:
-            self._patterns_lock.acquire()
-            self._recipes_lock.acquire()
-            try:
+    def _identify_new_rules(self, new_patterns:List[BasePattern]=[], 
+            new_recipes:List[BaseRecipe]=[])->None:
+        """Function to determine if new rules can be created given new 
+        patterns or recipes, in light of other existing patterns or recipes in 
+        the monitor. All new rules are created together, and then applied 
+        retroactively together."""
+        to_create = {}
+        self._patterns_lock.acquire()
+        self._recipes_lock.acquire()
+        try:
+            for pattern in new_patterns:
                 # Check in case pattern has been deleted since function called
-                if new_pattern.name not in self._patterns:
-                    self._patterns_lock.release()
-                    self._recipes_lock.release()
-                    return
+                if pattern.name not in self._pattern_defs:
+                    continue
                 # If pattern specifies recipe that already exists, make a rule
-                if new_pattern.recipe in self._recipes:
-                    self._create_new_rule(
-                        new_pattern,
-                        self._recipes[new_pattern.recipe],
-                    )
-            except Exception as e:
-                self._patterns_lock.release()
-                self._recipes_lock.release()
-                raise e
-            self._patterns_lock.release()
-            self._recipes_lock.release()
-
-        if new_recipe:
-            self._patterns_lock.acquire()
-            self._recipes_lock.acquire()
-            try:
+                if pattern.recipe in self._recipe_defs:
+                    to_create[(pattern.name, pattern.recipe)] = \
+                        (pattern, self._recipe_defs[pattern.recipe])
+            for recipe in new_recipes:
                 # Check in case recipe has been deleted since function called
-                if new_recipe.name not in self._recipes:
-                    self._patterns_lock.release()
-                    self._recipes_lock.release()
-                    return
+                if recipe.name not in self._recipe_defs:
+                    continue
                 # If recipe is specified by existing pattern, make a rule
-                for pattern in self._patterns.values():
-                    if pattern.recipe == new_recipe.name:
-                        self._create_new_rule(
-                            pattern,
-                            new_recipe,
-                        )
-            except Exception as e:
-                self._patterns_lock.release()
-                self._recipes_lock.release()
-                raise e
+                for pattern_name in self._patterns_by_recipe.get(
+                        recipe.name, ()):
+                    to_create[(pattern_name, recipe.name)] = \
+                        (self._pattern_defs[pattern_name], recipe)
+            rules = self._create_new_rules(list(to_create.values()))
+        except Exception as e:
             self._patterns_lock.release()
             self._recipes_lock.release()
+            raise e
+        self._patterns_lock.release()
+        self._recipes_lock.release()
+
+        if rules:
+            self._apply_retroactive_rules(rules)
 
     def _identify_lost_rules(self, lost_pattern:str=None, 
             lost_recipe:str=None)->None:
         """Function to remove rules that should be deleted in response to a 
         pattern or recipe having been deleted."""
-        to_delete = []
+        to_delete = set()
         self._rules_lock.acquire()
         try:
             # Identify any offending rules
-            for name, rule in self._rules.items():
-                if lost_pattern and rule.pattern.name == lost_pattern:
-                    to_delete.append(name)
-                if lost_recipe and rule.recipe.name == lost_recipe:
-                    to_delete.append(name)
+            if lost_pattern:
+                to_delete.update(self._rules_by_pattern.get(lost_pattern, ()))
+            if lost_recipe:
+                to_delete.update(self._rules_by_recipe.get(lost_recipe, ()))
             # Now delete them
-            for delete in to_delete:
-                if delete in self._rules.keys():
-                    self._rules.pop(delete)
+            if to_delete:
+                removed = [self._rule_defs.pop(delete) for delete in to_delete]
+                for rule in removed:
+                    _index_discard(
+                        self._rules_by_pattern, rule.pattern.name, rule.name)
+                    _index_discard(
+                        self._rules_by_recipe, rule.recipe.name, rule.name)
+                self._rules_removed(removed)
         except Exception as e:
             self._rules_lock.release()
             raise e
         self._rules_lock.release()
 
-    def _create_new_rule(self, pattern:BasePattern, recipe:BaseRecipe)->None:
-        """Function to create a new rule from a given pattern and recipe. This 
-        will only be called to create rules at runtime, as rules are 
-        automatically created at initialisation using the  same 'create_rule' 
-        function called here."""
-        rule = create_rule(pattern, recipe)
+    def _create_new_rules(self, definitions:List[Tuple[BasePattern,BaseRecipe]]
+            )->List[Rule]:
+        """Function to create new rules from given pairs of patterns and 
+        recipes, adding the rules all at once. This will only be called to
+        create rules at runtime, as rules are automatically created at 
+        initialisation using the  same 'create_rule' function called here."""
+        rules = [create_rule(pattern, recipe) 
+            for pattern, recipe in definitions]
+        if not rules:
+            return rules
         self._rules_lock.acquire()
         try:
-            if rule.name in self._rules:
-                raise KeyError("Cannot create Rule with name of "
-                    f"'{rule.name}' as already in use")
-            self._rules[rule.name] = rule
+            new_rules = {}
+            for rule in rules:
+                if rule.name in new_rules or rule.name in self._rule_defs:
+                    raise KeyError("Cannot create Rule with name of "
+                        f"'{rule.name}' as already in use")
+                new_rules[rule.name] = rule
+            self._rule_defs.update(new_rules)
+            for rule in rules:
+                register_rule(rule)
+                _index_add(self._rules_by_pattern, rule.pattern.name, 
+                    rule.name)
+                _index_add(self._rules_by_recipe, rule.recipe.name, rule.name)
+            self._rules_added(rules)
         except Exception as e:
             self._rules_lock.release()
             raise e
         self._rules_lock.release()
+        return rules
+
+    def get_gauges(self)->Dict[str,Union[int,float]]:
+        """Function to get the current size of any internal structures of 
+        the monitor, to be recorded by runner metrics. May be implemented by 
+        inherited classes."""
+        return {}
+
+    def add_excludes(self, excludes:List[str])->None:
+        """Function to ignore any events at or within the given paths, such 
+        as those a runner writes its own jobs to. Absolute paths are taken 
+        literally. May be implemented by inherited classes, as by default 
+        nothing is excluded."""
+        pass
 
-        self._apply_retroactive_rule(rule)
+    def _rule_added(self, rule:Rule)->None:
+        """Function called whenever a rule is added at runtime, whilst 
+        '_rules_lock' is held. May be implemented by inherited classes that 
+        keep their own structures derived from the rules."""
+        pass
+
+    def _rules_added(self, rules:List[Rule])->None:
+        """Function called whenever rules are added at runtime together, 
+        whilst '_rules_lock' is held. By default calls '_rule_added' on each, 
+        but may be implemented by inherited classes able to update their own 
+        structures in one go."""
+        for rule in rules:
+            self._rule_added(rule)
+
+    def _rule_removed(self, rule:Rule)->None:
+        """Function called whenever a rule is removed, whilst '_rules_lock' 
+        is held. May be implemented by inherited classes that keep their own 
+        structures derived from the rules."""
+        pass
+
+    def _rules_removed(self, rules:List[Rule])->None:
+        """Function called whenever rules are removed together, whilst 
+        '_rules_lock' is held. By default calls '_rule_removed' on each, but 
+        may be implemented by inherited classes able to update their own 
+        structures in one go."""
+        for rule in rules:
+            self._rule_removed(rule)
+
+    def skip_recovered_events(self, events:List[Dict[str,Any]])->None:
+        """Function called by the runner before the monitor is started, with 
+        any events it has resumed from a journal. These should not be sent 
+        again when existing definitions are checked against the rules on 
+        starting. May be implemented by inherited classes."""
+        pass
 
     def _apply_retroactive_rule(self, rule:Rule)->None:
         """Function to determine if a rule should be applied to any existing 
         defintions, if possible. May be implemented by inherited classes."""
         pass
 
-    def _apply_retroactive_rules(self)->None:
-        """Function to determine if any rules should be applied to any existing 
-        defintions, if possible. May be implemented by inherited classes."""
-        pass
+    def _apply_retroactive_rules(self, rules:List[Rule]=None)->None:
+        """Function to determine if any of the given rules, or all rules if 
+        none are given, should be applied to any existing defintions, if 
+        possible. By default calls '_apply_retroactive_rule' on each, but may 
+        be implemented by inherited classes able to apply them in one go."""
+        if rules is None:
+            rules = list(self._rules.values())
+        for rule in rules:
+            self._apply_retroactive_rule(rule)
 
     def send_event_to_runner(self, msg):
-        self.to_runner_event.send(msg)
+        if self._is_holding():
+            self._hold_event(msg)
+        else:
+            self._queue_event(msg)
+
+    def _is_holding(self)->bool:
+        """Function to check if new events should be held rather than sent. 
+        This is the case whilst throttled, and also whilst earlier held 
+        events are still waiting to be released, so that events are always 
+        sent in the order they were produced."""
+        return self._throttled.is_set() or bool(self._held_events) \
+            or self._release_thread is not None
+
+    def _queue_event(self, msg:Any)->None:
+        """Function to send an event to the runner, either straight away or 
+        as part of a batch. Both are done whilst holding '_batch_lock', so 
+        that an unbatched event cannot overtake those still waiting in a 
+        batch, should 'batch_size' be changed. The rule of the event is 
+        pinned, so that it can still be resolved by the runner should it be 
+        removed in the meantime. The runner unpins it once recieved."""
+        if isinstance(msg, dict) and isinstance(msg.get(EVENT_RULE), Rule):
+            pin_rule(msg[EVENT_RULE])
+        with self._batch_lock:
+            if self.batch_size == 1:
+                self._send_batch()
+                self._send(msg)
+                return
+            self._batch.append(msg)
+            if len(self._batch) >= self.batch_size:
+                self._send_batch()
+            elif self._batch_timer is None:
+                self._batch_timer = Timer(self.batch_time, self.flush_events)
+                self._batch_timer.daemon = True
+                self._batch_timer.start()
+
+    def flush_events(self)->None:
+        """Function to send any events waiting for their batch to fill. 
+        Should be called by child classes when stopped."""
+        with self._batch_lock:
+            self._send_batch()
+
+    def _send_batch(self)->None:
+        """Function to send the current batch of events to the runner as a 
+        single list. Must be called whilst holding '_batch_lock'."""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        if self._batch:
+            batch = self._batch
+            self._batch = []
+            self._send(batch)
+
+    def _send(self, msg:Any)->None:
+        """Function to send a message to the runner. All messages must be 
+        sent through this, so that they are not interleaved with one another
+        when sent from different threads."""
+        with self._send_lock:
+            self.to_runner_event.send(msg)
+
+    def throttle(self)->None:
+        """Function called by the runner to stop the monitor sending it 
+        events. Any events produced in the meantime are held by the monitor 
+        until unthrottle is called."""
+        self._throttled.set()
+
+    def unthrottle(self)->None:
+        """Function called by the runner to allow the monitor to send it 
+        events again. Any held events are then sent on."""
+        self._throttled.clear()
+        self._start_release()
+
+    def _start_release(self)->None:
+        """Function to start sending held events to the runner. This is done 
+        in a separate thread, as the runner may be the one unthrottling the 
+        monitor and so cannot also be reading the events."""
+        with self._held_events_lock:
+            if not self._held_events or self._release_thread is not None:
+                return
+            self._release_thread = Thread(
+                target=self._release_held_events,
+                daemon=True,
+                name="monitor_release_thread"
+            )
+            self._release_thread.start()
+
+    def _hold_event(self, event:Dict[str,Any])->None:
+        """Function to hold onto an event whilst the monitor is throttled. 
+        May be overridden by child classes to hold events more compactly, in 
+        which case '_restore_held_event' should be overridden too."""
+        self._hold(id(event), event)
+
+    def _hold(self, key:Any, held:Any)->None:
+        """Function to add an entry to the held events. Entries with the same 
+        key replace one another, but keep their original place in line."""
+        with self._held_events_lock:
+            self._held_events[key] = held
+        # The runner may have unthrottled the monitor whilst this was being 
+        # held, so make sure it is not left behind
+        if not self._throttled.is_set():
+            self._start_release()
+
+    def _restore_held_event(self, key:Any, held:Any
+            )->Union[Dict[str,Any],None]:
+        """Function to get the event to send to the runner from a held entry. 
+        If None is returned, nothing is sent."""
+        return held
+
+    def _release_held_events(self)->None:
+        """Function to send held events to the runner, oldest first, batched 
+        as any other events would be. This stops early if the monitor is 
+        throttled again. Events produced meanwhile are held behind them."""
+        while True:
+            with self._held_events_lock:
+                if not self._held_events or self._throttled.is_set():
+                    self._release_thread = None
+                    return
+                key, held = self._held_events.popitem(last=False)
+            event = self._restore_held_event(key, held)
+            if event is not None:
+                self._queue_event(event)
 
     def start(self)->None:
         """Function to start the monitor as an ongoing process/thread. Must be 
@@ -227,6 +601,15 @@ class BaseMonitor:
         implemented by any child process"""
         pass
 
+    def _check_definitions_changeable(self)->None:
+        """Function to check that the patterns and recipes of the monitor can 
+        be changed. They cannot whilst it is running within another process, 
+        as that process would not see the change."""
+        if self._runs_elsewhere:
+            raise RuntimeWarning(f"Cannot change the patterns or recipes of "
+                f"monitor '{self.name}' whilst it is running within another "
+                "process, as that process would not see the change.")
+
     def add_pattern(self, pattern:BasePattern)->None:
         """Function to add a pattern to the current definitions. Any rules 
         that can be possibly created from that pattern will be automatically 
@@ -236,19 +619,47 @@ class BaseMonitor:
             self._get_valid_pattern_types(),
              hint="add_pattern.pattern"
         )
+        self._add_patterns([pattern])
+
+    def add_patterns(self, patterns:List[BasePattern])->None:
+        """Function to add several patterns to the current definitions at 
+        once. Either all are added, or none are if any are invalid. Any rules 
+        that can be possibly created from them will be automatically created,
+        and applied retroactively together, so this is much cheaper than 
+        adding each pattern in turn."""
+        valid_types = self._get_valid_pattern_types()
+        valid_list(
+            patterns, 
+            valid_types[0], 
+            alt_types=valid_types[1:], 
+            min_length=0, 
+            hint="add_patterns.patterns"
+        )
+        self._add_patterns(patterns)
 
+    def _add_patterns(self, patterns:List[BasePattern])->None:
+        """Function to add already validated patterns to the current 
+        definitions, and then create any new rules."""
+        self._check_definitions_changeable()
         self._patterns_lock.acquire()
         try:
-            if pattern.name in self._patterns:
-                raise KeyError(f"An entry for Pattern '{pattern.name}' "
-                    "already exists. Do you intend to update instead?")
-            self._patterns[pattern.name] = pattern
+            new_patterns = {}
+            for pattern in patterns:
+                if pattern.name in new_patterns \
+                        or pattern.name in self._pattern_defs:
+                    raise KeyError(f"An entry for Pattern '{pattern.name}' "
+                        "already exists. Do you intend to update instead?")
+                new_patterns[pattern.name] = pattern
+            self._pattern_defs.update(new_patterns)
+            for pattern in patterns:
+                _index_add(
+                    self._patterns_by_recipe, pattern.recipe, pattern.name)
         except Exception as e:
             self._patterns_lock.release()
             raise e            
         self._patterns_lock.release()
 
-        self._identify_new_rules(new_pattern=pattern)
+        self._identify_new_rules(new_patterns=patterns)
 
     def update_pattern(self, pattern:BasePattern)->None:
         """Function to update a pattern in the current definitions. Any rules 
@@ -271,15 +682,18 @@ class BaseMonitor:
             alt_types=[BasePattern], 
             hint="remove_pattern.pattern"
         )
+        self._check_definitions_changeable()
         lookup_key = pattern
         if isinstance(lookup_key, BasePattern):
             lookup_key = pattern.name
         self._patterns_lock.acquire()
         try:
-            if lookup_key not in self._patterns:
+            if lookup_key not in self._pattern_defs:
                 raise KeyError(f"Cannot remote Pattern '{lookup_key}' as it "
                     "does not already exist")
-            self._patterns.pop(lookup_key)
+            removed = self._pattern_defs.pop(lookup_key)
+            _index_discard(
+                self._patterns_by_recipe, removed.recipe, removed.name)
         except Exception as e:
             self._patterns_lock.release()
             raise e 
@@ -292,35 +706,48 @@ class BaseMonitor:
         
     def get_patterns(self)->Dict[str,BasePattern]:
         """Function to get a dict of the currently defined patterns of the 
-        monitor. Note that the result is deep-copied, and so can be manipulated
-        without directly manipulating the internals of the monitor."""
-        to_return = {}
-        self._patterns_lock.acquire()
-        try:
-            to_return = deepcopy(self._patterns)
-        except Exception as e:
-            self._patterns_lock.release()
-            raise e
-        self._patterns_lock.release()
-        return to_return
+        monitor. Note that the result is read-only, and is not changed by 
+        later updates to the monitor, so can be kept without copying. The 
+        patterns within it should not be modified."""
+        return self._patterns
 
     def add_recipe(self, recipe: BaseRecipe)->None:
         """Function to add a recipe to the current definitions. Any rules 
         that can be possibly created from that recipe will be automatically 
         created."""
         check_type(recipe, BaseRecipe, hint="add_recipe.recipe")
+        self._add_recipes([recipe])
+
+    def add_recipes(self, recipes:List[BaseRecipe])->None:
+        """Function to add several recipes to the current definitions at 
+        once. Either all are added, or none are if any are invalid. Any rules 
+        that can be possibly created from them will be automatically created,
+        and applied retroactively together, so this is much cheaper than 
+        adding each recipe in turn."""
+        valid_list(
+            recipes, BaseRecipe, min_length=0, hint="add_recipes.recipes")
+        self._add_recipes(recipes)
+
+    def _add_recipes(self, recipes:List[BaseRecipe])->None:
+        """Function to add already validated recipes to the current 
+        definitions, and then create any new rules."""
+        self._check_definitions_changeable()
         self._recipes_lock.acquire()
         try:
-            if recipe.name in self._recipes:
-                raise KeyError(f"An entry for Recipe '{recipe.name}' already "
-                    "exists. Do you intend to update instead?")
-            self._recipes[recipe.name] = recipe
+            new_recipes = {}
+            for recipe in recipes:
+                if recipe.name in new_recipes \
+                        or recipe.name in self._recipe_defs:
+                    raise KeyError(f"An entry for Recipe '{recipe.name}' "
+                        "already exists. Do you intend to update instead?")
+                new_recipes[recipe.name] = recipe
+            self._recipe_defs.update(new_recipes)
         except Exception as e:
             self._recipes_lock.release()
             raise e
         self._recipes_lock.release()
 
-        self._identify_new_rules(new_recipe=recipe)
+        self._identify_new_rules(new_recipes=recipes)
 
     def update_recipe(self, recipe: BaseRecipe)->None:
         """Function to update a recipe in the current definitions. Any rules 
@@ -338,16 +765,17 @@ class BaseMonitor:
             alt_types=[BaseRecipe], 
             hint="remove_recipe.recipe"
         )
+        self._check_definitions_changeable()
         lookup_key = recipe
         if isinstance(lookup_key, BaseRecipe):
             lookup_key = recipe.name
         self._recipes_lock.acquire()
         try:
             # Check that recipe has not already been deleted
-            if lookup_key not in self._recipes:
+            if lookup_key not in self._recipe_defs:
                 raise KeyError(f"Cannot remote Recipe '{lookup_key}' as it "
                     "does not already exist")
-            self._recipes.pop(lookup_key)
+            self._recipe_defs.pop(lookup_key)
         except Exception as e:
             self._recipes_lock.release()
             raise e
@@ -360,30 +788,16 @@ class BaseMonitor:
 
     def get_recipes(self)->Dict[str,BaseRecipe]:
         """Function to get a dict of the currently defined recipes of the 
-        monitor. Note that the result is deep-copied, and so can be manipulated
-        without directly manipulating the internals of the monitor."""
-        to_return = {}
-        self._recipes_lock.acquire()
-        try:
-            to_return = deepcopy(self._recipes)
-        except Exception as e:
-            self._recipes_lock.release()
-            raise e
-        self._recipes_lock.release()
-        return to_return
+        monitor. Note that the result is read-only, and is not changed by 
+        later updates to the monitor, so can be kept without copying. The 
+        recipes within it should not be modified."""
+        return self._recipes
     
     def get_rules(self)->Dict[str,Rule]:
         """Function to get a dict of the currently defined rules of the 
-        monitor. Note that the result is deep-copied, and so can be manipulated
-        without directly manipulating the internals of the monitor."""
-        to_return = {}
-        self._rules_lock.acquire()
-        try:
-            to_return = deepcopy(self._rules)
-        except Exception as e:
-            self._rules_lock.release()
-            raise e
-        self._rules_lock.release()
-        return to_return
+        monitor. Note that the result is read-only, and is not changed by 
+        later updates to the monitor, so can be kept without copying. The 
+        rules within it should not be modified."""
+        return self._rules
 
 
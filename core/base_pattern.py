@@ -27,9 +27,11 @@ class BasePattern:
     outputs:Dict[str,Any]
     # A collection of variables to be swept over for job scheduling
     sweep:Dict[str,Any]
+    # The priority of jobs created by this pattern, higher is more urgent
+    priority:int
     # TODO Add requirements to patterns
     def __init__(self, name:str, recipe:str, parameters:Dict[str,Any]={}, 
-            outputs:Dict[str,Any]={}, sweep:Dict[str,Any]={}):
+            outputs:Dict[str,Any]={}, sweep:Dict[str,Any]={}, priority:int=0):
         """BasePattern Constructor. This will check that any class inheriting 
         from it implements its validation functions. It will then call these on
         the input parameters."""
@@ -46,6 +48,8 @@ class BasePattern:
         self.outputs = outputs
         self._is_valid_sweep(sweep)
         self.sweep = sweep
+        self._is_valid_priority(priority)
+        self.priority = priority
 
     def __new__(cls, *args, **kwargs):
         """A check that this base class is not instantiated itself, only 
@@ -80,6 +84,12 @@ class BasePattern:
         be implemented by any child class."""
         pass
 
+    def _is_valid_priority(self, priority:int)->None:
+        """Validation check for 'priority' variable from main constructor. Is 
+        automatically called during initialisation. This does not need to be 
+        overridden by child classes."""
+        check_type(priority, int, hint="BasePattern.priority")
+
     def _is_valid_sweep(self, sweep:Dict[str,Union[int,float,complex]])->None:
         """Validation check for 'sweep' variable from main constructor. This 
         function is implemented to check for the types given in the signature, 
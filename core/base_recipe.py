@@ -11,7 +11,7 @@ from typing import Any, Dict
 from meow_base.core.vars import VALID_RECIPE_NAME_CHARS, \
     get_drt_imp_msg
 from meow_base.functionality.validation import check_implementation, \
-    valid_string
+    valid_string, check_type
 
 
 class BaseRecipe:
@@ -23,8 +23,10 @@ class BaseRecipe:
     parameters:Dict[str, Any]
     # Additional configuration options
     requirements:Dict[str, Any]
+    # The priority of jobs created by this recipe, higher is more urgent
+    priority:int
     def __init__(self, name:str, recipe:Any, parameters:Dict[str,Any]={}, 
-            requirements:Dict[str,Any]={}):
+            requirements:Dict[str,Any]={}, priority:int=0):
         """BaseRecipe Constructor. This will check that any class inheriting 
         from it implements its validation functions. It will then call these on
         the input parameters."""
@@ -39,6 +41,8 @@ class BaseRecipe:
         self.parameters = parameters
         self._is_valid_requirements(requirements)
         self.requirements = requirements
+        self._is_valid_priority(priority)
+        self.priority = priority
 
     def __new__(cls, *args, **kwargs):
         """A check that this base class is not instantiated itself, only 
@@ -54,6 +58,12 @@ class BaseRecipe:
         overridden by child classes."""
         valid_string(name, VALID_RECIPE_NAME_CHARS)
 
+    def _is_valid_priority(self, priority:int)->None:
+        """Validation check for 'priority' variable from main constructor. Is 
+        automatically called during initialisation. This does not need to be 
+        overridden by child classes."""
+        check_type(priority, int, hint="BaseRecipe.priority")
+
     def _is_valid_recipe(self, recipe:Any)->None:
         """Validation check for 'recipe' variable from main constructor. Must 
         be implemented by any child class."""
@@ -0,0 +1,100 @@
+
+"""
+This file contains the base MEOW scheduler defintion. This should be inherited
+from for all scheduler instances. Schedulers are used by a runner to decide
+in which order queued jobs are offered to conductors.
+
+Author(s): David Marchant
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List
+
+from meow_base.core.vars import get_drt_imp_msg
+from meow_base.functionality.validation import check_implementation, \
+    check_type
+
+
+class BaseScheduler:
+    # Queued jobs, grouped according to '_get_group_key'. Each group is kept in
+    # the order jobs were added
+    _groups:Dict[Any,Dict[str,Dict[str,Any]]]
+    # The group each queued job directory is within
+    _job_groups:Dict[str,Any]
+    def __init__(self)->None:
+        """BaseScheduler Constructor. This will check that any class
+        inheriting from it implements its validation functions."""
+        check_implementation(type(self)._get_group_key, BaseScheduler)
+        check_implementation(type(self)._get_group_order, BaseScheduler)
+        self._groups = {}
+        self._job_groups = {}
+
+    def __new__(cls, *args, **kwargs):
+        """A check that this base class is not instantiated itself, only
+        inherited from"""
+        if cls is BaseScheduler:
+            msg = get_drt_imp_msg(BaseScheduler)
+            raise TypeError(msg)
+        return object.__new__(cls)
+
+    def __len__(self)->int:
+        return len(self._job_groups)
+
+    def __contains__(self, job_dir:str)->bool:
+        return job_dir in self._job_groups
+
+    def __iter__(self)->Iterator[str]:
+        return self.get_jobs()
+
+    def _get_group_key(self, job:Dict[str,Any])->Any:
+        """Function to determine which group a job is queued within. Must be
+        implemented by any child class."""
+        pass
+
+    def _get_group_order(self, keys:List[Any])->List[Any]:
+        """Function to order the given group keys, with the group to be served
+        first at the start. Must be implemented by any child class."""
+        pass
+
+    def add_job(self, job_dir:str, job:Dict[str,Any])->None:
+        """Function to add a job to the scheduler, along with its metadata."""
+        check_type(job_dir, str, hint="add_job.job_dir")
+        if job_dir in self._job_groups:
+            raise KeyError(f"Job '{job_dir}' is already scheduled.")
+        key = self._get_group_key(job)
+        if key not in self._groups:
+            self._groups[key] = OrderedDict()
+        self._groups[key][job_dir] = job
+        self._job_groups[job_dir] = key
+
+    def remove_job(self, job_dir:str)->Dict[str,Any]:
+        """Function to remove a job from the scheduler. The removed job
+        metadata is returned."""
+        if job_dir not in self._job_groups:
+            raise KeyError(f"Job '{job_dir}' is not scheduled.")
+        key = self._job_groups.pop(job_dir)
+        job = self._groups[key].pop(job_dir)
+        if not self._groups[key]:
+            self._groups.pop(key)
+        return job
+
+    def get_jobs(self)->Iterator[str]:
+        """Function to get all queued job directories, in the order they should
+        be offered to conductors."""
+        for key in self._get_group_order(list(self._groups.keys())):
+            for job_dir in list(self._groups.get(key, {}).keys()):
+                yield job_dir
+
+    def get_job(self, job_dir:str)->Dict[str,Any]:
+        """Function to get the metadata a job was scheduled with."""
+        return self._groups[self._job_groups[job_dir]][job_dir]
+
+    def job_dispatched(self, job_dir:str, job:Dict[str,Any])->None:
+        """Function called by the runner once a job has been removed and given
+        to a conductor. May be overridden by child classes."""
+        pass
+
+    def record_runtime(self, job:Dict[str,Any], runtime:float)->None:
+        """Function called by the runner with the observed runtime of a
+        completed job, in seconds. May be overridden by child classes."""
+        pass
@@ -0,0 +1,290 @@
+
+"""
+This file contains the defintion for the RunnerJournal, an append-only record
+of the events and jobs queued within a MeowRunner. This allows a restarted
+runner to resume with the queues it had before, rather than losing any events
+and jobs it had not yet finished with.
+
+Author(s): David Marchant
+"""
+import io
+import os
+import pickle
+import pickletools
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Tuple, Union
+
+from meow_base.core.rule import Rule
+from meow_base.core.vars import EVENT_RULE
+from meow_base.functionality.validation import check_type, valid_natural, \
+    valid_path
+
+# Journal record types
+JOURNAL_EVENT_ENQUEUE = "event_enqueue"
+JOURNAL_EVENT_DEQUEUE = "event_dequeue"
+JOURNAL_JOB_ENQUEUE = "job_enqueue"
+JOURNAL_JOB_DEQUEUE = "job_dequeue"
+
+# Persistent id type used for rules within journal records
+_JOURNAL_RULE = "rule"
+
+
+class _JournalPickler(pickle.Pickler):
+    """Pickler writing rules as the names of their pattern and recipe. Rule
+    names and registry versions are not kept between runs, but pattern and
+    recipe names are."""
+    def persistent_id(self, obj:Any)->Union[Tuple[str,str,str],None]:
+        if isinstance(obj, Rule):
+            return (_JOURNAL_RULE, obj.pattern.name, obj.recipe.name)
+        return None
+
+
+class _JournalUnpickler(pickle.Unpickler):
+    """Unpickler resolving rules written by _JournalPickler to the rules now
+    in use. Rules that no longer exist are read as None."""
+    def __init__(self, file:Any,
+            find_rule:Callable[[str,str],Union[Rule,None]])->None:
+        super().__init__(file)
+        self._find_rule = find_rule
+
+    def persistent_load(self, pid:Tuple[str,str,str])->Union[Rule,None]:
+        type_tag, pattern_name, recipe_name = pid
+        if type_tag != _JOURNAL_RULE:
+            raise pickle.UnpicklingError(
+                f"Unsupported persistent id '{type_tag}' in journal.")
+        return self._find_rule(pattern_name, recipe_name)
+
+
+class RunnerJournal:
+    # The file the journal is written to
+    filepath:str
+    # Number of records after which the journal is compacted, providing most
+    # of them are no longer needed
+    compact_after:int
+    # Config option, if the journal is synced to disk after every record,
+    # rather than just flushed
+    sync:bool
+    # Events currently queued, keyed by the sequence number they were
+    # journaled with
+    _events:Dict[int,Dict[str,Any]]
+    # The sequence number of each queued event, keyed by the event object id
+    _event_seqs:Dict[int,int]
+    # Jobs currently queued, keyed by job directory
+    _jobs:Dict[str,Dict[str,Any]]
+    # The next event sequence number
+    _next_seq:int
+    # Number of records within the journal file
+    _records:int
+    # Number of records that could not be read and were skipped, when last 
+    # recovered
+    skipped:int
+    # The path a damaged journal was moved to when last recovered, as part of
+    # it could not be read, if any
+    damaged_filepath:Union[str,None]
+    # The open journal file
+    _file:Any
+    # A lock to solve race conditions on the journal file, as events and jobs
+    # are queued from separate threads
+    _lock:Lock
+    def __init__(self, filepath:str, compact_after:int=10000,
+            sync:bool=False)->None:
+        """RunnerJournal Constructor. Each enqueue and dequeue within the
+        runner is appended to the file at the given path. Once there are more
+        than compact_after records, and at least half of them are no longer
+        needed, the file is rewritten with only the currently queued events
+        and jobs. If a journal already exists at the path, it is read when
+        the journal is given to a runner."""
+        valid_path(filepath, hint="RunnerJournal.filepath")
+        self.filepath = filepath
+        valid_natural(compact_after, hint="RunnerJournal.compact_after")
+        self.compact_after = compact_after
+        check_type(sync, bool, hint="RunnerJournal.sync")
+        self.sync = sync
+        self._events = OrderedDict()
+        self._event_seqs = {}
+        self._jobs = OrderedDict()
+        self._next_seq = 0
+        self._records = 0
+        self.skipped = 0
+        self.damaged_filepath = None
+        self._file = None
+        self._lock = Lock()
+
+    def exists(self)->bool:
+        """Function to check if there is a previous journal to recover."""
+        return os.path.exists(self.filepath)
+
+    def recover(self, find_rule:Callable[[str,str],Union[Rule,None]]
+            )->Tuple[Dict[int,Dict[str,Any]],Dict[str,Dict[str,Any]]]:
+        """Function to read any existing journal, returning the events and
+        jobs that were still queued, oldest first. Rules are found using the
+        given function, which is passed a pattern and recipe name. Events whose
+        rule can no longer be found are dropped. Records that cannot be read, 
+        such as if they contain a class that no longer exists, are skipped 
+        and counted in 'skipped'. A partially written final record, such as 
+        from a crash, is ignored. If a record cannot even be read past, the 
+        journal is damaged, so is first moved aside to 'damaged_filepath' 
+        rather than losing whatever follows it. The journal is then 
+        compacted, and opened for further records."""
+        with self._lock:
+            self.skipped = 0
+            self.damaged_filepath = None
+            if self.exists():
+                damaged = False
+                with open(self.filepath, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    while f.tell() < size:
+                        start = f.tell()
+                        try:
+                            record = _JournalUnpickler(f, find_rule).load()
+                        except (EOFError, pickle.UnpicklingError,
+                                AttributeError, ImportError, IndexError,
+                                TypeError, ValueError):
+                            f.seek(start)
+                            if _skip_record(f):
+                                self.skipped += 1
+                                continue
+                            # Only a partially written final record stops 
+                            # before the end of the file is reached
+                            damaged = f.tell() < size
+                            break
+                        self._replay(record)
+                if damaged:
+                    self.damaged_filepath = f"{self.filepath}.damaged"
+                    os.replace(self.filepath, self.damaged_filepath)
+
+            for seq, event in list(self._events.items()):
+                if event.get(EVENT_RULE, None) is None:
+                    self._events.pop(seq)
+                else:
+                    self._event_seqs[id(event)] = seq
+
+            self._compact()
+
+        return OrderedDict(self._events), OrderedDict(self._jobs)
+
+    def _replay(self, record:Tuple[str,Any,Any])->None:
+        """Function to apply a single record read from an existing journal."""
+        record_type, key, payload = record
+        if record_type == JOURNAL_EVENT_ENQUEUE:
+            self._events[key] = payload
+            self._next_seq = max(self._next_seq, key + 1)
+        elif record_type == JOURNAL_EVENT_DEQUEUE:
+            self._events.pop(key, None)
+        elif record_type == JOURNAL_JOB_ENQUEUE:
+            self._jobs[key] = payload
+        elif record_type == JOURNAL_JOB_DEQUEUE:
+            self._jobs.pop(key, None)
+
+    def event_enqueued(self, event:Dict[str,Any])->None:
+        """Function to record that an event has been queued. Events that 
+        cannot be pickled are not recorded."""
+        with self._lock:
+            seq = self._next_seq
+            try:
+                record = _dumps((JOURNAL_EVENT_ENQUEUE, seq, event))
+            except (pickle.PicklingError, AttributeError, TypeError):
+                return
+            self._next_seq += 1
+            self._events[seq] = event
+            self._event_seqs[id(event)] = seq
+            self._append(record)
+
+    def event_dequeued(self, event:Dict[str,Any])->None:
+        """Function to record that a queued event has been removed."""
+        with self._lock:
+            seq = self._event_seqs.pop(id(event), None)
+            if seq is None:
+                return
+            self._events.pop(seq, None)
+            self._append(_dumps((JOURNAL_EVENT_DEQUEUE, seq, None)))
+
+    def job_enqueued(self, job_dir:str, job:Dict[str,Any])->None:
+        """Function to record that a job has been queued. If the job metadata
+        cannot be pickled, such as if it contains a lambda, only the job
+        directory is recorded and the metadata is recovered as None."""
+        with self._lock:
+            self._jobs[job_dir] = job
+            try:
+                record = _dumps((JOURNAL_JOB_ENQUEUE, job_dir, job))
+            except (pickle.PicklingError, AttributeError, TypeError):
+                self._jobs[job_dir] = None
+                record = _dumps((JOURNAL_JOB_ENQUEUE, job_dir, None))
+            self._append(record)
+
+    def job_dequeued(self, job_dir:str)->None:
+        """Function to record that a queued job has been removed."""
+        with self._lock:
+            if job_dir not in self._jobs:
+                return
+            self._jobs.pop(job_dir)
+            self._append(_dumps((JOURNAL_JOB_DEQUEUE, job_dir, None)))
+
+    def close(self)->None:
+        """Function to close the journal file. The journal is left on disk so
+        that it can be recovered later."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _append(self, record:bytes)->None:
+        """Function to write a pickled record to the end of the journal file,
+        compacting the journal if it has grown too large."""
+        if self._file is None:
+            self._file = open(self.filepath, "ab")
+        self._file.write(record)
+        self._flush(self._file)
+        self._records += 1
+
+        live = len(self._events) + len(self._jobs)
+        if self._records > self.compact_after and self._records > 2 * live:
+            self._compact()
+
+    def _compact(self)->None:
+        """Function to rewrite the journal with only the events and jobs that
+        are currently queued. The new journal is written alongside the old one
+        and then moved over it, so a crash part way through loses nothing."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        tmp_path = f"{self.filepath}.tmp"
+        with open(tmp_path, "wb") as f:
+            for seq, event in self._events.items():
+                f.write(_dumps((JOURNAL_EVENT_ENQUEUE, seq, event)))
+            for job_dir, job in self._jobs.items():
+                f.write(_dumps((JOURNAL_JOB_ENQUEUE, job_dir, job)))
+            self._flush(f, sync=True)
+        os.replace(tmp_path, self.filepath)
+
+        self._records = len(self._events) + len(self._jobs)
+        self._file = open(self.filepath, "ab")
+
+    def _flush(self, f:Any, sync:bool=False)->None:
+        f.flush()
+        if sync or self.sync:
+            os.fsync(f.fileno())
+
+def _skip_record(f:Any)->bool:
+    """Function to move a file past the pickled record at its current 
+    position, without loading it. Returns False if the end of the record 
+    could not be found, in which case the file is left wherever reading 
+    stopped."""
+    try:
+        for opcode, _, _ in pickletools.genops(f):
+            if opcode.name == "STOP":
+                return True
+    except ValueError:
+        pass
+    return False
+
+def _dumps(record:Tuple[str,Any,Any])->bytes:
+    """Function to pickle a journal record. Records are pickled in full before
+    being written, so that a failure cannot leave part of one in the journal.
+    """
+    buffer = io.BytesIO()
+    _JournalPickler(buffer, pickle.HIGHEST_PROTOCOL).dump(record)
+    return buffer.getvalue()
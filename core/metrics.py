@@ -0,0 +1,321 @@
+
+"""
+This file contains the defintion for the RunnerMetrics, used by a MeowRunner
+to record how long events and jobs spend at each stage between a file being
+changed and the resulting job finishing, along with how full its queues are.
+
+Author(s): David Marchant
+"""
+import json
+import os
+
+from bisect import bisect_left
+from datetime import datetime
+from threading import Event, Lock, Thread
+from time import time
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from meow_base.core.vars import EVENT_TIME, EVENT_TIMESTAMPS, EVENT_RULE, \
+    TIMESTAMP_RELEASED, TIMESTAMP_MATCHED, TIMESTAMP_ENQUEUED, \
+    TIMESTAMP_DEQUEUED, JOB_EVENT, JOB_RULE, JOB_CREATE_TIME
+from meow_base.functionality.validation import check_type, valid_path
+
+# Job timestamps, following on from the event timestamps
+TIMESTAMP_JOB_CREATED = "job_created"
+TIMESTAMP_JOB_QUEUED = "job_queued"
+TIMESTAMP_JOB_STARTED = "job_started"
+TIMESTAMP_JOB_ENDED = "job_ended"
+
+# Every timestamped stage, in the order they are passed through
+TIMESTAMP_STAGES = [
+    EVENT_TIME,
+    TIMESTAMP_RELEASED,
+    TIMESTAMP_MATCHED,
+    TIMESTAMP_ENQUEUED,
+    TIMESTAMP_DEQUEUED,
+    TIMESTAMP_JOB_CREATED,
+    TIMESTAMP_JOB_QUEUED,
+    TIMESTAMP_JOB_STARTED,
+    TIMESTAMP_JOB_ENDED
+]
+
+# Name of the histogram covering the whole time from event to job end
+LATENCY_TOTAL = "total"
+
+# Default histogram bucket upper bounds, in seconds. These double from 1ms up
+# to just over an hour
+_DEFAULT_BOUNDS = [0.001 * 2 ** i for i in range(23)]
+
+
+class Histogram:
+    # Upper bound of each bucket, in seconds. A final bucket catches anything
+    # above the last bound
+    bounds:List[float]
+    # Number of values within each bucket
+    counts:List[int]
+    # Number of values recorded
+    count:int
+    # Sum of all values recorded
+    total:float
+    # Smallest value recorded
+    min:float
+    # Largest value recorded
+    max:float
+    def __init__(self, bounds:List[float]=None)->None:
+        """Histogram Constructor. Values are counted within fixed buckets, so
+        that any number of values can be recorded in constant memory.
+        Percentiles are therefore approximated to the bucket they fall in."""
+        if bounds is None:
+            bounds = _DEFAULT_BOUNDS
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value:float)->None:
+        """Function to add a value to the histogram."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent:float)->Union[float,None]:
+        """Function to get the approximate value at the given percentile. This
+        is the upper bound of the bucket it falls within, limited to the range
+        of values actually recorded."""
+        if not self.count:
+            return None
+        target = max(1, percent / 100 * self.count)
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                if i == len(self.bounds):
+                    return self.max
+                return max(self.min, min(self.bounds[i], self.max))
+        return self.max
+
+    def to_dict(self)->Dict[str,Any]:
+        """Function to get a JSON serialisable summary of the histogram."""
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "buckets": {
+                **{str(b): c for b, c in zip(self.bounds, self.counts)},
+                "inf": self.counts[-1]
+            }
+        }
+
+
+class RunnerMetrics:
+    # Latency histograms for each rule, keyed by rule name and then by the
+    # stages the latency is between
+    histograms:Dict[str,Dict[str,Histogram]]
+    # Functions returning the current value of each gauge
+    _gauges:Dict[str,Callable[[],Union[int,float]]]
+    # Timestamps of jobs that are queued or running, keyed by job directory
+    _jobs:Dict[str,Tuple[str,Dict[str,float]]]
+    # File the metrics are periodically written to, if any
+    dump_path:str
+    # Time between writes to dump_path, in seconds
+    dump_interval:float
+    # A lock to solve race conditions on the histograms, as they are updated
+    # from both runner threads
+    _lock:Lock
+    def __init__(self, dump_path:str=None, dump_interval:float=60)->None:
+        """RunnerMetrics Constructor. When given to a MeowRunner, latency
+        histograms are kept for each rule, between each stage an event and its
+        resulting jobs pass through, along with gauges of the runner queue
+        sizes. These can be read using snapshot, and if a dump_path is given,
+        they are also written to it as JSON every dump_interval seconds while
+        the runner is running."""
+        if dump_path is not None:
+            valid_path(dump_path, hint="RunnerMetrics.dump_path")
+        self.dump_path = dump_path
+        check_type(dump_interval, float, alt_types=[int],
+            hint="RunnerMetrics.dump_interval")
+        if dump_interval <= 0:
+            raise ValueError("RunnerMetrics.dump_interval must be greater "
+                f"than 0. Got {dump_interval}")
+        self.dump_interval = dump_interval
+        self.histograms = {}
+        self._gauges = {}
+        self._jobs = {}
+        self._lock = Lock()
+        self._stop_event = None
+        self._dump_thread = None
+
+    def add_gauge(self, name:str, gauge:Callable[[],Union[int,float]]
+            )->None:
+        """Function to add a gauge, which is read each time a snapshot is
+        taken."""
+        self._gauges[name] = gauge
+
+    def get_gauges(self)->Dict[str,Union[int,float]]:
+        """Function to get the current value of every gauge."""
+        return {name: gauge() for name, gauge in self._gauges.items()}
+
+    def get_histograms(self, rule:str=None)->Dict[str,Any]:
+        """Function to get the latency histograms, either for every rule or
+        just the given one."""
+        with self._lock:
+            if rule is not None:
+                return dict(self.histograms.get(rule, {}))
+            return {r: dict(h) for r, h in self.histograms.items()}
+
+    def snapshot(self)->Dict[str,Any]:
+        """Function to get a JSON serialisable summary of all metrics."""
+        with self._lock:
+            latencies = {
+                rule: {name: h.to_dict() for name, h in hists.items()}
+                for rule, hists in self.histograms.items()
+            }
+        return {
+            "time": time(),
+            "gauges": self.get_gauges(),
+            "latencies": latencies
+        }
+
+    def event_enqueued(self, event:Dict[str,Any])->None:
+        """Function to timestamp an event as it is added to the runner event
+        queue."""
+        _stamp(event, TIMESTAMP_ENQUEUED)
+
+    def event_dequeued(self, event:Dict[str,Any])->None:
+        """Function to timestamp an event as it is given to a handler, and
+        record the latencies of the stages it has passed through so far."""
+        if not isinstance(event, dict):
+            return
+        stamps = _stamp(event, TIMESTAMP_DEQUEUED)
+        rule = getattr(event.get(EVENT_RULE, None), "name", None)
+        with self._lock:
+            self._record(rule, {EVENT_TIME: event.get(EVENT_TIME, None), 
+                **stamps})
+
+    def job_queued(self, job_dir:str, job:Dict[str,Any])->None:
+        """Function to timestamp a job as it is added to the runner job
+        queue."""
+        event = job.get(JOB_EVENT, {})
+        stamps = {}
+        if isinstance(event, dict):
+            if EVENT_TIME in event:
+                stamps[EVENT_TIME] = event[EVENT_TIME]
+            stamps.update(event.get(EVENT_TIMESTAMPS, {}))
+        created = job.get(JOB_CREATE_TIME, None)
+        if isinstance(created, datetime):
+            stamps[TIMESTAMP_JOB_CREATED] = created.timestamp()
+        stamps[TIMESTAMP_JOB_QUEUED] = time()
+        with self._lock:
+            self._jobs[job_dir] = (job.get(JOB_RULE, None), stamps)
+
+    def job_dispatched(self, job_dir:str)->None:
+        """Function to timestamp a job as it is given to a conductor. This is
+        used as the start time if the job itself does not record one."""
+        with self._lock:
+            if job_dir in self._jobs:
+                self._jobs[job_dir][1][TIMESTAMP_JOB_STARTED] = time()
+
+    def job_completed(self, job_dir:str, ended:float=None)->None:
+        """Function to record the latencies of a job, once the conductor
+        running it has finished. The job is taken to have started when it was
+        dispatched, and to have ended at the given time, or now if none is 
+        given. The job metadata is not read, so that nothing is read from disk
+        whilst jobs are being dispatched."""
+        if ended is None:
+            ended = time()
+        with self._lock:
+            if job_dir not in self._jobs:
+                return
+            rule, stamps = self._jobs.pop(job_dir)
+            stamps[TIMESTAMP_JOB_ENDED] = ended
+            self._record(rule, stamps,
+                first=TIMESTAMP_DEQUEUED, total=True)
+
+    def _record(self, rule:str, stamps:Dict[str,float], first:str=None,
+            total:bool=False)->None:
+        """Function to record the latency between each consecutive pair of
+        stages within the given timestamps. Stages before first are skipped,
+        as they will already have been recorded. If total is set, the latency
+        from the first to the last stage is also recorded."""
+        stages = [s for s in TIMESTAMP_STAGES 
+            if isinstance(stamps.get(s, None), (int, float))]
+        if not stages:
+            return
+        hists = self.histograms.setdefault(rule, {})
+        started = first is None or first not in stages
+        for previous, current in zip(stages, stages[1:]):
+            if previous == first:
+                started = True
+            if not started:
+                continue
+            name = f"{previous}_to_{current}"
+            if name not in hists:
+                hists[name] = Histogram()
+            hists[name].record(max(0.0, stamps[current] - stamps[previous]))
+        if total and len(stages) > 1:
+            if LATENCY_TOTAL not in hists:
+                hists[LATENCY_TOTAL] = Histogram()
+            hists[LATENCY_TOTAL].record(
+                max(0.0, stamps[stages[-1]] - stamps[stages[0]]))
+
+    def dump(self)->None:
+        """Function to write a snapshot to dump_path. The snapshot is written
+        alongside it and then moved over it, so readers never see a partially
+        written file."""
+        if self.dump_path is None:
+            return
+        tmp_path = f"{self.dump_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.dump_path)
+
+    def start(self)->None:
+        """Function to start periodically dumping metrics, if a dump_path was
+        given."""
+        if self.dump_path is None or self._dump_thread is not None:
+            return
+        self._stop_event = Event()
+        self._dump_thread = Thread(
+            target=self._dump_loop,
+            args=(self._stop_event,),
+            daemon=True,
+            name="metrics_thread"
+        )
+        self._dump_thread.start()
+
+    def stop(self)->None:
+        """Function to stop periodically dumping metrics. A final dump is made
+        so the file reflects everything recorded."""
+        if self._dump_thread is None:
+            return
+        self._stop_event.set()
+        self._dump_thread.join()
+        self._dump_thread = None
+        self.dump()
+
+    def _dump_loop(self, stop_event:Event)->None:
+        while not stop_event.wait(self.dump_interval):
+            self.dump()
+
+def _stamp(meow_dict:Dict[str,Any], stage:str)->Dict[str,float]:
+    """Function to add the current time to the timestamps of an event,
+    returning the timestamps. Anything other than a dict is left as is."""
+    if not isinstance(meow_dict, dict):
+        return {}
+    stamps = meow_dict.get(EVENT_TIMESTAMPS, None)
+    if not isinstance(stamps, dict):
+        stamps = {}
+        meow_dict[EVENT_TIMESTAMPS] = stamps
+    stamps[stage] = time()
+    return stamps
@@ -1,12 +1,15 @@
-
 """
 This file contains the MEOW rule defintion.
 
 Author(s): David Marchant
 """
 
+from copy import deepcopy
+from itertools import count
 from sys import modules
-from typing import Any
+from threading import Lock
+from typing import Any, Dict, List, Tuple
+from weakref import WeakValueDictionary
 
 if "BasePattern" not in modules:
     from meow_base.core.base_pattern import BasePattern
@@ -14,10 +17,27 @@ if "BaseRecipe" not in modules:
     from meow_base.core.base_recipe import BaseRecipe
 from meow_base.core.vars import VALID_RULE_NAME_CHARS, \
     get_drt_imp_msg
+from meow_base.functionality.file_io import MeowDumper, MeowLoader
 from meow_base.functionality.validation import valid_string, check_type, \
     check_implementation
 from meow_base.functionality.naming import generate_rule_id
 
+# The yaml tag under which registered rules are written as a reference
+RULE_YAML_TAG = "!meow_rule"
+
+# A registry of the rules held by monitors, keyed by rule name and version. 
+# Registered rules are pickled as a small reference into this, rather than 
+# with their full pattern and recipe. Rules are only weakly held, so are 
+# dropped once no longer used elsewhere unless pinned.
+_rule_registry:Dict[Tuple[str,int],Any] = WeakValueDictionary()
+# Registered rules held strongly whilst references to them are being sent, 
+# along with the number of times each has been pinned
+_pinned_rules:Dict[Tuple[str,int],List[Any]] = {}
+# A lock to solve race conditions on the registry
+_rule_registry_lock = Lock()
+# A source of unique rule versions
+_rule_versions = count()
+
 
 class Rule:
     # A unique identifier for the rule
@@ -26,6 +46,8 @@ class Rule:
     pattern:BasePattern
     # A recipe to be used in rule execution
     recipe:BaseRecipe
+    # A version distinguishing this rule from any other of the same name
+    version:int
     def __init__(self, pattern:BasePattern, recipe:BaseRecipe, name:str=""):
         """Rule Constructor. This will check that any class inheriting 
         from it implements its validation functions. It will then call these on
@@ -42,8 +64,99 @@ class Rule:
             raise ValueError(f"Cannot create Rule {name}. Pattern "
                 f"{pattern.name} does not identify Recipe {recipe.name}. It "
                 f"uses {pattern.recipe}")
+        self.version = next(_rule_versions)
+
+    def __reduce_ex__(self, protocol:int):
+        """Registered rules are pickled as a reference to the rule registry, 
+        so that sending an event does not require pickling the full pattern 
+        and recipe. Any other rule is pickled in full."""
+        if is_registered_rule(self):
+            return (get_registered_rule, (self.name, self.version))
+        return super().__reduce_ex__(protocol)
+
+    def __copy__(self)->"Rule":
+        """Copies are made directly, rather than through the registry 
+        reference used for pickling."""
+        rule = Rule.__new__(Rule)
+        rule.__dict__.update(self.__dict__)
+        return rule
+
+    def __deepcopy__(self, memo:Dict[int,Any])->"Rule":
+        """Deep copies are made directly, rather than through the registry 
+        reference used for pickling. Copies are not themselves registered."""
+        rule = Rule.__new__(Rule)
+        memo[id(self)] = rule
+        for k, v in self.__dict__.items():
+            setattr(rule, k, deepcopy(v, memo))
+        return rule
 
     def _is_valid_name(self, name:str)->None:
         """Validation check for 'name' variable from main constructor. Is 
         automatically called during initialisation."""
         valid_string(name, VALID_RULE_NAME_CHARS)
+
+def register_rule(rule:Rule)->None:
+    """Function to add a rule to the rule registry, so that it is referenced 
+    rather than copied when pickled. It remains registered for as long as it 
+    is used elsewhere, such as within a monitor."""
+    check_type(rule, Rule, hint="register_rule.rule")
+    with _rule_registry_lock:
+        _rule_registry[(rule.name, rule.version)] = rule
+
+def is_registered_rule(rule:Rule)->bool:
+    """Function to check if a rule is within the rule registry."""
+    return _rule_registry.get((rule.name, rule.version), None) is rule
+
+def get_registered_rule(name:str, version:int)->Rule:
+    """Function to get a rule from the rule registry, by its name and 
+    version."""
+    rule = _rule_registry.get((name, version), None)
+    if rule is None:
+        raise KeyError(f"Rule '{name}' (version {version}) is not registered. "
+            "Rules can only be referenced while they still exist within the "
+            "same process.")
+    return rule
+
+def pin_rule(rule:Rule)->None:
+    """Function to keep a registered rule until unpin_rule is called for it, 
+    so that a reference to it sent elsewhere can still be resolved once it is
+    no longer otherwise used. Unregistered rules are pickled in full, so are 
+    not pinned."""
+    key = (rule.name, rule.version)
+    with _rule_registry_lock:
+        if key in _pinned_rules:
+            _pinned_rules[key][1] += 1
+        elif _rule_registry.get(key, None) is rule:
+            _pinned_rules[key] = [rule, 1]
+
+def unpin_rule(rule:Rule)->None:
+    """Function to release a rule previously pinned with pin_rule. Rules that 
+    were not pinned within this process are ignored."""
+    key = (rule.name, rule.version)
+    with _rule_registry_lock:
+        if key not in _pinned_rules:
+            return
+        _pinned_rules[key][1] -= 1
+        if _pinned_rules[key][1] <= 0:
+            del _pinned_rules[key]
+
+def _represent_rule(dumper:MeowDumper, rule:Rule)->Any:
+    """Function to write a registered rule to yaml as a reference, as for 
+    pickling. Any other rule is written in full."""
+    if not is_registered_rule(rule):
+        return dumper.represent_object(rule)
+    return dumper.represent_mapping(RULE_YAML_TAG, 
+        {"name": rule.name, "version": rule.version})
+
+def _construct_rule(loader:MeowLoader, node:Any)->Any:
+    """Function to read a rule reference from yaml. If the rule is no longer 
+    registered, such as when read by another process, the reference is 
+    returned as a dict of the rule name and version."""
+    reference = loader.construct_mapping(node)
+    try:
+        return get_registered_rule(reference["name"], reference["version"])
+    except KeyError:
+        return reference
+
+MeowDumper.add_representer(Rule, _represent_rule)
+MeowLoader.add_constructor(RULE_YAML_TAG, _construct_rule)
@@ -11,21 +11,36 @@ import sys
 import threading
 import subprocess
 
-from multiprocessing import Pipe
-from typing import Any, Union, Dict, List, Type, Tuple
+from collections import deque
+from time import time
+from multiprocessing import Pipe, get_all_start_methods, get_context
+from typing import Any, Union, Dict, List, Type, Tuple, Deque
 
 from meow_base.core.base_conductor import BaseConductor
 from meow_base.core.base_handler import BaseHandler
 from meow_base.core.base_monitor import BaseMonitor
+from meow_base.core.base_scheduler import BaseScheduler
+from meow_base.core.journal import RunnerJournal
+from meow_base.core.metrics import RunnerMetrics
+from meow_base.core.rule import Rule, unpin_rule
 from meow_base.core.vars import DEBUG_WARNING, DEBUG_INFO, \
     VALID_CHANNELS, META_FILE, DEFAULT_JOB_OUTPUT_DIR, DEFAULT_JOB_QUEUE_DIR, \
-    JOB_STATUS, STATUS_QUEUED, DEFAULT_JOB_OUTPUT_DIR_REMOTE, DEFAULT_JOB_QUEUE_DIR_REMOTE
+    JOB_STATUS, STATUS_QUEUED, DEFAULT_JOB_OUTPUT_DIR_REMOTE, \
+    DEFAULT_JOB_QUEUE_DIR_REMOTE, EVENT_TYPE, EVENT_RULE, LOCK_EXT
+from meow_base.core.meow import valid_event
 from meow_base.functionality.validation import check_type, valid_list, \
-    valid_dir_path, check_implementation
+    valid_dir_path, check_implementation, valid_natural
 from meow_base.functionality.debug import setup_debugging, print_debug
-from meow_base.functionality.file_io import make_dir, threadsafe_read_status, \
+from meow_base.functionality.file_io import make_dir, \
     threadsafe_update_status
 from meow_base.functionality.process_io import wait
+from meow_base.schedulers.fifo_scheduler import FifoScheduler
+
+# How often a component process checks if it should stop, in seconds
+_PROCESS_POLL_TIME = 0.1
+# How long a component process is given to stop, in seconds, before it is 
+# terminated
+_PROCESS_STOP_TIMEOUT = 30
 
 
 class MeowRunner:
@@ -43,19 +58,97 @@ class MeowRunner:
     job_queue_dir:str
     # Directory where completed jobs are finally written to
     job_output_dir:str
-    # A queue of all events found by monitors, awaiting handling by handlers
-    event_queue:List[Dict[str,Any]]
-    # A queue of all jobs setup by handlers, awaiting execution by conductors
-    job_queue:List[str]
+    # A queue of all events found by monitors, awaiting handling by handlers. 
+    # Events are bucketed by the key returned by 'get_event_queue_key', so that
+    # handlers need only look at the buckets they are able to process
+    event_queue:Dict[Any,Deque[Dict[str,Any]]]
+    # A record of which event queue buckets each handler can process
+    _handler_event_keys:Dict[BaseHandler,Dict[Any,bool]]
+    # A queue of all jobs setup by handlers, awaiting execution by conductors.
+    # The scheduler also holds the metadata of each queued job, so that job 
+    # files need not be re-read each time a conductor requests a job, and 
+    # decides the order in which jobs are offered to conductors
+    job_queue:BaseScheduler
+    # The job most recently given to each conductor, and when
+    _conductor_jobs:Dict[BaseConductor,Tuple[str,Dict[str,Any],float]]
+    # Config option, if handlers and conductors requesting work when none is 
+    # available are sent it as soon as it arrives, rather than being told to 
+    # poll again
+    push_dispatch:bool
+    # Handlers waiting for an event, along with the channel to reply on
+    _idle_handlers:List[Tuple[VALID_CHANNELS,BaseHandler]]
+    # The event most recently sent to each handler. This is kept until the 
+    # handler asks for another, by which time it has recieved the event, so 
+    # that the rule it references remains registered until then
+    _handler_events:Dict[BaseHandler,Dict[str,Any]]
+    # Conductors waiting for a job, along with the channel to reply on
+    _idle_conductors:List[Tuple[VALID_CHANNELS,BaseConductor]]
+    # Number of queued events at which monitors are throttled, and at or below
+    # which they are unthrottled again. A high water mark of 0 means no limit
+    event_high_water:int
+    event_low_water:int
+    # Number of queued jobs at which handlers stop being given events, and at 
+    # or below which they are given events again. A high water mark of 0 
+    # means no limit
+    job_high_water:int
+    job_low_water:int
+    # The number of events across all event queue buckets
+    _event_count:int
+    # If monitors are currently throttled
+    _events_throttled:bool
+    # If handlers are currently not being given events
+    _jobs_throttled:bool
+    # A journal of all queued events and jobs, if used
+    journal:RunnerJournal
+    # A record of latencies and queue sizes, if used
+    metrics:RunnerMetrics
+    # Config option, if monitors, handlers and conductors are each run within
+    # their own process, rather than as threads within this one
+    multiprocess:bool
+    # The process each component is running within, along with the event 
+    # used to stop it, if running in multiprocess mode
+    _processes:Dict[Any,Tuple[Any,Any]]
+    # The names of the gauges of each monitor running within its own process,
+    # along with the shared values its process last reported for them
+    _monitor_gauges:Dict[BaseMonitor,Tuple[List[str],Any]]
     def __init__(self, monitors:Union[BaseMonitor,List[BaseMonitor]], 
             handlers:Union[BaseHandler,List[BaseHandler]], 
             conductors:Union[BaseConductor,List[BaseConductor]],
             job_queue_dir:str=DEFAULT_JOB_QUEUE_DIR,
             job_output_dir:str=DEFAULT_JOB_OUTPUT_DIR,
-            print:Any=sys.stdout, logging:int=0)->None:
+            print:Any=sys.stdout, logging:int=0, 
+            push_dispatch:bool=False, scheduler:BaseScheduler=None,
+            event_high_water:int=0, event_low_water:int=None,
+            job_high_water:int=0, job_low_water:int=None,
+            journal:RunnerJournal=None, multiprocess:bool=False,
+            metrics:RunnerMetrics=None)->None:
         """MeowRunner constructor. This connects all provided monitors, 
         handlers and conductors according to what events and jobs they produce 
-        or consume."""
+        or consume. If push_dispatch is set, requests for work that cannot be 
+        met immediately are held by the runner and answered as soon as 
+        suitable work arrives, instead of being answered with a 1. A scheduler
+        may be provided to decide the order in which queued jobs are offered 
+        to conductors. If not provided, jobs are offered oldest first. High 
+        and low water marks may be given to bound the event and job queues. 
+        Once the event queue reaches its high water mark, monitors are told to 
+        hold onto new events until it has drained to its low water mark. Once
+        the job queue reaches its high water mark, handlers are not given 
+        events until it has drained to its low water mark. Low water marks 
+        default to half of the high water mark. If a journal is provided, all 
+        changes to the event and job queues are recorded within it. If the 
+        journal already exists, the queues are resumed from it. Monitors are 
+        given the resumed events, so that they are not sent a second time by
+        the check of existing files made when monitors are started. If 
+        multiprocess is set, each monitor, handler and conductor is started 
+        within its own forked process, so that they are not limited by 
+        sharing one interpreter. Note that in this case, any changes made to 
+        a component after the runner is started are not seen by its process, 
+        so monitors raise a RuntimeWarning if their patterns or recipes are 
+        changed until the runner is stopped. If metrics are provided, events 
+        and jobs are timestamped as they pass through the runner, and the 
+        resulting latencies and queue sizes are recorded within them, along 
+        with any gauges reported by the monitors. In multiprocess mode, these
+        are reported by each monitor process through shared memory."""
 
         self._is_valid_job_queue_dir(job_queue_dir)
         self._is_valid_job_output_dir(job_output_dir)
@@ -73,6 +166,12 @@ class MeowRunner:
             monitor_to_runner_reader, monitor_to_runner_writer = Pipe()
             monitor.to_runner_event = monitor_to_runner_writer
             self.event_connections.append((monitor_to_runner_reader, monitor))
+            # Don't react to the runner's own files, should they be monitored
+            monitor.add_excludes([
+                os.path.abspath(job_queue_dir), 
+                os.path.abspath(job_output_dir), 
+                "*" + LOCK_EXT
+            ])
 
         self._is_valid_handlers(handlers)
         # If handlers isn't a list, make it one
@@ -114,19 +213,81 @@ class MeowRunner:
         self._stop_han_con_pipe = Pipe()
         self._han_con_worker = None
 
+        # Create channel to tell monitor/handler thread that the job queue has 
+        # drained, so any waiting handlers can be sent events
+        self._resume_mon_han_pipe = Pipe()
+
         # Setup debugging
         self._print_target, self.debug_level = setup_debugging(print, logging)
 
         # Setup queues
-        self.event_queue = []
-        self.job_queue = []
+        self.event_queue = {}
+        self._handler_event_keys = {handler:{} for handler in self.handlers}
+        if scheduler is None:
+            scheduler = FifoScheduler()
+        check_type(scheduler, BaseScheduler, hint="MeowRunner.scheduler")
+        self.job_queue = scheduler
+        self._conductor_jobs = {}
+
+        # Setup dispatch
+        check_type(push_dispatch, bool, hint="MeowRunner.push_dispatch")
+        self.push_dispatch = push_dispatch
+        self._idle_handlers = []
+        self._handler_events = {}
+        self._idle_conductors = []
+
+        # Setup queue bounds
+        self.event_high_water, self.event_low_water = \
+            self._is_valid_water_marks(event_high_water, event_low_water, 
+                "event")
+        self.job_high_water, self.job_low_water = \
+            self._is_valid_water_marks(job_high_water, job_low_water, "job")
+        self._event_count = 0
+        self._events_throttled = False
+        self._jobs_throttled = False
+
+        # Setup processes
+        check_type(multiprocess, bool, hint="MeowRunner.multiprocess")
+        if multiprocess and "fork" not in get_all_start_methods():
+            raise ValueError("MeowRunner.multiprocess requires processes to "
+                "be started by forking, which is not supported on this "
+                "platform.")
+        self.multiprocess = multiprocess
+        self._processes = {}
+        self._monitor_gauges = {}
+
+        # Setup metrics
+        if metrics is not None:
+            check_type(metrics, RunnerMetrics, hint="MeowRunner.metrics")
+            metrics.add_gauge("event_queue", lambda: self._event_count)
+            metrics.add_gauge("job_queue", lambda: len(self.job_queue))
+            metrics.add_gauge("running_jobs", 
+                lambda: len(self._conductor_jobs))
+            metrics.add_gauge("idle_handlers", 
+                lambda: len(self._idle_handlers))
+            metrics.add_gauge("idle_conductors", 
+                lambda: len(self._idle_conductors))
+            for monitor in self.monitors:
+                for gauge in monitor.get_gauges():
+                    metrics.add_gauge(f"{monitor.name}.{gauge}", 
+                        lambda m=monitor, g=gauge: self._get_monitor_gauge(
+                            m, g))
+        self.metrics = metrics
+
+        # Setup journal, resuming the queues of any previous run
+        self.journal = None
+        if journal is not None:
+            check_type(journal, RunnerJournal, hint="MeowRunner.journal")
+            self._recover_journal(journal)
+        self.journal = journal
 
     def run_monitor_handler_interaction(self)->None:
         """Function to be run in its own thread, to handle any inbound messages
         from monitors. These will be events, which should be matched to an 
         appropriate handler and handled."""
         all_inputs = [i[0] for i in self.event_connections] \
-                     + [self._stop_mon_han_pipe[0]]
+                     + [self._stop_mon_han_pipe[0]] \
+                     + [self._resume_mon_han_pipe[0]]
         while True:
             ready = wait(all_inputs)
 
@@ -134,39 +295,159 @@ class MeowRunner:
             if self._stop_mon_han_pipe[0] in ready:
                 return
             else:
+                # If the job queue has drained, then serve waiting handlers
+                if self._resume_mon_han_pipe[0] in ready:
+                    self._resume_mon_han_pipe[0].recv()
+                    self._push_events()
                 for connection, component in self.event_connections:
                     if connection not in ready:
                         continue
                     message = connection.recv()
 
-                    # Recieved an event
+                    # Recieved an event, or a batch of them
                     if isinstance(component, BaseMonitor):
-                        self.event_queue.append(message)
+                        if not isinstance(message, list):
+                            message = [message]
+                        for event in message:
+                            # The rule was pinned by the monitor until it 
+                            # could be resolved here
+                            if isinstance(event, dict) and isinstance(
+                                    event.get(EVENT_RULE), Rule):
+                                unpin_rule(event[EVENT_RULE])
+                            self._enqueue_event(event)
+                        self._push_events()
                         continue
                     # Recieved a request for an event
                     if isinstance(component, BaseHandler):
-                        valid = False
-                        for event in self.event_queue:
-                            try:
-                                valid, _ = component.valid_handle_criteria(event)
-                            except Exception as e:
-                                print_debug(
-                                    self._print_target, 
-                                    self.debug_level, 
-                                    "Could not determine validity of "
-                                    f"event for handler {component.name}. {e}", 
-                                    DEBUG_INFO
-                                )
-                            
-                            if valid:
-                                self.event_queue.remove(event)
-                                connection.send(event)
-                                break
-                        
-                        # If nothing valid then send a message
-                        if not valid:
+                        self._handler_events.pop(component, None)
+                        event = None
+                        # Don't create more jobs if there are already too many
+                        if not self._jobs_throttled:
+                            event = self._dequeue_event(component)
+                        if event is not None:
+                            self._handler_events[component] = event
+                            connection.send(event)
+                        # If nothing valid then wait for something to arrive
+                        elif self.push_dispatch:
+                            self._idle_handlers.append((connection, component))
+                        # Otherwise send a message
+                        else:
                             connection.send(1)
 
+    def _push_events(self)->None:
+        """Function to send queued events to any idle handlers that can 
+        process them. Handlers are served in the order they became idle."""
+        for idle in list(self._idle_handlers):
+            if not self.event_queue or self._jobs_throttled:
+                return
+            connection, handler = idle
+            event = self._dequeue_event(handler)
+            if event is not None:
+                self._idle_handlers.remove(idle)
+                self._handler_events[handler] = event
+                connection.send(event)
+
+    def _enqueue_event(self, event:Dict[str,Any])->None:
+        """Function to add an event to the appropriate bucket of the event 
+        queue."""
+        if self.metrics:
+            self.metrics.event_enqueued(event)
+        key = get_event_queue_key(event)
+        if key not in self.event_queue:
+            self.event_queue[key] = deque()
+        self.event_queue[key].append(event)
+        self._event_count += 1
+        if self.journal:
+            self.journal.event_enqueued(event)
+
+        if self.event_high_water and not self._events_throttled \
+                and self._event_count >= self.event_high_water:
+            self._events_throttled = True
+            for monitor in self.monitors:
+                monitor.throttle()
+            print_debug(self._print_target, self.debug_level, 
+                f"Event queue reached {self._event_count} events, throttling "
+                "monitors", DEBUG_INFO)
+
+    def _dequeue_event(self, handler:BaseHandler)->Union[Dict[str,Any],None]:
+        """Function to remove and return the oldest event within a bucket the 
+        given handler can process. Whether or not a handler can process a 
+        bucket is determined from the first event within it, and then 
+        remembered. The full handle criteria are still checked for every event 
+        before it is returned. If no such event is found, None is returned."""
+        known_keys = self._handler_event_keys.setdefault(handler, {})
+        for key, bucket in list(self.event_queue.items()):
+            # Events that could not be bucketed must all be checked directly
+            if key is None:
+                event = self._search_event_bucket(handler, bucket)
+            else:
+                if known_keys.get(key, True) is False:
+                    continue
+                event = bucket[0]
+                valid = self._check_handle_criteria(handler, event)
+                if key not in known_keys:
+                    known_keys[key] = valid
+                if valid:
+                    bucket.popleft()
+                elif known_keys[key]:
+                    # The head was rejected despite the bucket being 
+                    # compatible, so fall back to checking the rest of it
+                    event = self._search_event_bucket(handler, bucket)
+                else:
+                    event = None
+
+            if not bucket:
+                self.event_queue.pop(key)
+            if event is not None:
+                self._event_dequeued(event)
+                return event
+        return None
+
+    def _event_dequeued(self, event:Dict[str,Any])->None:
+        """Function to update the count of queued events once one has been 
+        removed, unthrottling monitors if the queue has drained enough."""
+        self._event_count -= 1
+        if self.journal:
+            self.journal.event_dequeued(event)
+        if self.metrics:
+            self.metrics.event_dequeued(event)
+        if self._events_throttled \
+                and self._event_count <= self.event_low_water:
+            self._events_throttled = False
+            for monitor in self.monitors:
+                monitor.unthrottle()
+            print_debug(self._print_target, self.debug_level, 
+                f"Event queue drained to {self._event_count} events, "
+                "unthrottling monitors", DEBUG_INFO)
+
+    def _search_event_bucket(self, handler:BaseHandler, 
+            bucket:Deque[Dict[str,Any]])->Union[Dict[str,Any],None]:
+        """Function to linearly search an event queue bucket for the first 
+        event the given handler can process. Any found event is removed from 
+        the bucket."""
+        for event in bucket:
+            if self._check_handle_criteria(handler, event):
+                bucket.remove(event)
+                return event
+        return None
+
+    def _check_handle_criteria(self, handler:BaseHandler, 
+            event:Dict[str,Any])->bool:
+        """Function to check if a given handler can process a given event, 
+        treating any errors as the handler not being able to."""
+        try:
+            valid, _ = handler.valid_handle_criteria(event)
+            return valid
+        except Exception as e:
+            print_debug(
+                self._print_target, 
+                self.debug_level, 
+                "Could not determine validity of "
+                f"event for handler {handler.name}. {e}", 
+                DEBUG_INFO
+            )
+        return False
+
     def run_handler_conductor_interaction(self)->None:
         """Function to be run in its own thread, to handle any inbound messages
         from handlers. These will be jobs, which should be matched to an 
@@ -188,52 +469,164 @@ class MeowRunner:
 
                     # Recieved a job
                     if isinstance(component, BaseHandler):
-                        self.job_queue.append(message)
-                        threadsafe_update_status(
-                            {
-                                JOB_STATUS: STATUS_QUEUED
-                            },
-                            os.path.join(message, META_FILE)
-                        )
+                        self._enqueue_job(message)
+                        self._push_jobs()
                         continue
                     # Recieved a request for a job
                     if isinstance(component, BaseConductor):
-                        valid = False
-                        print(f"Got request for job")
-                        for job_dir in self.job_queue:
-                            try:
-                                metafile = os.path.join(job_dir, META_FILE)
-                                job = threadsafe_read_status(metafile)
-                            except Exception as e:
-                                print_debug(
-                                    self._print_target, 
-                                    self.debug_level, 
-                                    "Could not load necessary job definitions "
-                                    f"for job at '{job_dir}'. {e}", 
-                                    DEBUG_INFO
-                                )
-
-                            try:
-                                valid, _ = component.valid_execute_criteria(job)
-                            except Exception as e:
-                                print_debug(
-                                    self._print_target, 
-                                    self.debug_level, 
-                                    "Could not determine validity of "
-                                    f"job for conductor {component.name}. {e}", 
-                                    DEBUG_INFO
-                                )
-                            
-                            if valid:
-                                self.job_queue.remove(job_dir)
-                                connection.send(job_dir)
-                                break
-
-                        # If nothing valid then send a message
-                        if not valid:
+                        self._record_runtime(component)
+                        job_dir = self._dequeue_job(component)
+                        if job_dir is not None:
+                            connection.send(job_dir)
+                        # If nothing valid then wait for something to arrive
+                        elif self.push_dispatch:
+                            self._idle_conductors.append(
+                                (connection, component))
+                        # Otherwise send a message
+                        else:
                             connection.send(1)
 
+    def _push_jobs(self)->None:
+        """Function to send queued jobs to any idle conductors that can 
+        execute them. Conductors are served in the order they became idle."""
+        for idle in list(self._idle_conductors):
+            if not self.job_queue:
+                return
+            connection, conductor = idle
+            job_dir = self._dequeue_job(conductor)
+            if job_dir is not None:
+                self._idle_conductors.remove(idle)
+                connection.send(job_dir)
+
+    def _enqueue_job(self, job_dir:str, job:Dict[str,Any]=None)->None:
+        """Function to add a job to the job queue, marking it as queued. The 
+        updated job metadata is kept by the scheduler at this point so that it 
+        need not be read again while the job is waiting in the queue. Jobs 
+        whose metadata cannot be read are not queued. If the job metadata is 
+        provided, the job is assumed to already be marked as queued."""
+        try:
+            if job is None:
+                job = threadsafe_update_status(
+                    {
+                        JOB_STATUS: STATUS_QUEUED
+                    },
+                    os.path.join(job_dir, META_FILE)
+                )
+            self.job_queue.add_job(job_dir, job)
+            if self.journal:
+                self.journal.job_enqueued(job_dir, job)
+            if self.metrics:
+                self.metrics.job_queued(job_dir, job)
+        except Exception as e:
+            print_debug(
+                self._print_target, 
+                self.debug_level, 
+                "Could not load necessary job definitions "
+                f"for job at '{job_dir}'. {e}", 
+                DEBUG_WARNING
+            )
+            return
+
+        if self.job_high_water and not self._jobs_throttled \
+                and len(self.job_queue) >= self.job_high_water:
+            self._jobs_throttled = True
+            print_debug(self._print_target, self.debug_level, 
+                f"Job queue reached {len(self.job_queue)} jobs, pausing "
+                "event handling", DEBUG_INFO)
+
+    def _dequeue_job(self, conductor:BaseConductor)->Union[str,None]:
+        """Function to remove and return the first job, in the order given by 
+        the scheduler, that the given conductor can execute. If no such job is 
+        found, None is returned."""
+        for job_dir in self.job_queue.get_jobs():
+            job = self.job_queue.get_job(job_dir)
+            try:
+                valid, _ = conductor.valid_execute_criteria(job)
+            except Exception as e:
+                print_debug(
+                    self._print_target, 
+                    self.debug_level, 
+                    "Could not determine validity of "
+                    f"job for conductor {conductor.name}. {e}", 
+                    DEBUG_INFO
+                )
+                valid = False
+
+            if valid:
+                self.job_queue.remove_job(job_dir)
+                self.job_queue.job_dispatched(job_dir, job)
+                self._conductor_jobs[conductor] = (job_dir, job, time())
+                self._job_dequeued(job_dir)
+                return job_dir
+        return None
 
+    def _job_dequeued(self, job_dir:str)->None:
+        """Function to check if handlers can be given events again once a job 
+        has been removed from the job queue."""
+        if self.journal:
+            self.journal.job_dequeued(job_dir)
+        if self.metrics:
+            self.metrics.job_dispatched(job_dir)
+        if self._jobs_throttled \
+                and len(self.job_queue) <= self.job_low_water:
+            self._jobs_throttled = False
+            # Handlers may be waiting for events within the other thread
+            self._resume_mon_han_pipe[1].send(1)
+            print_debug(self._print_target, self.debug_level, 
+                f"Job queue drained to {len(self.job_queue)} jobs, resuming "
+                "event handling", DEBUG_INFO)
+
+    def _record_runtime(self, conductor:BaseConductor)->None:
+        """Function to inform the scheduler, and any metrics, of how long the 
+        job last given to a conductor took. As conductors execute jobs one at 
+        a time, a new request from a conductor means its previous job has 
+        finished."""
+        if conductor in self._conductor_jobs:
+            job_dir, job, dispatched = self._conductor_jobs.pop(conductor)
+            ended = time()
+            self.job_queue.record_runtime(job, ended - dispatched)
+            if self.metrics:
+                self.metrics.job_completed(job_dir, ended=ended)
+
+    def _recover_journal(self, journal:RunnerJournal)->None:
+        """Function to resume the event and job queues from a journal. Jobs 
+        whose directories no longer exist are not resumed. Monitors are 
+        given the recovered events, so that they can skip them when checking
+        existing files against their rules on starting."""
+        events, jobs = journal.recover(self._find_rule)
+        for event in events.values():
+            self._enqueue_event(event)
+        for monitor in self.monitors:
+            monitor.skip_recovered_events(list(events.values()))
+        for job_dir, job in jobs.items():
+            if not os.path.exists(job_dir):
+                journal.job_dequeued(job_dir)
+                continue
+            self._enqueue_job(job_dir, job=job)
+
+        if journal.skipped:
+            print_debug(self._print_target, self.debug_level, 
+                f"Skipped {journal.skipped} unreadable records in journal at "
+                f"'{journal.filepath}'", DEBUG_WARNING)
+        if journal.damaged_filepath:
+            print_debug(self._print_target, self.debug_level, 
+                f"Journal at '{journal.filepath}' is damaged, so could not be "
+                f"fully recovered. It has been kept at "
+                f"'{journal.damaged_filepath}'", DEBUG_WARNING)
+        print_debug(self._print_target, self.debug_level, 
+            f"Recovered {len(events)} events and {len(self.job_queue)} jobs "
+            f"from journal at '{journal.filepath}'", DEBUG_INFO)
+
+    def _find_rule(self, pattern_name:str, recipe_name:str
+            )->Union[Rule,None]:
+        """Function to find the rule within the monitors created from the 
+        given pattern and recipe, if there is one."""
+        for monitor in self.monitors:
+            for rule in monitor._rules.values():
+                if rule.pattern.name == pattern_name \
+                        and rule.recipe.name == recipe_name:
+                    return rule
+        return None
 
     def start(self)->None:
         """Function to start the runner by starting all of the constituent 
@@ -241,15 +634,18 @@ class MeowRunner:
         threads."""
         # Start all monitors
         for monitor in self.monitors:
-            monitor.start()
+            self._start_component(monitor)
 
         # Start all handlers
         for handler in self.handlers:
-            handler.start()
+            self._start_component(handler)
 
         # Start all conductors
         for conductor in self.conductors:
-            conductor.start()
+            self._start_component(conductor)
+
+        if self.metrics:
+            self.metrics.start()
         
         # If we've not started the monitor/handler interaction thread yet, then
         # do so
@@ -292,15 +688,15 @@ class MeowRunner:
 
         # Stop all the monitors
         for monitor in self.monitors:
-            monitor.stop()
+            self._stop_component(monitor)
 
         # Stop all handlers, if they need it
         for handler in self.handlers:
-            handler.stop()
+            self._stop_component(handler)
 
         # Stop all conductors, if they need it
         for conductor in self.conductors:
-            conductor.stop()
+            self._stop_component(conductor)
 
         # If we've started the monitor/handler interaction thread, then stop it
         if self._mon_han_worker is None:
@@ -327,6 +723,78 @@ class MeowRunner:
         print_debug(self._print_target, self.debug_level, 
             "Job conductor thread stopped", DEBUG_INFO)
 
+        if self.journal:
+            self.journal.close()
+
+        if self.metrics:
+            self.metrics.stop()
+
+    def _start_component(self, 
+            component:Union[BaseMonitor,BaseHandler,BaseConductor])->None:
+        """Function to start a monitor, handler or conductor. In multiprocess 
+        mode this is done within a new process, forked from this one so that 
+        the component keeps its channels to the runner."""
+        if not self.multiprocess:
+            component.start()
+            return
+
+        context = get_context("fork")
+        gauges = None
+        if isinstance(component, BaseMonitor):
+            # The runner must be able to throttle the monitor from this process
+            component._throttled = context.Event()
+            # And to read its gauges, as this process only has a copy of it
+            names = list(component.get_gauges())
+            gauges = (names, context.Array("d", len(names), lock=False))
+            self._monitor_gauges[component] = gauges
+        stop_event = context.Event()
+        process = context.Process(
+            target=run_component_process,
+            args=(component, stop_event, gauges),
+            daemon=True,
+            name=f"{component.name}_process"
+        )
+        process.start()
+        self._processes[component] = (process, stop_event)
+        if isinstance(component, BaseMonitor):
+            component._runs_elsewhere = True
+        print_debug(self._print_target, self.debug_level, 
+            f"Started {component.name} in process {process.pid}", DEBUG_INFO)
+
+    def _stop_component(self, 
+            component:Union[BaseMonitor,BaseHandler,BaseConductor])->None:
+        """Function to stop a monitor, handler or conductor. In multiprocess 
+        mode the component process is asked to stop, and terminated if it 
+        does not do so in time."""
+        if component not in self._processes:
+            component.stop()
+            return
+
+        process, stop_event = self._processes.pop(component)
+        stop_event.set()
+        process.join(_PROCESS_STOP_TIMEOUT)
+        if process.is_alive():
+            msg = f"Process for {component.name} did not stop, terminating."
+            print_debug(self._print_target, self.debug_level, 
+                msg, DEBUG_WARNING)
+            process.terminate()
+            process.join()
+        if isinstance(component, BaseMonitor):
+            component._runs_elsewhere = False
+
+    def _get_monitor_gauge(self, monitor:BaseMonitor, gauge:str
+            )->Union[int,float]:
+        """Function to get the current value of a monitor gauge. In 
+        multiprocess mode this is the value last reported by the monitor 
+        process, as the monitor within this process is never started."""
+        if monitor in self._monitor_gauges:
+            names, gauges = self._monitor_gauges[monitor]
+            if gauge not in names:
+                return 0
+            value = gauges[names.index(gauge)]
+            return int(value) if value.is_integer() else value
+        return monitor.get_gauges().get(gauge, 0)
+
     def get_monitor_by_name(self, queried_name:str)->BaseMonitor:
         """Gets a runner monitor with a name matching the queried name. Note 
         in the case of multiple monitors having the same name, only the first 
@@ -417,6 +885,21 @@ class MeowRunner:
         if type(conductors) == list:
             valid_list(conductors, BaseConductor, min_length=1)
 
+    def _is_valid_water_marks(self, high_water:int, low_water:int, 
+            queue:str)->Tuple[int,int]:
+        """Validation check for the water mark variables from main constructor.
+        Returns the high and low water marks, with the low water mark filled in
+        if not provided."""
+        valid_natural(high_water, hint=f"MeowRunner.{queue}_high_water")
+        if low_water is None:
+            low_water = high_water // 2
+        valid_natural(low_water, hint=f"MeowRunner.{queue}_low_water")
+        if high_water and low_water >= high_water:
+            raise ValueError(f"MeowRunner.{queue}_low_water must be less than "
+                f"MeowRunner.{queue}_high_water. Got {low_water} and "
+                f"{high_water}.")
+        return high_water, low_water
+
     def _is_valid_job_queue_dir(self, job_queue_dir)->None:
         """Validation check for 'job_queue_dir' variable from main 
         constructor."""
@@ -430,3 +913,44 @@ class MeowRunner:
         valid_dir_path(job_output_dir, must_exist=False)
         if not os.path.exists(job_output_dir):
             make_dir(job_output_dir)
+
+def run_component_process(
+        component:Union[BaseMonitor,BaseHandler,BaseConductor], 
+        stop_event:Any, gauges:Tuple[List[str],Any]=None)->None:
+    """Function run within each component process in multiprocess mode. The 
+    component is started as it would be within the runner process, and stopped 
+    once the stop event is set. If given shared gauges, a monitor reports its
+    gauges to them each time it checks if it should stop."""
+    component.start()
+    _report_gauges(component, gauges)
+    while not stop_event.wait(_PROCESS_POLL_TIME):
+        # Monitors are unthrottled from the runner process, so must send on 
+        # any events held in this process themselves
+        if isinstance(component, BaseMonitor) \
+                and not component._throttled.is_set():
+            component._start_release()
+        _report_gauges(component, gauges)
+    component.stop()
+    _report_gauges(component, gauges)
+
+def _report_gauges(component:Union[BaseMonitor,BaseHandler,BaseConductor], 
+        gauges:Tuple[List[str],Any])->None:
+    """Function to write the current values of the named gauges of a monitor
+    to the shared array read by the runner process."""
+    if gauges is None:
+        return
+    names, shared = gauges
+    values = component.get_gauges()
+    for i, name in enumerate(names):
+        shared[i] = values.get(name, 0)
+
+def get_event_queue_key(event:Dict[str,Any])->Any:
+    """Function to get the key an event is queued under within the runner. 
+    This is the event type and recipe type, as this is what handlers use to 
+    determine if they can process an event. Events which cannot be keyed in 
+    this way are given a key of None."""
+    try:
+        valid_event(event)
+        return (event[EVENT_TYPE], type(event[EVENT_RULE].recipe))
+    except Exception:
+        return None
@@ -40,12 +40,23 @@ VALID_CHANNELS = Union[Connection,Queue]
 # hashing
 HASH_BUFFER_SIZE = 65536
 SHA256 = "sha256"
+SHA256_MMAP = "sha256_mmap"
+BLAKE2B = "blake2b"
+FINGERPRINT = "fingerprint"
 
 # meow events
 EVENT_TYPE = "event_type"
 EVENT_PATH = "event_path"
 EVENT_RULE = "event_rule"
 EVENT_TIME = "event_time"
+EVENT_TIMESTAMPS = "event_timestamps"
+
+# event timestamps, recording when an event passed each stage after being 
+# first seen at EVENT_TIME
+TIMESTAMP_RELEASED = "released"
+TIMESTAMP_MATCHED = "matched"
+TIMESTAMP_ENQUEUED = "enqueued"
+TIMESTAMP_DEQUEUED = "dequeued"
 
 # inotify events
 FILE_CREATE_EVENT = "file_created"
@@ -129,6 +140,7 @@ JOB_END_TIME = "end"
 JOB_ERROR = "error"
 JOB_REQUIREMENTS = "requirements"
 JOB_PARAMETERS = "parameters"
+JOB_PRIORITY = "priority"
 
 # job statuses
 STATUS_CREATING = "creating"
@@ -18,6 +18,17 @@ from meow_base.core.vars import JOB_END_TIME, JOB_ERROR, JOB_STATUS, \
 from meow_base.functionality.validation import valid_path
 
 
+class MeowDumper(yaml.Dumper):
+    """A yaml dumper to which MEOW types may add their own representations, 
+    without changing how yaml writes them elsewhere."""
+    pass
+
+class MeowLoader(yaml.Loader):
+    """A yaml loader to which MEOW types may add their own constructors, 
+    without changing how yaml reads them elsewhere."""
+    pass
+
+
 def make_dir(path:str, can_exist:bool=True, ensure_clean:bool=False):
     """
     Creates a new directory at the given path.
@@ -83,7 +94,7 @@ def read_yaml(filepath:str):
     :return: (object) An object read from the file.
     """
     with open(filepath, 'r') as yaml_file:
-        return yaml.load(yaml_file, Loader=yaml.Loader)
+        return yaml.load(yaml_file, Loader=MeowLoader)
 
 def write_yaml(source:Any, filename:str):
     """
@@ -96,7 +107,8 @@ def write_yaml(source:Any, filename:str):
     :return: No return
     """
     with open(filename, 'w') as param_file:
-        yaml.dump(source, param_file, default_flow_style=False)
+        yaml.dump(source, param_file, Dumper=MeowDumper, 
+            default_flow_style=False)
 
 
 def threadsafe_read_status(filepath:str):
@@ -127,7 +139,10 @@ def threadsafe_write_status(source:dict[str,Any], filepath:str):
 
     lock_handle.close()
 
-def threadsafe_update_status(updates:dict[str,Any], filepath:str):
+def threadsafe_update_status(updates:dict[str,Any], filepath:str
+        )->Dict[str,Any]:
+    """Updates the status file at the given path with the given updates, 
+    respecting any final values already present. Returns the updated status."""
     lock_path = filepath + LOCK_EXT
     lock_handle = open(lock_path, 'a')
     fcntl.flock(lock_handle.fileno(), fcntl.LOCK_EX)
@@ -161,6 +176,8 @@ def threadsafe_update_status(updates:dict[str,Any], filepath:str):
 
     lock_handle.close()
 
+    return status
+
 def read_notebook(filepath:str):
     valid_path(filepath, extension="ipynb")
     with open(filepath, 'r') as read_file:
@@ -1,70 +1,335 @@
 """
-This file contains functions for taking hashes of data and files.
+This file contains functions for taking hashes of data and files, along with
+a cache of file hashes so that unchanged files need not be hashed again.
 
 Author(s): David Marchant
 """
 
-from hashlib import sha256
-from os import listdir
-from os.path import isfile
+import sqlite3
 
+from collections import OrderedDict
+from hashlib import blake2b, sha256
+from mmap import mmap, ACCESS_READ
+from os import fstat, getpid, listdir, stat
+from os.path import isfile
+from threading import Lock
+from time import time, time_ns
+from typing import Any, Callable, Dict, List, Tuple, Union
 
-from meow_base.core.vars import HASH_BUFFER_SIZE, SHA256
+from meow_base.core.vars import HASH_BUFFER_SIZE, SHA256, SHA256_MMAP, \
+    BLAKE2B, FINGERPRINT
 from meow_base.functionality.validation import check_type, \
-    valid_existing_file_path, valid_existing_dir_path
+    valid_existing_file_path, valid_existing_dir_path, valid_natural, \
+    valid_path
+
+# Size of each block read when taking a fingerprint, and the number of blocks
+# sampled between the first and last
+FINGERPRINT_BLOCK_SIZE = 1024 * 1024
+FINGERPRINT_SAMPLES = 16
+
+# Seconds since a file was last modified before it is mapped into memory to
+# be hashed, as files modified more recently may still be being written
+MMAP_MIN_AGE = 10
+
+# Default most hashes a HashCache holds in memory
+DEFAULT_HASH_CACHE_SIZE = 10000
+
+# Seconds before being hashed within which a file must not have been modified
+# for a HashCache to keep its hash. Depending on the granularity of the file 
+# system, further changes to a file modified more recently may not alter its 
+# modification time
+HASH_CACHE_RACY_TIME = 2
+
+# Number of hashes written to a HashCache store between commits
+_HASH_CACHE_COMMIT_INTERVAL = 100
+
+def _read_digest(file_to_hash:Any, hasher:Any)->None:
+    while True:
+        buffer = file_to_hash.read(HASH_BUFFER_SIZE)
+        if not buffer:
+            break
+        hasher.update(buffer)
+
+def _get_file_digest(file_path:str, hasher:Any)->str:
+    with open(file_path, 'rb') as file_to_hash:
+        _read_digest(file_to_hash, hasher)
+    
+    return hasher.hexdigest()
 
 def _get_file_sha256(file_path:str)->str:
+    return _get_file_digest(file_path, sha256())
+
+def _get_file_blake2b(file_path:str)->str:
+    return _get_file_digest(file_path, blake2b())
+
+def _get_file_sha256_mmap(file_path:str)->str:
+    """Function to take the SHA256 hash of a file by mapping it into memory, 
+    so that it is passed to hashlib without being copied into python. This 
+    gives the same hash as _get_file_sha256. Reading past the end of a mapped
+    file, such as one truncated whilst being written, raises SIGBUS, which 
+    kills the process rather than raising an exception. Files are therefore
+    only mapped once they have not been modified for MMAP_MIN_AGE seconds, 
+    and are otherwise read as with _get_file_sha256. Files which are seen to 
+    change size whilst mapped raise an OSError, rather than giving a hash of 
+    neither version."""
     sha256_hash = sha256()
-    
+
     with open(file_path, 'rb') as file_to_hash:
-        while True:
-            buffer = file_to_hash.read(HASH_BUFFER_SIZE)
-            if not buffer:
-                break
-            sha256_hash.update(buffer)
-    
+        before = fstat(file_to_hash.fileno())
+        # Empty files cannot be mapped, and recently modified files may 
+        # still be being written, so both are read instead
+        if not before.st_size or time() - before.st_mtime < MMAP_MIN_AGE:
+            _read_digest(file_to_hash, sha256_hash)
+        else:
+            with mmap(file_to_hash.fileno(), 0, access=ACCESS_READ) as mapped:
+                sha256_hash.update(mapped)
+            if fstat(file_to_hash.fileno()).st_size != before.st_size:
+                raise OSError(f"File '{file_path}' changed size whilst being "
+                    "hashed.")
+
     return sha256_hash.hexdigest()
 
+def _get_file_fingerprint(file_path:str)->str:
+    """Function to take a fast fingerprint of a file, being a BLAKE2b hash of 
+    its size along with its first and last blocks and a number of blocks 
+    evenly spaced in between. Small files are hashed in full. Note that 
+    changes to a large file outside of the sampled blocks that do not alter 
+    its size will not change the fingerprint."""
+    fingerprint = blake2b()
+
+    with open(file_path, 'rb') as file_to_hash:
+        size = fstat(file_to_hash.fileno()).st_size
+        fingerprint.update(str(size).encode())
+
+        sampled = (FINGERPRINT_SAMPLES + 2) * FINGERPRINT_BLOCK_SIZE
+        if size <= sampled:
+            fingerprint.update(file_to_hash.read())
+        else:
+            last = size - FINGERPRINT_BLOCK_SIZE
+            for i in range(FINGERPRINT_SAMPLES + 2):
+                file_to_hash.seek(last * i // (FINGERPRINT_SAMPLES + 1))
+                fingerprint.update(file_to_hash.read(FINGERPRINT_BLOCK_SIZE))
+
+    return fingerprint.hexdigest()
+
 # TODO update this to be a bit more robust
+def _get_dir_digest(dir_path:str, hasher:Any)->str:
+    buffer = str(listdir(dir_path)).encode()
+    hasher.update(buffer)
+
+    return hasher.hexdigest()
+
 def _get_dir_sha256(dir_path:str)->str:
-    sha256_hash = sha256()
+    return _get_dir_digest(dir_path, sha256())
 
-    buffer = str(listdir(dir_path)).encode()
-    sha256_hash.update(buffer)
+def _get_dir_blake2b(dir_path:str)->str:
+    return _get_dir_digest(dir_path, blake2b())
 
-    return sha256_hash.hexdigest()
+# Functions to hash files and directories, keyed by hash type
+_HASH_TYPES:Dict[str,Tuple[Callable[[str],str],Callable[[str],str]]] = {
+    SHA256: (_get_file_sha256, _get_dir_sha256),
+    SHA256_MMAP: (_get_file_sha256_mmap, _get_dir_sha256),
+    BLAKE2B: (_get_file_blake2b, _get_dir_blake2b),
+    FINGERPRINT: (_get_file_fingerprint, _get_dir_blake2b)
+}
 
-def get_file_hash(file_path:str, hash:str, hint:str="")->str:
-    check_type(hash, str, hint=hint)
+def register_hash_type(hash:str, file_hash:Callable[[str],str], 
+        dir_hash:Callable[[str],str])->None:
+    """Function to add a new type of hash, which can then be used by name 
+    throughout. Each function is given a path, and should return the hash of 
+    the file or directory at it as a string. Existing types may be replaced."""
+    check_type(hash, str, hint="register_hash_type.hash")
+    if not callable(file_hash) or not callable(dir_hash):
+        raise TypeError("Hash functions given to register_hash_type must be "
+            "callable.")
+    _HASH_TYPES[hash] = (file_hash, dir_hash)
 
-    valid_existing_file_path(file_path)
+def get_hash_types()->List[str]:
+    """Function to get the names of every type of hash that can be used."""
+    return list(_HASH_TYPES.keys())
 
-    valid_hashes = {
-        SHA256: _get_file_sha256
-    }
-    if hash not in valid_hashes:
+def _get_hash_functions(hash:str, hint:str=""
+        )->Tuple[Callable[[str],str],Callable[[str],str]]:
+    check_type(hash, str, hint=hint)
+
+    if hash not in _HASH_TYPES:
         raise KeyError(f"Cannot use hash '{hash}'. Valid are "
-            f"'{list(valid_hashes.keys())}")
+            f"'{list(_HASH_TYPES.keys())}")
+
+    return _HASH_TYPES[hash]
+
+def get_file_hash(file_path:str, hash:str, hint:str="")->str:
+    file_hash, _ = _get_hash_functions(hash, hint=hint)
+
+    valid_existing_file_path(file_path)
 
-    return valid_hashes[hash](file_path)
+    return file_hash(file_path)
 
 # TODO inspect this a bit more fully 
 def get_dir_hash(file_path:str, hash:str, hint:str="")->str:
-    check_type(hash, str, hint=hint)
+    _, dir_hash = _get_hash_functions(hash, hint=hint)
 
     valid_existing_dir_path(file_path)
 
-    valid_hashes = {
-        SHA256: _get_dir_sha256
-    }
-    if hash not in valid_hashes:
-        raise KeyError(f"Cannot use hash '{hash}'. Valid are "
-            f"'{list(valid_hashes.keys())}")
-
-    return valid_hashes[hash](file_path)
+    return dir_hash(file_path)
 
 def get_hash(path:str, hash:str, hint:str="")->str:
     if isfile(path):
         return get_file_hash(path, hash, hint=hint)
     else:
         return get_dir_hash(path, hash, hint=hint)
+
+
+class HashCache:
+    # Most hashes held in memory, past which the least recently used are 
+    # forgotten. These may still be within the store, if one is used
+    capacity:int
+    # A sqlite database hashes are also stored within, if any, so that they 
+    # are kept between runs
+    filepath:str
+    # Hashes held in memory, keyed by the device, inode and hash type of the 
+    # file, with the size and modification time the hash was taken at
+    _entries:Dict[Tuple[int,int,str],Tuple[int,int,str]]
+    # Number of hashes found within the cache, and number that were not
+    hits:int
+    misses:int
+    # A lock to solve race conditions, as files may be hashed from many 
+    # threads at once
+    _lock:Lock
+    def __init__(self, capacity:int=DEFAULT_HASH_CACHE_SIZE, 
+            filepath:str=None)->None:
+        """HashCache Constructor. This is used to avoid rehashing files that 
+        have not changed since they were last hashed. Files are identified by 
+        their device and inode, so are still found if moved, and a hash is 
+        only reused if the size and modification time of the file are the 
+        same as when it was taken. Files modified within HASH_CACHE_RACY_TIME 
+        seconds of being hashed are not cached, as they could be changed 
+        again without their modification time changing too. If a filepath is
+        given, hashes are also kept within a sqlite database at that path, so
+        are not lost when the cache is recreated. Directories are not cached,
+        as their hashes are cheap to take."""
+        valid_natural(capacity, hint="HashCache.capacity")
+        self.capacity = capacity
+        if filepath is not None:
+            valid_path(filepath, hint="HashCache.filepath")
+        self.filepath = filepath
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._db = None
+        self._db_pid = None
+        self._uncommitted = 0
+
+    def __len__(self)->int:
+        return len(self._entries)
+
+    def get_hash(self, path:str, hash:str, hint:str="")->str:
+        """Function to get the hash of a file or directory, as with get_hash, 
+        but reusing any hash already taken of an unchanged file."""
+        if not isfile(path):
+            return get_dir_hash(path, hash, hint=hint)
+
+        before = stat(path)
+        key = (before.st_dev, before.st_ino, hash)
+        version = (before.st_size, before.st_mtime_ns)
+        with self._lock:
+            cached = self._lookup(key, version)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        started = time_ns()
+        digest = get_file_hash(path, hash, hint=hint)
+
+        # Only keep the hash if the file was not changed whilst being read, 
+        # and was not changed so recently that it could be again unnoticed
+        after = stat(path)
+        if (after.st_dev, after.st_ino, after.st_size, after.st_mtime_ns) \
+                == (before.st_dev, before.st_ino, *version) \
+                and before.st_mtime_ns \
+                    < started - HASH_CACHE_RACY_TIME * 1000000000:
+            with self._lock:
+                self._remember(key, version, digest, store=True)
+        return digest
+
+    def flush(self)->None:
+        """Function to write any hashes not yet committed to the store."""
+        with self._lock:
+            if self._db is not None and self._db_pid == getpid():
+                self._db.commit()
+                self._uncommitted = 0
+
+    def close(self)->None:
+        """Function to flush and close the store, if one is used. It will be 
+        reopened if the cache is used again."""
+        self.flush()
+        with self._lock:
+            if self._db is not None and self._db_pid == getpid():
+                self._db.close()
+            self._db = None
+
+    def _lookup(self, key:Tuple[int,int,str], version:Tuple[int,int]
+            )->Union[str,None]:
+        """Function to find a hash taken of the given version of a file, 
+        first within memory and then within the store."""
+        entry = self._entries.get(key, None)
+        if entry is not None and entry[:2] == version:
+            self._entries.move_to_end(key)
+            return entry[2]
+
+        db = self._get_db()
+        if db is None:
+            return None
+        row = db.execute(
+            "SELECT digest FROM hashes WHERE device=? AND inode=? AND "
+            "hash=? AND size=? AND mtime=?", 
+            (*key, *version)
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, version, row[0])
+        return row[0]
+
+    def _remember(self, key:Tuple[int,int,str], version:Tuple[int,int], 
+            digest:str, store:bool=False)->None:
+        """Function to add a hash to memory, evicting the least recently used 
+        if past capacity, and to the store if requested."""
+        if self.capacity:
+            self._entries[key] = (*version, digest)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+        if store:
+            db = self._get_db()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO hashes "
+                    "(device, inode, hash, size, mtime, digest) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", 
+                    (*key, *version, digest)
+                )
+                self._uncommitted += 1
+                if self._uncommitted >= _HASH_CACHE_COMMIT_INTERVAL:
+                    db.commit()
+                    self._uncommitted = 0
+
+    def _get_db(self)->Union[sqlite3.Connection,None]:
+        """Function to get the connection to the store, opening it if needed. 
+        Connections are not shared with forked processes, so a new one is 
+        opened within each process."""
+        if self.filepath is None:
+            return None
+        if self._db is None or self._db_pid != getpid():
+            self._db = sqlite3.connect(self.filepath, 
+                check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS hashes (device INTEGER, "
+                "inode INTEGER, hash TEXT, size INTEGER, mtime INTEGER, "
+                "digest TEXT, PRIMARY KEY (device, inode, hash))"
+            )
+            self._db_pid = getpid()
+            self._uncommitted = 0
+        return self._db
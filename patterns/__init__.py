@@ -1,2 +1,3 @@
 
 from .file_event_pattern import FileEventPattern, WatchdogMonitor
+from .polling_file_monitor import PollingFileMonitor
@@ -5,32 +5,40 @@ along with an appropriate monitor for said events.
 
 Author(s): David Marchant
 """
-import glob
+import json
 import threading
 import sys
 import os
 
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from fnmatch import translate
-from re import match
-from time import time, sleep
-from typing import Any, Union, Dict, List
+from glob import escape
+from hashlib import sha256
+from heapq import heapify, heappop, heappush
+from itertools import count
+from re import Pattern, compile as compile_regex
+from time import time
+from typing import Any, Union, Dict, Iterator, List, Set, Tuple
+from weakref import WeakKeyDictionary
 from watchdog.observers import Observer
-from watchdog.events import PatternMatchingEventHandler
+from watchdog.events import PatternMatchingEventHandler, EVENT_TYPE_CLOSED
 
 from meow_base.core.base_recipe import BaseRecipe
-from meow_base.core.base_monitor import BaseMonitor
+from meow_base.core.base_monitor import BaseMonitor, DEFAULT_BATCH_TIME
 from meow_base.core.base_pattern import BasePattern
 from meow_base.core.meow import EVENT_KEYS, valid_meow_dict
 from meow_base.core.rule import Rule
 from meow_base.functionality.validation import check_type, valid_string, \
-    valid_dict, valid_list, valid_dir_path
+    valid_dict, valid_list, valid_dir_path, valid_natural, valid_path
 from meow_base.core.vars import VALID_RECIPE_NAME_CHARS, \
     VALID_VARIABLE_NAME_CHARS, FILE_EVENTS, FILE_CREATE_EVENT, \
     FILE_MODIFY_EVENT, FILE_MOVED_EVENT, DEBUG_INFO, DIR_EVENTS, \
     FILE_RETROACTIVE_EVENT, SHA256, VALID_PATH_CHARS, FILE_CLOSED_EVENT, \
-    DIR_RETROACTIVE_EVENT
+    DIR_RETROACTIVE_EVENT, EVENT_PATH, EVENT_RULE, EVENT_TIME, EVENT_TYPE, \
+    EVENT_TIMESTAMPS, TIMESTAMP_RELEASED, TIMESTAMP_MATCHED, DEBUG_WARNING
 from meow_base.functionality.debug import setup_debugging, print_debug
-from meow_base.functionality.hashing import get_hash
+from meow_base.functionality.hashing import HashCache, get_hash_types
 from meow_base.functionality.meow import create_event
 
 # Events that are monitored by default
@@ -42,6 +50,24 @@ _DEFAULT_MASK = [
     FILE_CLOSED_EVENT
 ]
 
+# Default most paths a WatchdogEventHandler will wait on to settle at once
+DEFAULT_MAX_SETTLING = 100000
+
+# Default shortest and longest time a WatchdogEventHandler settling 
+# adaptively waits for a path to stop changing, in seconds
+DEFAULT_MIN_SETTLETIME = 0.01
+DEFAULT_MAX_SETTLETIME = 60
+
+# Default number of threads used by a WatchdogMonitor to hash matched files
+DEFAULT_HASH_WORKERS = 4
+
+# Default time between a WatchdogSnapshot being written, in seconds
+DEFAULT_SNAPSHOT_INTERVAL = 60
+
+# Most files per hashing thread that a retroactive scan will have waiting to 
+# be hashed, before it waits for them to catch up
+_RETROACTIVE_PENDING_PER_WORKER = 64
+
 # watchdog events
 EVENT_TYPE_WATCHDOG = "watchdog"
 WATCHDOG_BASE = "monitor_base"
@@ -81,19 +107,40 @@ class FileEventPattern(BasePattern):
     triggering_file:str
     # Which types of event the pattern responds to
     event_mask:List[str]
+    # The type of hash taken of triggering files
+    hash_type:str
+    # The shortest and longest time to wait for triggering files to stop 
+    # changing, when settling adaptively. If None, the monitor's are used
+    min_settletime:float
+    max_settletime:float
     def __init__(self, name:str, triggering_path:str, recipe:str, 
             triggering_file:str, event_mask:List[str]=_DEFAULT_MASK, 
             parameters:Dict[str,Any]={}, outputs:Dict[str,Any]={}, 
-            sweep:Dict[str,Any]={}):
+            sweep:Dict[str,Any]={}, priority:int=0, hash_type:str=SHA256,
+            min_settletime:float=None, max_settletime:float=None):
         """FileEventPattern Constructor. This is used to match against file 
-        system events, as caught by the python watchdog module."""
-        super().__init__(name, recipe, parameters, outputs, sweep)
+        system events, as caught by the python watchdog module. The 
+        hash_type may be any registered with the hashing functionality, such 
+        as a fingerprint for large files that would be slow to hash fully. 
+        Note that sha256_mmap only maps files not recently modified, and 
+        otherwise reads them as sha256 does, as truncating a mapped file 
+        whilst it is hashed kills the process.
+        If the monitor settles events adaptively, min_settletime and 
+        max_settletime override its bounds for files matching this pattern, 
+        such as to wait longer for files written slowly over a network."""
+        super().__init__(name, recipe, parameters, outputs, sweep, 
+            priority=priority)
         self._is_valid_triggering_path(triggering_path)
         self.triggering_path = triggering_path
         self._is_valid_triggering_file(triggering_file)
         self.triggering_file = triggering_file
         self._is_valid_event_mask(event_mask)
         self.event_mask = event_mask
+        self._is_valid_hash_type(hash_type)
+        self.hash_type = hash_type
+        self._is_valid_settletimes(min_settletime, max_settletime)
+        self.min_settletime = min_settletime
+        self.max_settletime = max_settletime
 
     def _is_valid_triggering_path(self, triggering_path:str)->None:
         """Validation check for 'triggering_path' variable from main 
@@ -177,11 +224,399 @@ class FileEventPattern(BasePattern):
                 raise ValueError(f"Invalid event mask '{mask}'. Valid are: "
                     f"{FILE_EVENTS + DIR_EVENTS}")
 
+    def _is_valid_hash_type(self, hash_type:str)->None:
+        """Validation check for 'hash_type' variable from main 
+        constructor."""
+        check_type(hash_type, str, hint="FileEventPattern.hash_type")
+        if hash_type not in get_hash_types():
+            raise ValueError(f"Invalid hash type '{hash_type}'. Valid are: "
+                f"{get_hash_types()}")
+
+    def _is_valid_settletimes(self, min_settletime:float, 
+            max_settletime:float)->None:
+        """Validation check for 'min_settletime' and 'max_settletime' 
+        variables from main constructor."""
+        _valid_settletimes(min_settletime, max_settletime, 
+            "FileEventPattern", or_none=True)
+
     def _is_valid_sweep(self, sweep: Dict[str,Union[int,float,complex]]) -> None:
         """Validation check for 'sweep' variable from main constructor."""
         return super()._is_valid_sweep(sweep)
 
 
+def _valid_settletimes(min_settletime:float, max_settletime:float, 
+        hint:str, or_none:bool=False)->None:
+    """Checks that a shortest and longest settle time are valid. Both must be
+    greater than 0, with the longest no shorter than the shortest. If or_none
+    is set, either may be None instead."""
+    for settletime, name in [(min_settletime, "min_settletime"),
+            (max_settletime, "max_settletime")]:
+        if or_none and settletime is None:
+            continue
+        check_type(settletime, float, alt_types=[int], 
+            hint=f"{hint}.{name}")
+        if settletime <= 0:
+            raise ValueError(f"{hint}.{name} must be greater than 0. Got "
+                f"{settletime}")
+    if min_settletime is not None and max_settletime is not None \
+            and max_settletime < min_settletime:
+        raise ValueError(f"{hint}.max_settletime cannot be less than "
+            f"min_settletime. Got {max_settletime} and {min_settletime}")
+
+
+class _RuleIndexNode:
+    """A single node within a RulePathIndex, for one literal path segment."""
+    __slots__ = ("children", "rules", "owner")
+    def __init__(self, owner:object)->None:
+        # Child nodes, keyed by the next path segment
+        self.children:Dict[str,_RuleIndexNode] = {}
+        # Rules whose literal path prefix ends at this node, keyed by event 
+        # type and then rule name. Each is stored with the order it was added
+        # and its compiled triggering path
+        self.rules:Dict[str,Dict[str,Tuple[int,Rule,Pattern]]] = {}
+        # The token of the index that may change this node in place
+        self.owner = owner
+
+    def copy(self, owner:object)->"_RuleIndexNode":
+        """Function to copy this node for another owner. The children are 
+        shared, and so are copied in turn only if they are changed."""
+        copied = _RuleIndexNode(owner)
+        copied.children = dict(self.children)
+        copied.rules = {event_type: dict(rules) 
+            for event_type, rules in self.rules.items()}
+        return copied
+
+
+class RulePathIndex:
+    # The node for the empty path prefix
+    _root:_RuleIndexNode
+    # The literal prefix segments and event mask each rule was indexed with, 
+    # keyed by rule name
+    _entries:Dict[str,Tuple[List[str],List[str]]]
+    # Count of rules added, used to keep matches in the order rules were added
+    _added:int
+    # Token marking the nodes this index may change in place. Any other 
+    # nodes are shared with another index, and are copied before changing
+    _token:object
+    def __init__(self)->None:
+        """RulePathIndex Constructor. This indexes FileEventPattern rules by
+        the literal directories at the start of their triggering paths, and 
+        by their event masks. Each triggering path is compiled once as it is 
+        added, so that a path is only tested against the rules whose literal 
+        prefix it starts with, and whose mask includes the event type. Note 
+        that changes are not threadsafe, so an index in use by other threads 
+        should be copied, changed and then swapped in, rather than changed 
+        directly. Copies share their nodes, so only the nodes along the 
+        literal prefix of a changed rule are copied when it is changed."""
+        self._token = object()
+        self._root = _RuleIndexNode(self._token)
+        self._entries = {}
+        self._added = 0
+
+    def __len__(self)->int:
+        return len(self._entries)
+
+    def __contains__(self, rule_name:str)->bool:
+        return rule_name in self._entries
+
+    def copy(self)->"RulePathIndex":
+        """Function to copy the index, such that changes to the copy do not 
+        affect the original. All nodes are shared by the two, until either 
+        changes them. The rules and compiled paths within it are shared."""
+        copied = RulePathIndex()
+        copied._root = self._root
+        copied._entries = dict(self._entries)
+        copied._added = self._added
+        # Neither index may now change the shared nodes in place
+        self._token = object()
+        return copied
+
+    def _own(self, node:_RuleIndexNode)->_RuleIndexNode:
+        """Function to get a node this index may change in place, copying the
+        given node if it is shared."""
+        if node.owner is self._token:
+            return node
+        return node.copy(self._token)
+
+    def _own_path(self, prefix:List[str])->List[_RuleIndexNode]:
+        """Function to get the nodes along a literal prefix, starting from the
+        root, such that this index may change each of them in place. Missing 
+        nodes are created."""
+        self._root = self._own(self._root)
+        nodes = [self._root]
+        for segment in prefix:
+            child = nodes[-1].children.get(segment, None)
+            if child is None:
+                child = _RuleIndexNode(self._token)
+            else:
+                child = self._own(child)
+            nodes[-1].children[segment] = child
+            nodes.append(child)
+        return nodes
+
+    def add(self, rule:Rule)->None:
+        """Function to add a rule to the index, replacing any existing rule of
+        the same name."""
+        if rule.name in self._entries:
+            self.remove(rule.name)
+        prefix = _get_literal_prefix(rule.pattern.triggering_path)
+        regex = compile_regex(translate(rule.pattern.triggering_path))
+        node = self._own_path(prefix)[-1]
+        mask = list(rule.pattern.event_mask)
+        for event_type in mask:
+            node.rules.setdefault(event_type, {})[rule.name] = \
+                (self._added, rule, regex)
+        self._entries[rule.name] = (prefix, mask)
+        self._added += 1
+
+    def remove(self, rule_name:str)->None:
+        """Function to remove a rule from the index. Any nodes left without 
+        rules or children are removed with it."""
+        if rule_name not in self._entries:
+            return
+        prefix, mask = self._entries.pop(rule_name)
+        nodes = self._own_path(prefix)
+        for event_type in mask:
+            rules = nodes[-1].rules.get(event_type, {})
+            rules.pop(rule_name, None)
+            if not rules:
+                nodes[-1].rules.pop(event_type, None)
+        for i in range(len(prefix), 0, -1):
+            if nodes[i].rules or nodes[i].children:
+                break
+            nodes[i - 1].children.pop(prefix[i - 1])
+
+    def get_matches(self, path:str, event_types:List[str])->List[Rule]:
+        """Function to get every rule with a triggering path matching the 
+        given path, relative to the monitor base, and which respond to any of
+        the given event types. Rules are returned in the order they were 
+        added."""
+        found = {}
+        node = self._root
+        segments = path.split(os.path.sep)
+        for i in range(len(segments) + 1):
+            for event_type in event_types:
+                for name, entry in node.rules.get(event_type, {}).items():
+                    if name not in found and entry[2].match(path):
+                        found[name] = entry
+            if i == len(segments):
+                break
+            node = node.children.get(segments[i], None)
+            if node is None:
+                break
+        return [entry[1] for entry in sorted(found.values(), 
+            key=lambda e: e[0])]
+
+    def may_match_within(self, path:str)->bool:
+        """Function to determine if any rule could match a path within the 
+        given directory, relative to the monitor base. This is used to skip 
+        directories no rule could be triggered by."""
+        node = self._root
+        if node.rules:
+            return True
+        for segment in path.split(os.path.sep) if path else []:
+            node = node.children.get(segment, None)
+            if node is None:
+                return False
+            if node.rules:
+                return True
+        return bool(node.children)
+
+def _get_hash_type(rule:Rule)->str:
+    """Function to get the type of hash taken of files triggering a rule."""
+    return getattr(rule.pattern, "hash_type", SHA256)
+
+def _get_literal_prefix(triggering_path:str)->List[str]:
+    """Function to get the directories at the start of a triggering path that 
+    contain no wildcards. Any path matching the triggering path must start 
+    with these same directories."""
+    prefix = []
+    for segment in triggering_path.split(os.path.sep):
+        if any(c in segment for c in "*?["):
+            break
+        prefix.append(segment)
+    return prefix
+
+
+class WatchdogSnapshot:
+    # The file the snapshot is written to
+    filepath:str
+    # Config option, the least time between the snapshot being written 
+    # whilst events are recorded, in seconds
+    interval:float
+    # The size and modification time of each path when it last triggered a 
+    # rule, and the hash sent for each rule it triggered, keyed by pattern 
+    # and recipe name, and a digest of their definitions
+    _entries:Dict[str,Tuple[int,int,Dict[Tuple[str,str,str],str]]]
+    # How each rule is identified within the entries, kept so that the 
+    # digests of its definitions are only calculated once
+    _rule_keys:WeakKeyDictionary
+    # If there are recorded events not yet written
+    _changed:bool
+    # The last time the snapshot was written
+    _saved:float
+    # A lock to solve race conditions, as events are recorded from many 
+    # hashing threads at once
+    _lock:threading.Lock
+    # A lock so that only one thread writes the snapshot at once
+    _save_lock:threading.Lock
+    def __init__(self, filepath:str, 
+            interval:float=DEFAULT_SNAPSHOT_INTERVAL)->None:
+        """WatchdogSnapshot Constructor. This records which rules have already
+        been triggered by each path, so that a restarted WatchdogMonitor only 
+        sends retroactive events for files that are new or have changed. The 
+        snapshot is written to the given path when the monitor stops, and at 
+        most every interval seconds whilst events are recorded. Rules are 
+        identified by their pattern and recipe names, as rule names are not 
+        kept between runs, along with a digest of the pattern and recipe, so 
+        that changing either is not mistaken for the rule already having 
+        been triggered. If a snapshot already exists at the path, it is read 
+        immediately."""
+        valid_path(filepath, hint="WatchdogSnapshot.filepath")
+        self.filepath = filepath
+        check_type(interval, float, alt_types=[int], 
+            hint="WatchdogSnapshot.interval")
+        if interval < 0:
+            raise ValueError("WatchdogSnapshot.interval cannot be negative. "
+                f"Got {interval}")
+        self.interval = interval
+        self._entries = {}
+        self._rule_keys = WeakKeyDictionary()
+        self._changed = False
+        self._saved = time()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if os.path.exists(filepath):
+            with open(filepath, "r") as f:
+                for path, (size, mtime, fired) in json.load(f).items():
+                    self._entries[path] = (size, mtime, 
+                        {tuple(key): h for *key, h in fired})
+
+    def __len__(self)->int:
+        return len(self._entries)
+
+    def is_unchanged(self, path:str, rule:Rule)->bool:
+        """Function to check if a path has already triggered a rule, and has 
+        the same size and modification time as it did then."""
+        with self._lock:
+            entry = self._entries.get(path, None)
+        if entry is None or self._get_rule_key(rule) not in entry[2]:
+            return False
+        return _get_version(path) == entry[:2]
+
+    def get_hash(self, path:str, rule:Rule)->Union[str,None]:
+        """Function to get the hash last sent for a path triggering a rule, if
+        it has done so."""
+        with self._lock:
+            entry = self._entries.get(path, None)
+        if entry is None:
+            return None
+        return entry[2].get(self._get_rule_key(rule), None)
+
+    def record(self, path:str, rule:Rule, file_hash:str, 
+            version:Tuple[int,int])->None:
+        """Function to record that an event has been sent for a path 
+        triggering a rule. The version is the size and modification time of 
+        the path, as from '_get_version', taken before it was hashed, so that 
+        a newer version is never paired with an older hash. The snapshot is 
+        written if it has not been for at least the interval, unless another 
+        thread is already writing it."""
+        key = self._get_rule_key(rule)
+        with self._lock:
+            entry = self._entries.get(path, None)
+            if entry is None or entry[:2] != version:
+                entry = (*version, {})
+                self._entries[path] = entry
+            entry[2][key] = file_hash
+            self._changed = True
+            due = time() - self._saved >= self.interval
+        if due:
+            self._save(wait=False)
+
+    def forget(self, path:str)->None:
+        """Function to remove a path from the snapshot, such as once it has 
+        been deleted."""
+        with self._lock:
+            if self._entries.pop(path, None) is not None:
+                self._changed = True
+
+    def save(self)->None:
+        """Function to write the snapshot, if anything has been recorded since
+        it was last written."""
+        self._save()
+
+    def _save(self, wait:bool=True)->None:
+        """Function to write the snapshot. The entries are copied whilst 
+        holding the lock, but written without it, so that events can still be
+        recorded meanwhile. It is written alongside the old one and then moved
+        over it, so a crash part way through loses nothing. If not waiting, 
+        nothing is written if another thread is already writing."""
+        if not self._save_lock.acquire(blocking=wait):
+            return
+        try:
+            with self._lock:
+                self._saved = time()
+                if not self._changed:
+                    return
+                contents = {path: [size, mtime, 
+                        [[*key, h] for key, h in fired.items()]] 
+                    for path, (size, mtime, fired) in self._entries.items()}
+                self._changed = False
+            tmp_path = f"{self.filepath}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(contents, f)
+            os.replace(tmp_path, self.filepath)
+        finally:
+            self._save_lock.release()
+
+    def _get_rule_key(self, rule:Rule)->Tuple[str,str,str]:
+        """Function to get how a rule is identified within the snapshot."""
+        with self._lock:
+            key = self._rule_keys.get(rule, None)
+        if key is None:
+            key = (rule.pattern.name, rule.recipe.name, 
+                _get_definition_digest(rule))
+            with self._lock:
+                self._rule_keys[rule] = key
+        return key
+
+def _compile_excludes(excludes:List[str])->Union[Pattern,None]:
+    """Function to compile globs of excluded paths into a single regular 
+    expression, matching each path and anything within it."""
+    if not excludes:
+        return None
+    return compile_regex("|".join(translate(glob) 
+        for exclude in excludes 
+        for glob in [exclude, os.path.join(exclude, "*")]))
+
+def _get_version(path:str)->Union[Tuple[int,int],None]:
+    """Function to get the size and modification time of a path, as recorded
+    within a WatchdogSnapshot, or None if it cannot be read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+def _get_recovered_key(path:str, rule:Rule, 
+        version:Union[Tuple[int,int],None])->Tuple[Any,...]:
+    """Function to get what identifies an event resumed from a journal to a 
+    WatchdogMonitor. This is the event type, path and rule, along with the 
+    size and modification time of the path."""
+    return (EVENT_TYPE_WATCHDOG, path, rule.name, version)
+
+def _get_definition_digest(rule:Rule)->str:
+    """Function to get a digest of the pattern and recipe a rule was created 
+    from. Anything within them that cannot be written as JSON is included by 
+    its repr."""
+    definitions = [vars(rule.pattern), vars(rule.recipe)]
+    try:
+        written = json.dumps(definitions, sort_keys=True, default=repr)
+    except TypeError:
+        written = repr(definitions)
+    return sha256(written.encode()).hexdigest()
+
+
 class WatchdogMonitor(BaseMonitor):
     # A handler object, to catch events
     event_handler:PatternMatchingEventHandler
@@ -193,27 +628,97 @@ class WatchdogMonitor(BaseMonitor):
     debug_level:int
     # Where print messages are sent
     _print_target:Any
+    # The current rules, indexed by their triggering paths and event masks. 
+    # This is never changed, only replaced whilst holding '_rules_lock', so 
+    # may be read without locking
+    _rule_index:RulePathIndex
+    # Config option, the number of threads used to hash matched files. If 0,
+    # files are hashed by whichever thread matched them
+    hash_workers:int
+    # The threads hashing matched files, once any have been needed
+    _hash_pool:ThreadPoolExecutor
+    # A lock to solve race conditions on '_hash_pool'
+    _hash_pool_lock:threading.Lock
+    # Hashes already taken of matched files, so that unchanged files are not 
+    # hashed again
+    hash_cache:HashCache
+    # The rules already triggered by each path, if kept, so that retroactive
+    # events are only sent for new or changed files
+    snapshot:WatchdogSnapshot
+    # Events resumed by the runner from its journal, as their event type, 
+    # path, rule name and the size and modification time of the path when 
+    # resumed. These are skipped by the retroactive check made on starting, 
+    # and cleared once it is done
+    _recovered_events:Set[Tuple[Any,...]]
+    # Globs, relative to the base directory, of paths at or within which 
+    # events are ignored
+    excludes:List[str]
+    # The excludes as a single regular expression, or None if there are none.
+    # This is never changed, only replaced whilst holding '_excludes_lock', 
+    # so may be read without locking
+    _exclude_regex:Pattern
+    # A lock to solve race conditions on 'excludes'
+    _excludes_lock:threading.Lock
     def __init__(self, base_dir:str, patterns:Dict[str,FileEventPattern], 
             recipes:Dict[str,BaseRecipe], autostart=False, settletime:int=1, 
-            name:str="", print:Any=sys.stdout, logging:int=0)->None:
+            name:str="", print:Any=sys.stdout, logging:int=0, 
+            max_settling:int=DEFAULT_MAX_SETTLING, 
+            hash_workers:int=DEFAULT_HASH_WORKERS, 
+            hash_cache:HashCache=None, 
+            snapshot:WatchdogSnapshot=None, batch_size:int=1, 
+            batch_time:float=DEFAULT_BATCH_TIME, excludes:List[str]=[], 
+            adaptive_settle:bool=False, 
+            min_settletime:float=DEFAULT_MIN_SETTLETIME, 
+            max_settletime:float=DEFAULT_MAX_SETTLETIME)->None:
         """WatchdogEventHandler Constructor. This uses the watchdog module to 
         monitor a directory and all its sub-directories. Watchdog will provide 
         the monitor with an caught events, with the monitor comparing them 
-        against its rules, and informing the runner of match."""
-        super().__init__(patterns, recipes, name=name)
+        against its rules, and informing the runner of match. At most 
+        max_settling paths are waited on to settle at once, past which the 
+        least recently changed are sent on early. Matched files are hashed 
+        by a pool of hash_workers threads, so that matching never waits on 
+        reading files. If hash_workers is 0, files are instead hashed as they 
+        are matched. Hashes are kept within hash_cache, which may be shared 
+        between monitors or persisted to disk. If not provided, a new 
+        in-memory cache is used. If a snapshot is given, retroactive events 
+        are not sent again for files that have not changed since they last 
+        triggered each rule. Events may be sent to the runner in batches, as 
+        described for the BaseMonitor. Events at or within any paths matching
+        the excludes are ignored, as described for 'add_excludes'. If 
+        adaptive_settle is set, paths are settled as described for the 
+        WatchdogEventHandler, rather than by waiting settletime."""
+        super().__init__(patterns, recipes, name=name, batch_size=batch_size,
+            batch_time=batch_time)
         self._is_valid_base_dir(base_dir)
         self.base_dir = base_dir
+        self.excludes = []
+        self._exclude_regex = None
+        self._excludes_lock = threading.Lock()
+        self._rule_index = RulePathIndex()
+        for rule in self._rules.values():
+            self._rule_index.add(rule)
         check_type(settletime, int, hint="WatchdogMonitor.settletime")
+        valid_natural(hash_workers, hint="WatchdogMonitor.hash_workers")
+        self.hash_workers = hash_workers
+        self._hash_pool = None
+        self._hash_pool_lock = threading.Lock()
+        if hash_cache is None:
+            hash_cache = HashCache()
+        check_type(hash_cache, HashCache, hint="WatchdogMonitor.hash_cache")
+        self.hash_cache = hash_cache
+        if snapshot is not None:
+            check_type(snapshot, WatchdogSnapshot, 
+                hint="WatchdogMonitor.snapshot")
+        self.snapshot = snapshot
+        self._recovered_events = set()
         self._print_target, self.debug_level = setup_debugging(print, logging)       
-        self.event_handler = WatchdogEventHandler(self, settletime=settletime)
-        self.monitor = Observer()
-        self.monitor.schedule(
-            self.event_handler,
-            self.base_dir,
-            recursive=True
-        )
+        self.add_excludes(excludes)
+        self.event_handler = WatchdogEventHandler(self, settletime=settletime,
+            max_settling=max_settling, adaptive_settle=adaptive_settle, 
+            min_settletime=min_settletime, max_settletime=max_settletime)
+        self.monitor = self._create_observer()
         print_debug(self._print_target, self.debug_level, 
-            "Created new WatchdogMonitor instance", DEBUG_INFO)
+            f"Created new {type(self).__name__} instance", DEBUG_INFO)
 
         if autostart:
             self.start()
@@ -222,7 +727,9 @@ class WatchdogMonitor(BaseMonitor):
         """Function to start the monitor."""
         print_debug(self._print_target, self.debug_level, 
             "Starting WatchdogMonitor", DEBUG_INFO)
-        self._apply_retroactive_rules()
+        if self.apply_retroactive:
+            self._apply_retroactive_rules()
+        self._recovered_events = set()
         self.monitor.start()
 
     def stop(self)->None:
@@ -230,6 +737,77 @@ class WatchdogMonitor(BaseMonitor):
         print_debug(self._print_target, self.debug_level, 
             "Stopping WatchdogMonitor", DEBUG_INFO)
         self.monitor.stop()
+        self.event_handler.stop()
+        # Finish hashing anything already matched
+        with self._hash_pool_lock:
+            hash_pool = self._hash_pool
+            self._hash_pool = None
+        if hash_pool is not None:
+            hash_pool.shutdown(wait=True)
+        self.flush_events()
+        self.hash_cache.flush()
+        if self.snapshot is not None:
+            self.snapshot.save()
+
+    def get_gauges(self)->Dict[str,int]:
+        return self.event_handler.get_gauges()
+
+    def _create_observer(self)->Observer:
+        """Function to create the observer watching the base directory, which
+        passes any events to the event handler. May be overridden by inherited
+        classes watching for events by other means."""
+        observer = Observer()
+        observer.schedule(
+            self.event_handler,
+            self.base_dir,
+            recursive=True
+        )
+        return observer
+
+    def add_excludes(self, excludes:List[str])->None:
+        """Function to ignore any events at or within paths matching the given
+        globs, given relative to the base directory. Absolute paths are also 
+        accepted, and are taken literally rather than as globs, though are 
+        skipped if not within the base directory. Events at excluded paths 
+        are dropped as soon as they arrive, before being settled or matched, 
+        and excluded directories are not entered when applying rules 
+        retroactively."""
+        valid_list(excludes, str, min_length=0, 
+            hint="WatchdogMonitor.excludes")
+        base_dir = os.path.abspath(self.base_dir)
+        relative = []
+        for exclude in excludes:
+            if os.path.isabs(exclude):
+                exclude = os.path.relpath(exclude, base_dir)
+                if exclude == os.curdir or exclude == os.pardir \
+                        or exclude.startswith(os.pardir + os.sep):
+                    continue
+                exclude = escape(exclude)
+            relative.append(exclude)
+        if not relative:
+            return
+        with self._excludes_lock:
+            self.excludes = self.excludes + relative
+            self._exclude_regex = _compile_excludes(self.excludes)
+        print_debug(self._print_target, self.debug_level, 
+            f"Excluding {', '.join(relative)}", DEBUG_INFO)
+
+    def is_excluded(self, path:str)->bool:
+        """Function to check if events at a given path, within the base 
+        directory, are ignored."""
+        exclude_regex = self._exclude_regex
+        if exclude_regex is None:
+            return False
+        return exclude_regex.match(self._get_relative_path(path)) is not None
+
+    def _get_relative_path(self, path:str)->str:
+        """Function to get a path within the base directory relative to it, 
+        as trigger paths and excludes are given."""
+        handle_path = path.replace(self.base_dir, '', 1)
+        # Also remove leading slashes, so we don't go off of the root directory
+        while handle_path.startswith(os.path.sep):
+            handle_path = handle_path[1:]
+        return handle_path
 
     def match(self, event)->None:
         """Function to determine if a given event matches the current rules."""
@@ -240,52 +818,28 @@ class WatchdogMonitor(BaseMonitor):
 
         # Remove the base dir from the path as trigger paths are given relative
         # to that
-        handle_path = src_path.replace(self.base_dir, '', 1)
-        # Also remove leading slashes, so we don't go off of the root directory
-        while handle_path.startswith(os.path.sep):
-            handle_path = handle_path[1:]
+        handle_path = self._get_relative_path(src_path)
 
-        self._rules_lock.acquire()
-        try:
-            for rule in self._rules.values():
-                
-                # Skip events not within the event mask
-                if any(i in event_types for i in rule.pattern.event_mask) \
-                        != True:
-                    continue
-                                
-                # Use regex to match event paths against rule paths
-                target_path = rule.pattern.triggering_path
-                recursive_regexp = translate(target_path)
-                if os.name == 'nt':
-                    direct_regexp = recursive_regexp.replace(
-                        '.*', '[^'+ os.path.sep + os.path.sep +']*')
-                else:
-                    direct_regexp = recursive_regexp.replace(
-                        '.*', '[^'+ os.path.sep +']*')
-                recursive_hit = match(recursive_regexp, handle_path)
-                direct_hit = match(direct_regexp, handle_path)
-
-                # If matched, the create a watchdog event
-                if direct_hit or recursive_hit:
-                    meow_event = create_watchdog_event(
-                        event.src_path,
-                        rule,
-                        self.base_dir,
-                        event.time_stamp,
-                        get_hash(event.src_path, SHA256) 
-                    )
-                    print_debug(self._print_target, self.debug_level,  
-                        f"Event at {src_path} hit rule {rule.name}", 
-                        DEBUG_INFO)
-                    # Send the event to the runner
-                    self.send_event_to_runner(meow_event)
+        if self.snapshot is not None and "deleted" in event.event_type:
+            self.snapshot.forget(src_path)
 
-        except Exception as e:
-            self._rules_lock.release()
-            raise e
+        rules = self._rule_index.get_matches(handle_path, event_types)
 
-        self._rules_lock.release()
+        for rule in rules:
+            print_debug(self._print_target, self.debug_level,  
+                f"Event at {src_path} hit rule {rule.name}", DEBUG_INFO)
+
+        # Send the event to the runner, once the file has been hashed
+        self._send_matches(
+            event.src_path, 
+            rules, 
+            event.time_stamp,
+            timestamps={
+                TIMESTAMP_RELEASED: getattr(event, 
+                    "release_time", event.time_stamp),
+                TIMESTAMP_MATCHED: time()
+            }
+        )
 
     def _is_valid_base_dir(self, base_dir:str)->None:
         """Validation check for 'base_dir' variable from main constructor. Is 
@@ -308,51 +862,279 @@ class WatchdogMonitor(BaseMonitor):
     def _get_valid_recipe_types(self)->List[type]:
         return [BaseRecipe]
 
+    def _rules_added(self, rules:List[Rule])->None:
+        rule_index = self._rule_index.copy()
+        for rule in rules:
+            rule_index.add(rule)
+        self._rule_index = rule_index
+
+    def _rules_removed(self, rules:List[Rule])->None:
+        rule_index = self._rule_index.copy()
+        for rule in rules:
+            rule_index.remove(rule.name)
+        self._rule_index = rule_index
+
+    def skip_recovered_events(self, events:List[Dict[str,Any]])->None:
+        """Function to remember events resumed by the runner from its journal,
+        so that the retroactive check made on starting does not send them 
+        again. Events are only skipped whilst their path has not been 
+        modified since, and only by that first check, so that any later 
+        changes to the same paths are still sent."""
+        recovered = set()
+        for event in events:
+            rule = event.get(EVENT_RULE, None)
+            if event.get(EVENT_TYPE, None) != EVENT_TYPE_WATCHDOG \
+                    or rule is None or self._rules.get(rule.name) is not rule:
+                continue
+            recovered.add(_get_recovered_key(
+                event[EVENT_PATH], rule, _get_version(event[EVENT_PATH])))
+        self._recovered_events = recovered
+
     def _apply_retroactive_rule(self, rule:Rule)->None:
         """Function to determine if a rule should be applied to the existing 
         file structure, were the file structure created/modified now."""
-        self._rules_lock.acquire()
-        try:
-            # Check incase rule deleted since this function first called
-            if rule.name not in self._rules:
-                self._rules_lock.release()
-                return
+        self._apply_retroactive([rule])
 
+    def _apply_retroactive_rules(self, rules:List[Rule]=None)->None:
+        """Function to determine if any of the given rules, or all rules if 
+        none are given, should be applied to the existing file structure, were
+        the file structure created/modified now. The file structure is only 
+        walked once, however many rules are given."""
+        if rules is None:
+            rules = list(self._rules.values())
+        self._apply_retroactive(rules)
+
+    def _apply_retroactive(self, rules:List[Rule])->None:
+        """Function to send an event for each existing file or directory 
+        matching any of the given rules with a retroactive event mask. The 
+        file structure is walked once for all of the rules, with matches sent
+        as they are found, so that events reach the runner before the walk 
+        is complete. Matched files are hashed by the hashing pool, though the 
+        walk waits if too many are left waiting to be hashed. If the monitor 
+        keeps a snapshot, paths are skipped for rules they have already 
+        triggered, unless they have since changed. Paths are also skipped 
+        for events resumed by the runner, if still unchanged."""
+        index = RulePathIndex()
+        for rule in rules:
             if FILE_RETROACTIVE_EVENT in rule.pattern.event_mask \
                     or DIR_RETROACTIVE_EVENT in rule.pattern.event_mask:
-                # Determine what paths are potentially triggerable and gather
-                # files at those paths
-                testing_path = os.path.join(
-                    self.base_dir, rule.pattern.triggering_path)
-
-                globbed = glob.glob(testing_path)
-
-                # For each file create a fake event.
-                for globble in globbed:
-
-                    meow_event = create_watchdog_event(
-                        globble,
-                        rule,
-                        self.base_dir,
-                        time(),
-                        get_hash(globble, SHA256)
-                    )
+                index.add(rule)
+        if not len(index):
+            return
+
+        pending = deque()
+        max_pending = self.hash_workers * _RETROACTIVE_PENDING_PER_WORKER
+        for path, matched in self._walk_retroactive(index):
+            # Check incase rules deleted since the walk started
+            rules = self._rules
+            matched = [r for r in matched if rules.get(r.name) is r]
+            if self.snapshot is not None:
+                matched = [r for r in matched 
+                    if not self.snapshot.is_unchanged(path, r)]
+                if not matched:
+                    continue
+            recovered = self._recovered_events
+            if recovered:
+                version = _get_version(path)
+                matched = [r for r in matched 
+                    if _get_recovered_key(path, r, version) not in recovered]
+                if not matched:
+                    continue
+
+            for rule in matched:
+                print_debug(self._print_target, self.debug_level,  
+                    f"Retroactive event for file at at {path} hit rule "
+                    f"{rule.name}", DEBUG_INFO)
+            # Send it to the runner
+            now = time()
+            future = self._send_matches(path, matched, now, 
+                timestamps={TIMESTAMP_MATCHED: now}, retroactive=True)
+            if future is not None:
+                pending.append(future)
+                while len(pending) > max_pending:
+                    pending.popleft().exception()
+
+    def _walk_retroactive(self, index:RulePathIndex
+            )->Iterator[Tuple[str,List[Rule]]]:
+        """Function to walk the monitored directory, yielding each path that 
+        matches any rule within the given index, along with the rules it 
+        matches. Directories are only entered if a rule could match within 
+        them, and symbolic links to directories are not followed. Excluded 
+        paths are skipped entirely."""
+        exclude_regex = self._exclude_regex
+        to_walk = [(self.base_dir, "")]
+        while to_walk:
+            dir_path, rel_dir = to_walk.pop()
+            try:
+                entries = list(os.scandir(dir_path))
+            except OSError as e:
+                print_debug(self._print_target, self.debug_level,  
+                    f"Could not scan {dir_path}. {e}", DEBUG_INFO)
+                continue
+            for entry in entries:
+                rel_path = os.path.join(rel_dir, entry.name) \
+                    if rel_dir else entry.name
+                if exclude_regex is not None and exclude_regex.match(rel_path):
+                    continue
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                event_type = DIR_RETROACTIVE_EVENT if is_dir \
+                    else FILE_RETROACTIVE_EVENT
+                matched = index.get_matches(rel_path, [event_type])
+                if matched:
+                    yield entry.path, matched
+                if is_dir and not entry.is_symlink() \
+                        and index.may_match_within(rel_path):
+                    to_walk.append((entry.path, rel_path))
+
+    def _send_match(self, path:str, rule:Rule, time_stamp:float, 
+            timestamps:Dict[str,float]={})->None:
+        """Function to send an event to the runner for a path matching a 
+        rule."""
+        self._send_matches(path, [rule], time_stamp, timestamps=timestamps)
+
+    def _send_matches(self, path:str, rules:List[Rule], time_stamp:float, 
+            timestamps:Dict[str,float]={}, retroactive:bool=False
+            )->Union[Future,None]:
+        """Function to send an event to the runner for each rule a path 
+        matches. Timestamps of the stages the event has passed through so far 
+        are included within each event. The file is hashed once for all of 
+        the rules, by the hashing pool if there is one, so that the caller 
+        does not wait on reading it. If the runner has throttled the monitor, 
+        only the path, rule name and time are held, so that the file is not 
+        hashed until the event is actually sent. The same is done whilst 
+        earlier held events are still being released. The future of the 
+        hashing is returned, if the file was given to the hashing pool. 
+        Retroactive matches are not sent for rules already sent the same 
+        hash, according to the snapshot."""
+        if not rules:
+            return None
+        if self._is_holding():
+            for rule in rules:
+                self._hold((path, rule.name), time_stamp)
+            return None
+        if not self.hash_workers:
+            self._hash_and_send(path, rules, time_stamp, timestamps, 
+                retroactive=retroactive)
+            return None
+        with self._hash_pool_lock:
+            if self._hash_pool is None:
+                self._hash_pool = ThreadPoolExecutor(
+                    max_workers=self.hash_workers, 
+                    thread_name_prefix="hash_worker"
+                )
+            return self._hash_pool.submit(self._hash_and_send, path, 
+                list(rules), time_stamp, dict(timestamps), 
+                retroactive=retroactive)
+
+    def _hash_and_send(self, path:str, rules:List[Rule], time_stamp:float,
+            timestamps:Dict[str,float], retroactive:bool=False)->None:
+        """Function to hash a file and send an event to the runner for each 
+        of the given rules. The file is hashed once for each type of hash the
+        rules use. Nothing is sent if the file cannot be hashed, such as if it 
+        has since been removed. Each event sent is recorded within the 
+        snapshot, if there is one."""
+        version = None
+        if self.snapshot is not None:
+            version = _get_version(path)
+        hashes = {}
+        for rule in rules:
+            hash_type = _get_hash_type(rule)
+            if hash_type not in hashes:
+                try:
+                    hashes[hash_type] = \
+                        self.hash_cache.get_hash(path, hash_type)
+                except Exception as e:
                     print_debug(self._print_target, self.debug_level,  
-                        f"Retroactive event for file at at {globble} hit rule "
-                        f"{rule.name}", DEBUG_INFO)
-                    # Send it to the runner
-                    self.send_event_to_runner(meow_event)
+                        f"Could not hash {path}. {e}", DEBUG_INFO)
+                    hashes[hash_type] = None
+            if hashes[hash_type] is None:
+                continue
+            if retroactive and self.snapshot is not None \
+                    and self.snapshot.get_hash(path, rule) == hashes[hash_type]:
+                # Only touched since last sent, so remember the new version
+                if version is not None:
+                    self.snapshot.record(path, rule, hashes[hash_type], 
+                        version)
+                continue
+            self.send_event_to_runner(create_watchdog_event(
+                path,
+                rule,
+                self.base_dir,
+                time_stamp,
+                hashes[hash_type],
+                extras={EVENT_TIMESTAMPS: dict(timestamps)}
+            ))
+            if version is not None:
+                self.snapshot.record(path, rule, hashes[hash_type], version)
 
+    def _hold_event(self, event:Dict[str,Any])->None:
+        """Function to hold onto an event whilst throttled. Repeated events 
+        for the same path and rule are merged, keeping the latest time."""
+        self._hold(
+            (event[EVENT_PATH], event[EVENT_RULE].name), 
+            event[EVENT_TIME]
+        )
+
+    def _restore_held_event(self, key:Any, held:Any
+            )->Union[Dict[str,Any],None]:
+        """Function to recreate a held event. Nothing is sent if the rule has 
+        since been removed, or the file can no longer be hashed."""
+        path, rule_name = key
+        rule = self._rules.get(rule_name, None)
+        if rule is None:
+            return None
+        version = None
+        if self.snapshot is not None:
+            version = _get_version(path)
+        try:
+            file_hash = self.hash_cache.get_hash(path, _get_hash_type(rule))
         except Exception as e:
-            self._rules_lock.release()
-            raise e
-        self._rules_lock.release()
+            print_debug(self._print_target, self.debug_level,  
+                f"Could not send held event for {path}. {e}", DEBUG_INFO)
+            return None
+        if version is not None:
+            self.snapshot.record(path, rule, file_hash, version)
+        return create_watchdog_event(
+            path,
+            rule,
+            self.base_dir,
+            held,
+            file_hash,
+            extras={EVENT_TIMESTAMPS: {}}
+        )
 
-    def _apply_retroactive_rules(self)->None:
-        """Function to determine if any rules should be applied to the existing 
-        file structure, were the file structure created/modified now."""
-        for rule in self._rules.values():
-            self._apply_retroactive_rule(rule)
+
+class _SettlingPath:
+    """What a WatchdogEventHandler has seen at a single path still settling."""
+    __slots__ = ("time", "event_types", "event", "first_time", "bounds", 
+        "version", "delay", "closed", "deadline", "entry")
+    def __init__(self, event:Any)->None:
+        # Time of the latest event seen at the path
+        self.time:float = event.time_stamp
+        # Every event type seen at the path
+        self.event_types:Set[str] = {event.event_type}
+        # The latest event seen at the path
+        self.event:Any = event
+        # Time of the first event seen at the path
+        self.first_time:float = event.time_stamp
+        # The shortest and longest time to wait for the path to stop changing,
+        # when settling adaptively
+        self.bounds:Tuple[float,float] = None
+        # Size and modification time of the path when last checked, when 
+        # settling adaptively
+        self.version:Tuple[int,int] = None
+        # Time until the path is next checked, when settling adaptively
+        self.delay:float = None
+        # If a closed event has been seen at the path, so that it is released
+        # straight away
+        self.closed:bool = event.event_type == EVENT_TYPE_CLOSED
+        # Time at which the path is next due to be released or checked
+        self.deadline:float = event.time_stamp
+        # The single live entry for the path in the debounce heap, if any
+        self.entry:Tuple[float,int,str] = None
 
 
 class WatchdogEventHandler(PatternMatchingEventHandler):
@@ -360,87 +1142,319 @@ class WatchdogEventHandler(PatternMatchingEventHandler):
     monitor:WatchdogMonitor
     # A time to wait per event path, during which extra events are discared
     _settletime:int
-    # TODO clean this struct occasionally
-    # A Dict of recent job timestamps
-    _recent_jobs:Dict[str, Any]
-    # A lock to solve race conditions on '_recent_jobs'
+    # What has been seen at each path still settling, least recently updated
+    # first. Entries are removed once their event is released, so this only 
+    # holds paths seen within the settle time
+    _recent_jobs:Dict[str,_SettlingPath]
+    # The most paths that can be settling at once. Past this, the least 
+    # recently updated path is released early. If 0, there is no limit
+    max_settling:int
+    # A lock to solve race conditions on '_recent_jobs', '_debounce_heap' 
+    # and '_released'
     _recent_jobs_lock:threading.Lock
-    def __init__(self, monitor:WatchdogMonitor, settletime:int=1):
+    # Condition used to wake the debounce thread when an event is due sooner
+    # than it was waiting for
+    _debounce_condition:threading.Condition
+    # Paths waiting to settle, as a heap ordered by when they are due. Each
+    # settling path has at most one live entry, with any others skipped
+    _debounce_heap:List[Tuple[float,int,str]]
+    # Counter used to order paths due at the same time by arrival
+    _debounce_count:Iterator[int]
+    # Events released early, waiting to be sent on by the debounce thread
+    _released:List[Any]
+    # The thread releasing settled events to the monitor, if one is running
+    _debounce_thread:threading.Thread
+    # Config option, if paths are settled by checking when they stop 
+    # changing, rather than by waiting '_settletime'
+    adaptive_settle:bool
+    # Config option, the shortest and longest time to wait for a path to 
+    # stop changing when settling adaptively, unless overridden by the 
+    # patterns matching it
+    min_settletime:float
+    max_settletime:float
+    def __init__(self, monitor:WatchdogMonitor, settletime:int=1, 
+            max_settling:int=DEFAULT_MAX_SETTLING, adaptive_settle:bool=False,
+            min_settletime:float=DEFAULT_MIN_SETTLETIME, 
+            max_settletime:float=DEFAULT_MAX_SETTLETIME):
         """WatchdogEventHandler Constructor. This inherits from watchdog 
         PatternMatchingEventHandler, and is used to catch events, then filter 
-        out excessive events at the same location."""
+        out excessive events at the same location. Events are released as 
+        soon as a file is closed after being written. Otherwise, each path 
+        waits settletime after its latest event, unless adaptive_settle is 
+        set. In that case the size and modification time of the path are 
+        checked after min_settletime, then again after twice as long each 
+        time, until they are unchanged between checks. Paths are released 
+        regardless once max_settletime has passed since their first event. 
+        Patterns matching a path may set their own bounds, with the longest 
+        of them used."""
         super().__init__()
         self.monitor = monitor
         self._settletime = settletime
-        self._recent_jobs = {}
+        valid_natural(max_settling, hint="WatchdogEventHandler.max_settling")
+        self.max_settling = max_settling
+        check_type(adaptive_settle, bool, 
+            hint="WatchdogEventHandler.adaptive_settle")
+        self.adaptive_settle = adaptive_settle
+        _valid_settletimes(min_settletime, max_settletime, 
+            "WatchdogEventHandler")
+        self.min_settletime = min_settletime
+        self.max_settletime = max_settletime
+        self._recent_jobs = OrderedDict()
         self._recent_jobs_lock = threading.Lock()
+        self._debounce_condition = threading.Condition(self._recent_jobs_lock)
+        self._debounce_heap = []
+        self._debounce_count = count()
+        self._released = []
+        self._debounce_thread = None
+        self._stop_event = threading.Event()
+
+    def handle_event(self, event):
+        """Handler function, called by all specific event functions. Will 
+        attach a timestamp to the event immediately, and schedule it to be 
+        sent on to the monitor once '_settletime' has passed, so as to catch 
+        subsequent events at the same location and not swamp the system with 
+        repeated events. All events are released by a single debounce thread, 
+        so that the monitor can resume monitoring as soon as possible 
+        regardless of how many events there are. Events at paths excluded by
+        the monitor are dropped straight away. Moves are only dropped if 
+        both their source and destination are excluded. When settling 
+        adaptively, any event at a path restarts the checks that it has 
+        stopped changing."""
+        if self.monitor.is_excluded(event.src_path) \
+                and (not getattr(event, "dest_path", "") 
+                    or self.monitor.is_excluded(event.dest_path)):
+            return
+
+        event.time_stamp = time()
+
+        with self._debounce_condition:
+            if self._stop_event.is_set():
+                return
 
-    def threaded_handler(self, event):
-        """Function to determine if the given event shall be sent on to the 
-        monitor. After each event we wait for '_settletime', to catch 
-        subsequent events at the same location, so as to not swamp the system 
-        with repeated events."""
- 
-        self._recent_jobs_lock.acquire()
-        try:
             if event.src_path in self._recent_jobs: 
-                if event.time_stamp > self._recent_jobs[event.src_path][0]:
-                    self._recent_jobs[event.src_path][0] = event.time_stamp
-                    self._recent_jobs[event.src_path][1].add(event.event_type)
+                recent = self._recent_jobs[event.src_path]
+                if event.time_stamp > recent.time:
+                    recent.time = event.time_stamp
+                    recent.event_types.add(event.event_type)
+                    recent.event = event
+                    if self.adaptive_settle:
+                        recent.version = None
+                        recent.delay = recent.bounds[0]
+                    self._recent_jobs.move_to_end(event.src_path)
                 else:
-                    self._recent_jobs_lock.release()
                     return
             else:
-                self._recent_jobs[event.src_path] = \
-                    [event.time_stamp, {event.event_type}]
+                recent = _SettlingPath(event)
+                if self.adaptive_settle:
+                    recent.bounds = self._get_settle_bounds(event)
+                    recent.delay = recent.bounds[0]
+                self._recent_jobs[event.src_path] = recent
+                if self.max_settling \
+                        and len(self._recent_jobs) > self.max_settling:
+                    self._release_early()
 
             # If we have a closed event then short-cut the wait and send event
-            # immediately        
-            if event.event_type == FILE_CLOSED_EVENT:
-                self.monitor.match(event)
-                self._recent_jobs_lock.release()
-                return
+            # immediately. Otherwise wait for the path to settle, unless it
+            # has already been closed
+            if event.event_type == EVENT_TYPE_CLOSED:
+                recent.closed = True
+                recent.deadline = event.time_stamp
+            elif not recent.closed:
+                recent.deadline = event.time_stamp + (recent.delay 
+                    if self.adaptive_settle else self._settletime)
+            self._schedule(recent)
 
-        except Exception as ex:
-            self._recent_jobs_lock.release()
-            raise Exception(ex)
-        self._recent_jobs_lock.release()
+            if self._debounce_thread is None:
+                self._debounce_thread = threading.Thread(
+                    target=self._debounce_loop,
+                    args=(self._stop_event,),
+                    daemon=True,
+                    name="debounce_thread"
+                )
+                self._debounce_thread.start()
 
-        sleep(self._settletime)
+    def _schedule(self, recent:_SettlingPath)->None:
+        """Function to make sure a settling path is in the debounce heap by
+        its deadline. A new entry is only pushed if the path has none, or if 
+        its deadline has moved earlier than its entry, in which case the old 
+        entry is left to be skipped. A deadline moved later is picked up once 
+        the existing entry is due. If skipped entries come to outnumber 
+        settling paths, the heap is rebuilt from the live entries alone. Must 
+        be called whilst holding '_recent_jobs_lock'."""
+        if recent.entry is not None and recent.entry[0] <= recent.deadline:
+            return
+        recent.entry = (recent.deadline, next(self._debounce_count), 
+            recent.event.src_path)
+        if len(self._debounce_heap) >= 2 * len(self._recent_jobs):
+            self._debounce_heap = [r.entry for r in self._recent_jobs.values()
+                if r.entry is not None]
+            heapify(self._debounce_heap)
+        else:
+            heappush(self._debounce_heap, recent.entry)
+        if self._debounce_heap[0] is recent.entry:
+            self._debounce_condition.notify()
 
-        self._recent_jobs_lock.acquire()
-        try:
-            if event.src_path in self._recent_jobs \
-                    and event.time_stamp < self._recent_jobs[event.src_path][0]:
-                self._recent_jobs_lock.release()
-                return
-        except Exception as ex:
-            self._recent_jobs_lock.release()
-            raise Exception(ex)
-        event.event_type = self._recent_jobs[event.src_path][1]
-        self._recent_jobs_lock.release()
+    def _release_early(self)->None:
+        """Function to release the least recently updated settling path 
+        before its settle time has passed, to keep within 'max_settling'. 
+        Any entry already in the debounce heap for it will find it gone and 
+        be skipped. Must be called whilst holding '_recent_jobs_lock'."""
+        _, recent = self._recent_jobs.popitem(last=False)
+        event = recent.event
+        event.event_type = set(recent.event_types)
+        self._released.append(event)
+        self._debounce_condition.notify()
 
-        self.monitor.match(event)
+    def get_gauges(self)->Dict[str,int]:
+        """Function to get the number of paths currently settling, and the 
+        number of events scheduled to be checked by the debounce thread."""
+        with self._recent_jobs_lock:
+            return {
+                "settling_paths": len(self._recent_jobs),
+                "scheduled_events": len(self._debounce_heap)
+            }
 
-    def handle_event(self, event):
-        """Handler function, called by all specific event functions. Will 
-        attach a timestamp to the event immediately, and attempt to start a 
-        threaded_handler so that the monitor can resume monitoring as soon as 
-        possible."""
-        event.time_stamp = time()
+    def stop(self)->None:
+        """Function to stop the debounce thread. Any events still waiting to 
+        settle are released to the monitor straight away, rather than being
+        lost, once the debounce thread has finished."""
+        with self._debounce_condition:
+            self._stop_event.set()
+            pending = {}
+            for recent in self._recent_jobs.values():
+                recent.event.event_type = set(recent.event_types)
+                pending[id(recent.event)] = recent.event
+            for event in self._released:
+                pending[id(event)] = event
+            self._released.clear()
+            self._debounce_heap.clear()
+            self._recent_jobs.clear()
+            self._debounce_condition.notify()
+            thread = self._debounce_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._release(list(pending.values()))
+
+    def _debounce_loop(self, stop_event:threading.Event)->None:
+        """Function run by the debounce thread. This waits until the next 
+        path is due, then sends every event that has settled to the monitor. 
+        A path has settled once its deadline has passed without a more recent
+        event being seen there, in which case its latest event is sent with 
+        every event type seen there. When settling adaptively, such paths are 
+        instead checked to see if they have stopped changing. Events released
+        early are sent straight away."""
+        while True:
+            with self._debounce_condition:
+                while not stop_event.is_set() and not self._released:
+                    if not self._debounce_heap:
+                        self._debounce_condition.wait()
+                        continue
+                    delay = self._debounce_heap[0][0] - time()
+                    if delay <= 0:
+                        break
+                    self._debounce_condition.wait(delay)
+                if stop_event.is_set():
+                    return
+
+                now = time()
+                settled = self._released
+                self._released = []
+                to_check = []
+                while self._debounce_heap and self._debounce_heap[0][0] <= now:
+                    entry = heappop(self._debounce_heap)
+                    recent = self._recent_jobs.get(entry[2], None)
+                    # Skip entries for paths since released or rescheduled
+                    if recent is None or recent.entry is not entry:
+                        continue
+                    recent.entry = None
+                    if recent.deadline > now:
+                        self._schedule(recent)
+                        continue
+                    if self.adaptive_settle and not recent.closed:
+                        to_check.append((recent.event, recent))
+                        continue
+                    # Once the latest event at a path is released, the path
+                    # has settled and so is forgotten
+                    recent.event.event_type = set(recent.event_types)
+                    self._recent_jobs.pop(entry[2])
+                    settled.append(recent.event)
 
-        waiting_for_threaded_resources = True
-        while waiting_for_threaded_resources:
+            if to_check:
+                settled.extend(self._check_settled(to_check))
+
+            self._release(settled)
+
+    def _release(self, events:List[Any])->None:
+        """Function to send settled events on to the monitor."""
+        for event in events:
+            event.release_time = time()
             try:
-                worker = threading.Thread(
-                    target=self.threaded_handler,
-                    args=[event])
-                worker.daemon = True
-                worker.start()
-                waiting_for_threaded_resources = False
-            except threading.ThreadError:
-                sleep(1)
-    
+                self.monitor.match(event)
+            except Exception as e:
+                print_debug(self.monitor._print_target, 
+                    self.monitor.debug_level, 
+                    f"Could not match event at {event.src_path}. {e}",
+                    DEBUG_WARNING)
+
+    def _get_settle_bounds(self, event)->Tuple[float,float]:
+        """Function to get the shortest and longest time to wait for the path
+        of an event to stop changing. These are the longest of those set by 
+        any patterns it matches, or the handler's own otherwise."""
+        prepend = "dir_" if event.is_directory else "file_"
+        rules = self.monitor._rule_index.get_matches(
+            self.monitor._get_relative_path(event.src_path),
+            [prepend + event.event_type]
+        )
+        min_times = [rule.pattern.min_settletime for rule in rules 
+            if rule.pattern.min_settletime is not None]
+        max_times = [rule.pattern.max_settletime for rule in rules 
+            if rule.pattern.max_settletime is not None]
+        min_settletime = max(min_times) if min_times else self.min_settletime
+        max_settletime = max(max_times) if max_times else self.max_settletime
+        return min_settletime, max(min_settletime, max_settletime)
+
+    def _check_settled(self, to_check:List[Tuple[Any,_SettlingPath]]
+            )->List[Any]:
+        """Function to check if the paths of events being settled adaptively 
+        have stopped changing, returning the events that have settled. A path
+        has settled once its size and modification time are unchanged since 
+        it was last checked, once it no longer exists, or once its longest 
+        settle time has passed since its first event. Otherwise it is checked
+        again after twice as long as before. Paths are checked without 
+        holding '_recent_jobs_lock', so that slow file systems do not hold up
+        new events."""
+        versions = []
+        for event, _ in to_check:
+            try:
+                st = os.stat(event.src_path)
+                versions.append((st.st_size, st.st_mtime_ns))
+            except OSError:
+                versions.append(None)
+
+        settled = []
+        with self._debounce_condition:
+            if self._stop_event.is_set():
+                return settled
+            now = time()
+            for (event, recent), version in zip(to_check, versions):
+                # Skip paths that have changed again whilst being checked
+                if recent.event is not event \
+                        or self._recent_jobs.get(event.src_path) is not recent:
+                    continue
+                max_time = recent.bounds[1]
+                if version is None or version == recent.version \
+                        or now - recent.first_time >= max_time:
+                    event.event_type = set(recent.event_types)
+                    self._recent_jobs.pop(event.src_path)
+                    settled.append(event)
+                    continue
+                recent.version = version
+                recent.delay = min(recent.delay * 2, 
+                    recent.first_time + max_time - now)
+                recent.deadline = now + recent.delay
+                self._schedule(recent)
+        return settled
+
     def on_created(self, event):
         """Function called when a file created event occurs."""
         self.handle_event(event)
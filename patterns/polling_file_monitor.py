@@ -0,0 +1,362 @@
+
+"""
+This file contains a monitor for FileEventPatterns that polls the file system
+for changes, rather than relying on the operating system to report them. This
+is needed for file systems such as sshfs, for which changes made elsewhere are
+not reported.
+
+Author(s): David Marchant
+"""
+import os
+import sys
+import threading
+
+from time import time
+from typing import Any, Callable, Dict, List, Set, Tuple
+from watchdog.events import FileSystemEvent, FileCreatedEvent, \
+    FileModifiedEvent, FileDeletedEvent, DirCreatedEvent, DirDeletedEvent, \
+    FileSystemEventHandler
+
+from meow_base.core.base_monitor import DEFAULT_BATCH_TIME
+from meow_base.core.base_recipe import BaseRecipe
+from meow_base.core.vars import DEBUG_INFO, DEBUG_WARNING
+from meow_base.functionality.debug import print_debug
+from meow_base.functionality.hashing import HashCache
+from meow_base.functionality.validation import check_type, \
+    check_callable, valid_natural
+from meow_base.patterns.file_event_pattern import FileEventPattern, \
+    WatchdogMonitor, WatchdogSnapshot, DEFAULT_MAX_SETTLING, \
+    DEFAULT_HASH_WORKERS, DEFAULT_MIN_SETTLETIME, DEFAULT_MAX_SETTLETIME
+
+# Default shortest and longest time between polls, in seconds
+DEFAULT_MIN_POLL_INTERVAL = 1
+DEFAULT_MAX_POLL_INTERVAL = 30
+
+# Default number of polls between each one that checks every file
+DEFAULT_FULL_SCAN_EVERY = 10
+
+# Time after being modified within which a directory is listed again on the
+# next poll, in seconds. Changes made within the same tick of its
+# modification time as it was listed would otherwise not be seen
+_RACY_WINDOW = 2
+
+
+class _DirState:
+    """What a DirectoryPoller last saw within a single directory."""
+    __slots__ = ("mtime", "racy", "files", "dirs")
+    def __init__(self)->None:
+        # Modification time of the directory when it was last listed
+        self.mtime:int = None
+        # If the directory was modified so shortly before being listed that
+        # further changes may not have altered its modification time
+        self.racy:bool = True
+        # Size and modification time of each file, keyed by name
+        self.files:Dict[str,Tuple[int,int]] = {}
+        # Names of each sub-directory
+        self.dirs:Set[str] = set()
+
+
+class DirectoryPoller:
+    # The directory being polled, including all its sub-directories
+    base_dir:str
+    # The handler events are passed to
+    event_handler:FileSystemEventHandler
+    # Config option, the shortest and longest time between polls. The time is
+    # doubled after each poll that finds nothing, and reset to the shortest
+    # once a change is found
+    min_interval:float
+    max_interval:float
+    # Config option, the number of polls between each that checks every file,
+    # not just those in directories that have changed. If 0, this is never
+    # done
+    full_scan_every:int
+    # The current time between polls
+    interval:float
+    # What was last seen within each directory, keyed by path
+    _dirs:Dict[str,_DirState]
+    # Number of polls made
+    _polls:int
+    # The thread polling the file system, if one is running
+    _poll_thread:threading.Thread
+    # Checks if a path is excluded, in which case it is not tracked, if set
+    is_excluded:Callable[[str],bool]
+    def __init__(self, event_handler:FileSystemEventHandler, base_dir:str,
+            min_interval:float=DEFAULT_MIN_POLL_INTERVAL,
+            max_interval:float=DEFAULT_MAX_POLL_INTERVAL,
+            full_scan_every:int=DEFAULT_FULL_SCAN_EVERY,
+            print_target:Any=sys.stdout, debug_level:int=0,
+            is_excluded:Callable[[str],bool]=None)->None:
+        """DirectoryPoller Constructor. This is used in place of a watchdog
+        observer, passing watchdog events to the given handler for changes
+        found by periodically polling the base directory. Only directories
+        whose modification time has changed are listed again, with their
+        files checked for changes. As editing a file does not change the
+        modification time of its directory, every file is also checked once
+        every full_scan_every polls. Moves are seen as a deletion and a
+        creation, and symbolic links to directories are not followed. Paths
+        for which is_excluded returns True are not tracked at all."""
+        check_type(event_handler, FileSystemEventHandler,
+            hint="DirectoryPoller.event_handler")
+        self.event_handler = event_handler
+        self.base_dir = base_dir
+        for interval, hint in [(min_interval, "min_interval"),
+                (max_interval, "max_interval")]:
+            check_type(interval, float, alt_types=[int],
+                hint=f"DirectoryPoller.{hint}")
+            if interval <= 0:
+                raise ValueError(f"DirectoryPoller.{hint} must be greater "
+                    f"than 0. Got {interval}")
+        if max_interval < min_interval:
+            raise ValueError("DirectoryPoller.max_interval cannot be less "
+                f"than min_interval. Got {max_interval} and {min_interval}")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        valid_natural(full_scan_every,
+            hint="DirectoryPoller.full_scan_every")
+        self.full_scan_every = full_scan_every
+        self._print_target = print_target
+        self.debug_level = debug_level
+        self.interval = min_interval
+        self._dirs = None
+        self._polls = 0
+        self._poll_thread = None
+        self._stop_event = threading.Event()
+        if is_excluded is not None:
+            check_callable(is_excluded, hint="DirectoryPoller.is_excluded")
+        self.is_excluded = is_excluded
+
+    def start(self)->None:
+        """Function to start polling. If the file system has not already been
+        indexed, this is done first without any events being sent."""
+        if self._dirs is None:
+            self.index()
+        self._stop_event.clear()
+        self._poll_thread = threading.Thread(
+            target=self._poll_loop,
+            daemon=True,
+            name="poll_thread"
+        )
+        self._poll_thread.start()
+
+    def stop(self)->None:
+        self._stop_event.set()
+        if self._poll_thread is not None \
+                and self._poll_thread is not threading.current_thread():
+            self._poll_thread.join()
+            self._poll_thread = None
+
+    def index(self)->None:
+        """Function to record the current state of the file system, against
+        which later polls are compared."""
+        self._dirs = {}
+        self._add_dir(self.base_dir, time(), send=False)
+
+    def get_gauges(self)->Dict[str,float]:
+        return {
+            "polled_dirs": len(self._dirs) if self._dirs is not None else 0,
+            "poll_interval": self.interval
+        }
+
+    def poll(self)->bool:
+        """Function to compare the file system against what was last seen,
+        sending events for any differences. Returns True if anything had
+        changed."""
+        if self._dirs is None:
+            self.index()
+            return False
+        self._polls += 1
+        full = self.full_scan_every \
+            and self._polls % self.full_scan_every == 0
+        now = time()
+        changed = False
+        for dir_path in list(self._dirs.keys()):
+            state = self._dirs.get(dir_path, None)
+            # Removed along with a parent directory earlier in this poll
+            if state is None:
+                continue
+            try:
+                st = os.stat(dir_path)
+            except OSError:
+                if dir_path != self.base_dir:
+                    self._remove_dir(dir_path)
+                    changed = True
+                continue
+            if st.st_mtime_ns == state.mtime and not state.racy and not full:
+                continue
+            changed |= self._list_dir(dir_path, state, st, now, send=True)
+        return changed
+
+    def _poll_loop(self)->None:
+        """Function run by the poll thread, polling until stopped. The time
+        between polls is adapted to how often changes are found."""
+        while not self._stop_event.wait(self.interval):
+            try:
+                changed = self.poll()
+            except Exception as e:
+                print_debug(self._print_target, self.debug_level,
+                    f"Could not poll {self.base_dir}. {e}", DEBUG_WARNING)
+                changed = False
+            if changed:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * 2, self.max_interval)
+
+    def _list_dir(self, dir_path:str, state:_DirState, st:os.stat_result,
+            now:float, send:bool)->bool:
+        """Function to list a directory, comparing its contents to what was
+        last seen. New sub-directories are added in full, and removed ones
+        are forgotten. Returns True if anything had changed."""
+        files = {}
+        dirs = set()
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError as e:
+            print_debug(self._print_target, self.debug_level,
+                f"Could not list {dir_path}. {e}", DEBUG_INFO)
+            return False
+        for entry in entries:
+            if self.is_excluded is not None and self.is_excluded(entry.path):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.add(entry.name)
+                elif not entry.is_dir():
+                    entry_st = entry.stat()
+                    files[entry.name] = \
+                        (entry_st.st_size, entry_st.st_mtime_ns)
+            except OSError:
+                # Removed since being listed
+                continue
+
+        events = []
+        for name, version in files.items():
+            previous = state.files.get(name, None)
+            if previous is None:
+                events.append(FileCreatedEvent(os.path.join(dir_path, name)))
+            elif previous != version:
+                events.append(FileModifiedEvent(os.path.join(dir_path, name)))
+        for name in state.files.keys() - files.keys():
+            events.append(FileDeletedEvent(os.path.join(dir_path, name)))
+
+        old_dirs = state.dirs
+        state.mtime = st.st_mtime_ns
+        state.racy = now - st.st_mtime < _RACY_WINDOW
+        state.files = files
+        state.dirs = dirs
+
+        if send:
+            for event in events:
+                self._send(event)
+        for name in dirs - old_dirs:
+            self._add_dir(os.path.join(dir_path, name), now, send=send)
+        for name in old_dirs - dirs:
+            self._remove_dir(os.path.join(dir_path, name))
+        return bool(events) or dirs != old_dirs
+
+    def _add_dir(self, dir_path:str, now:float, send:bool)->None:
+        """Function to start tracking a directory and everything within it.
+        If send is set, creation events are sent for each of them."""
+        try:
+            st = os.stat(dir_path)
+        except OSError:
+            return
+        if send and dir_path != self.base_dir:
+            self._send(DirCreatedEvent(dir_path))
+        state = _DirState()
+        self._dirs[dir_path] = state
+        self._list_dir(dir_path, state, st, now, send=send)
+
+    def _remove_dir(self, dir_path:str)->None:
+        """Function to stop tracking a directory and everything within it,
+        sending deletion events for each of them."""
+        to_remove = [dir_path]
+        while to_remove:
+            path = to_remove.pop()
+            state = self._dirs.pop(path, None)
+            if state is None:
+                continue
+            for name in state.files:
+                self._send(FileDeletedEvent(os.path.join(path, name)))
+            to_remove.extend(os.path.join(path, name) for name in state.dirs)
+            self._send(DirDeletedEvent(path))
+
+    def _send(self, event:FileSystemEvent)->None:
+        try:
+            self.event_handler.dispatch(event)
+        except Exception as e:
+            print_debug(self._print_target, self.debug_level,
+                f"Could not handle event at {event.src_path}. {e}",
+                DEBUG_WARNING)
+
+
+class PollingFileMonitor(WatchdogMonitor):
+    # The poller used in place of a watchdog observer
+    monitor:DirectoryPoller
+    def __init__(self, base_dir:str, patterns:Dict[str,FileEventPattern],
+            recipes:Dict[str,BaseRecipe], autostart=False, settletime:int=1,
+            name:str="", print:Any=sys.stdout, logging:int=0,
+            max_settling:int=DEFAULT_MAX_SETTLING,
+            hash_workers:int=DEFAULT_HASH_WORKERS,
+            hash_cache:HashCache=None, snapshot:WatchdogSnapshot=None,
+            batch_size:int=1, batch_time:float=DEFAULT_BATCH_TIME,
+            excludes:List[str]=[], adaptive_settle:bool=False,
+            min_settletime:float=DEFAULT_MIN_SETTLETIME,
+            max_settletime:float=DEFAULT_MAX_SETTLETIME,
+            min_poll_interval:float=DEFAULT_MIN_POLL_INTERVAL,
+            max_poll_interval:float=DEFAULT_MAX_POLL_INTERVAL,
+            full_scan_every:int=DEFAULT_FULL_SCAN_EVERY)->None:
+        """PollingFileMonitor Constructor. This behaves as a WatchdogMonitor,
+        but finds changes by polling the base directory rather than waiting
+        for the operating system to report them. This is needed for network
+        file systems such as sshfs, for which changes made by other machines
+        are not reported. Polls are made between min_poll_interval and
+        max_poll_interval seconds apart, depending on how often changes are
+        found. Most polls only check the files within directories that have
+        changed, so files edited in place may not be seen until the next
+        poll that checks every file, made every full_scan_every polls. 
+        Excluded paths are not polled at all."""
+        # Needed by '_create_observer', called by the WatchdogMonitor
+        # constructor
+        self._poll_config = (min_poll_interval, max_poll_interval,
+            full_scan_every)
+        super().__init__(base_dir, patterns, recipes, settletime=settletime,
+            name=name, print=print, logging=logging,
+            max_settling=max_settling, hash_workers=hash_workers,
+            hash_cache=hash_cache, snapshot=snapshot, batch_size=batch_size,
+            batch_time=batch_time, excludes=excludes,
+            adaptive_settle=adaptive_settle, min_settletime=min_settletime,
+            max_settletime=max_settletime)
+
+        if autostart:
+            self.start()
+
+    def start(self)->None:
+        """Function to start the monitor. The file system is indexed before
+        retroactive rules are applied, so that nothing changed whilst they
+        are being applied is missed."""
+        print_debug(self._print_target, self.debug_level,
+            "Starting PollingFileMonitor", DEBUG_INFO)
+        self.monitor.index()
+        if self.apply_retroactive:
+            self._apply_retroactive_rules()
+        self._recovered_events = set()
+        self.monitor.start()
+
+    def get_gauges(self)->Dict[str,float]:
+        return {
+            **super().get_gauges(),
+            **self.monitor.get_gauges()
+        }
+
+    def _create_observer(self)->DirectoryPoller:
+        min_interval, max_interval, full_scan_every = self._poll_config
+        return DirectoryPoller(
+            self.event_handler,
+            self.base_dir,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            full_scan_every=full_scan_every,
+            print_target=self._print_target,
+            debug_level=self.debug_level,
+            is_excluded=self.is_excluded
+        )
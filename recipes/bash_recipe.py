@@ -22,10 +22,11 @@ from meow_base.patterns.file_event_pattern import EVENT_TYPE_WATCHDOG
 class BashRecipe(BaseRecipe):
     # A path to the bash script used to create this recipe
     def __init__(self, name:str, recipe:Any, parameters:Dict[str,Any]={}, 
-            requirements:Dict[str,Any]={}, source:str=""):
+            requirements:Dict[str,Any]={}, source:str="", priority:int=0):
         """BashRecipe Constructor. This is used to execute bash scripts, 
         enabling anything not natively supported by MEOW."""
-        super().__init__(name, recipe, parameters, requirements)
+        super().__init__(name, recipe, parameters, requirements, 
+            priority=priority)
         self._is_valid_source(source)
         self.source = source
 
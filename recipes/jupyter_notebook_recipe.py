@@ -31,10 +31,11 @@ class JupyterNotebookRecipe(BaseRecipe):
     # A path to the jupyter notebook used to create this recipe
     source:str
     def __init__(self, name:str, recipe:Any, parameters:Dict[str,Any]={}, 
-            requirements:Dict[str,Any]={}, source:str=""):
+            requirements:Dict[str,Any]={}, source:str="", priority:int=0):
         """JupyterNotebookRecipe Constructor. This is used to execute analysis 
         code using the papermill module."""
-        super().__init__(name, recipe, parameters, requirements)
+        super().__init__(name, recipe, parameters, requirements, 
+            priority=priority)
         self._is_valid_source(source)
         self.source = source
 
@@ -27,10 +27,11 @@ from meow_base.patterns.file_event_pattern import EVENT_TYPE_WATCHDOG
 
 class PythonRecipe(BaseRecipe):
     def __init__(self, name:str, recipe:List[str], parameters:Dict[str,Any]={}, 
-            requirements:Dict[str,Any]={}):
+            requirements:Dict[str,Any]={}, priority:int=0):
         """PythonRecipe Constructor. This is used to execute python analysis 
         code."""
-        super().__init__(name, recipe, parameters, requirements)
+        super().__init__(name, recipe, parameters, requirements, 
+            priority=priority)
 
     def _is_valid_recipe(self, recipe:List[str])->None:
         """Validation check for 'recipe' variable from main constructor. 
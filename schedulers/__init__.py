@@ -0,0 +1,5 @@
+
+from .fifo_scheduler import FifoScheduler
+from .priority_scheduler import PriorityScheduler
+from .shortest_runtime_scheduler import ShortestRuntimeScheduler
+from .fair_share_scheduler import FairShareScheduler
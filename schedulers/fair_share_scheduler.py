@@ -0,0 +1,100 @@
+
+"""
+This file contains definitions for the FairShareScheduler, which shares 
+conductors between the rules with queued jobs.
+
+Author(s): David Marchant
+"""
+
+from time import time
+from typing import Any, Dict, List
+
+from meow_base.core.base_scheduler import BaseScheduler
+from meow_base.core.vars import JOB_RULE, JOB_PATTERN
+from meow_base.functionality.validation import check_type, \
+    valid_dict_multiple_types
+
+# Default time for the usage of each rule to halve, in seconds
+DEFAULT_HALF_LIFE = 300
+
+# Usage below which a rule without queued jobs is forgotten
+_MIN_USAGE = 0.001
+
+
+class FairShareScheduler(BaseScheduler):
+    # The share of dispatched jobs each pattern's rules should recieve, 
+    # relative to others. Patterns not included have a weight of 1
+    weights:Dict[str,float]
+    # Time for the usage of each rule to halve, in seconds
+    half_life:float
+    # How many jobs each rule has had dispatched, scaled by its weight and 
+    # decayed according to how long ago they were dispatched
+    _usage:Dict[Any,float]
+    # When '_usage' was last decayed
+    _decayed_at:float
+    def __init__(self, weights:Dict[str,float]={}, 
+            half_life:float=DEFAULT_HALF_LIFE)->None:
+        """FairShareScheduler Constructor. Jobs are offered from the rule that 
+        has had the fewest jobs dispatched relative to its weight, with jobs 
+        from the same rule offered oldest first. Weights are given per pattern 
+        name, as rule names are generated. A rule that was not recently 
+        queueing jobs starts level with the least served queueing rule, so 
+        that it cannot use the time it was idle to starve other rules. Jobs 
+        count for half as much every half_life seconds after they were 
+        dispatched, so that shares follow recent use, and rules without 
+        queued jobs are forgotten once their usage has decayed away."""
+        super().__init__()
+        valid_dict_multiple_types(weights, str, [float, int], strict=False, 
+            min_length=0, hint="FairShareScheduler.weights")
+        for pattern, weight in weights.items():
+            if weight <= 0:
+                raise ValueError("FairShareScheduler.weights must be greater "
+                    f"than 0. Got {weight} for '{pattern}'")
+        self.weights = weights
+        check_type(half_life, float, alt_types=[int], 
+            hint="FairShareScheduler.half_life")
+        if half_life <= 0:
+            raise ValueError("FairShareScheduler.half_life must be greater "
+                f"than 0. Got {half_life}")
+        self.half_life = half_life
+        self._usage = {}
+        self._decayed_at = time()
+
+    def _get_group_key(self, job:Dict[str,Any])->Any:
+        return (job.get(JOB_PATTERN, None), job.get(JOB_RULE, None))
+
+    def _get_group_order(self, keys:List[Any])->List[Any]:
+        return sorted(keys, key=lambda k: self._usage.get(k, 0))
+
+    def add_job(self, job_dir:str, job:Dict[str,Any])->None:
+        key = self._get_group_key(job)
+        if key not in self._groups:
+            self._decay()
+            # Bring newly queueing rules level with those already queueing
+            active = [self._usage.get(k, 0) for k in self._groups.keys()]
+            if active:
+                self._usage[key] = max(self._usage.get(key, 0), min(active))
+        super().add_job(job_dir, job)
+
+    def job_dispatched(self, job_dir:str, job:Dict[str,Any])->None:
+        """Function to record that a rule has had another job dispatched."""
+        self._decay()
+        key = self._get_group_key(job)
+        self._usage[key] = self._usage.get(key, 0) \
+            + 1 / self.weights.get(key[0], 1.0)
+
+    def _decay(self)->None:
+        """Function to decay the usage of every rule by the time since it was
+        last decayed. As all usage decays at the same rate, the order rules 
+        are served in is unchanged, so this is only needed before usage is 
+        added to. Rules without queued jobs whose usage has decayed away are
+        removed."""
+        now = time()
+        factor = 0.5 ** ((now - self._decayed_at) / self.half_life)
+        self._decayed_at = now
+        for key in list(self._usage.keys()):
+            usage = self._usage[key] * factor
+            if usage < _MIN_USAGE and key not in self._groups:
+                self._usage.pop(key)
+            else:
+                self._usage[key] = usage
@@ -0,0 +1,25 @@
+
+"""
+This file contains definitions for the FifoScheduler, which offers jobs to 
+conductors in the order they were queued.
+
+Author(s): David Marchant
+"""
+
+from typing import Any, Dict, List
+
+from meow_base.core.base_scheduler import BaseScheduler
+
+
+class FifoScheduler(BaseScheduler):
+    def __init__(self)->None:
+        """FifoScheduler Constructor. This is the default scheduler of a 
+        runner, and will offer the oldest queued job first."""
+        super().__init__()
+
+    def _get_group_key(self, job:Dict[str,Any])->Any:
+        """All jobs are queued within the same group."""
+        return None
+
+    def _get_group_order(self, keys:List[Any])->List[Any]:
+        return keys
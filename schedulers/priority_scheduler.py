@@ -0,0 +1,26 @@
+
+"""
+This file contains definitions for the PriorityScheduler, which offers jobs to 
+conductors according to the priority given by their pattern and recipe.
+
+Author(s): David Marchant
+"""
+
+from typing import Any, Dict, List
+
+from meow_base.core.base_scheduler import BaseScheduler
+from meow_base.core.vars import JOB_PRIORITY
+
+
+class PriorityScheduler(BaseScheduler):
+    def __init__(self)->None:
+        """PriorityScheduler Constructor. Jobs with the highest priority are 
+        offered first, with jobs of the same priority offered oldest first. 
+        Jobs without a priority are treated as having a priority of 0."""
+        super().__init__()
+
+    def _get_group_key(self, job:Dict[str,Any])->Any:
+        return job.get(JOB_PRIORITY, 0)
+
+    def _get_group_order(self, keys:List[Any])->List[Any]:
+        return sorted(keys, reverse=True)
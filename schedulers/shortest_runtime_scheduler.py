@@ -0,0 +1,60 @@
+
+"""
+This file contains definitions for the ShortestRuntimeScheduler, which offers 
+jobs to conductors according to how long jobs from the same rule have 
+previously taken to run.
+
+Author(s): David Marchant
+"""
+
+from typing import Any, Dict, List
+
+from meow_base.core.base_scheduler import BaseScheduler
+from meow_base.core.vars import JOB_RULE
+from meow_base.functionality.validation import check_type
+
+
+class ShortestRuntimeScheduler(BaseScheduler):
+    # The expected runtime of jobs from each rule, in seconds
+    expected_runtimes:Dict[str,float]
+    # The expected runtime of jobs from rules with no recorded runtimes
+    default_runtime:float
+    # How strongly a new runtime affects the expected runtime of a rule, 
+    # between 0 and 1
+    smoothing:float
+    def __init__(self, default_runtime:float=0.0, smoothing:float=0.5)->None:
+        """ShortestRuntimeScheduler Constructor. Jobs from the rule with the 
+        shortest expected runtime are offered first, with jobs from the same 
+        rule offered oldest first. Expected runtimes are an exponential moving 
+        average of the runtimes recorded by the runner. By default, rules with 
+        no recorded runtimes are offered first, so that their runtimes are 
+        quickly learnt."""
+        super().__init__()
+        check_type(default_runtime, float, alt_types=[int], 
+            hint="ShortestRuntimeScheduler.default_runtime")
+        self.default_runtime = default_runtime
+        check_type(smoothing, float, alt_types=[int], 
+            hint="ShortestRuntimeScheduler.smoothing")
+        if smoothing <= 0 or smoothing > 1:
+            raise ValueError("ShortestRuntimeScheduler.smoothing must be "
+                f"greater than 0 and at most 1. Got {smoothing}")
+        self.smoothing = smoothing
+        self.expected_runtimes = {}
+
+    def _get_group_key(self, job:Dict[str,Any])->Any:
+        return job.get(JOB_RULE, None)
+
+    def _get_group_order(self, keys:List[Any])->List[Any]:
+        return sorted(keys, key=lambda k: 
+            self.expected_runtimes.get(k, self.default_runtime))
+
+    def record_runtime(self, job:Dict[str,Any], runtime:float)->None:
+        """Function to update the expected runtime of the rule a job was 
+        created by."""
+        key = self._get_group_key(job)
+        if key not in self.expected_runtimes:
+            self.expected_runtimes[key] = runtime
+        else:
+            self.expected_runtimes[key] = \
+                self.smoothing * runtime \
+                + (1 - self.smoothing) * self.expected_runtimes[key]
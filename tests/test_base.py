@@ -1,16 +1,26 @@
 
+import pickle
 import unittest
  
+from copy import copy, deepcopy
+from multiprocessing import Pipe
+from threading import RLock, Thread
 from typing import Any, Union, Tuple, Dict, List
 
 from meow_base.core.base_conductor import BaseConductor
 from meow_base.core.base_handler import BaseHandler
-from meow_base.core.base_monitor import BaseMonitor
+from meow_base.core.base_monitor import BaseMonitor, ReadOnlyDict, \
+    SnapshotDict
 from meow_base.core.base_pattern import BasePattern
 from meow_base.core.base_recipe import BaseRecipe
-from meow_base.core.vars import SWEEP_STOP, SWEEP_JUMP, SWEEP_START
+from meow_base.core.base_scheduler import BaseScheduler
+from meow_base.core.rule import is_registered_rule, get_registered_rule, \
+    unpin_rule
+from meow_base.core.vars import SWEEP_STOP, SWEEP_JUMP, SWEEP_START, \
+    EVENT_RULE
 from meow_base.patterns.file_event_pattern import FileEventPattern
-from shared import setup, teardown
+from meow_base.recipes.jupyter_notebook_recipe import JupyterNotebookRecipe
+from shared import BAREBONES_NOTEBOOK, setup, teardown
 
 
 class BaseRecipeTests(unittest.TestCase):
@@ -179,6 +189,229 @@ class BaseMonitorTests(unittest.TestCase):
             
         FullTestMonitor({}, {})
 
+    # Test that ReadOnlyDict cannot be changed
+    def testReadOnlyDict(self)->None:
+        read_only = ReadOnlyDict({"a": [1]})
+        self.assertIsInstance(read_only, dict)
+        self.assertEqual(read_only, {"a": [1]})
+
+        for change in [lambda d: d.__setitem__("b", 2), 
+                lambda d: d.__delitem__("a"), lambda d: d.pop("a"), 
+                lambda d: d.popitem(), lambda d: d.clear(), 
+                lambda d: d.update({"b": 2}), 
+                lambda d: d.setdefault("b", 2)]:
+            with self.assertRaises(TypeError):
+                change(read_only)
+        self.assertEqual(read_only, {"a": [1]})
+
+        # Copies may be changed, but deep copies are still read-only
+        copied = read_only.copy()
+        copied["b"] = 2
+        self.assertIs(copy(read_only), read_only)
+        deep = deepcopy(read_only)
+        self.assertIsInstance(deep, ReadOnlyDict)
+        self.assertIsNot(deep["a"], read_only["a"])
+        self.assertEqual(pickle.loads(pickle.dumps(read_only)), read_only)
+
+    # Test that SnapshotDict only copies its snapshots once read after a 
+    # change
+    def testSnapshotDict(self)->None:
+        lock = RLock()
+        snapshots = SnapshotDict({"a": 1}, lock)
+        first = snapshots.snapshot()
+        self.assertIsInstance(first, ReadOnlyDict)
+        self.assertEqual(first, {"a": 1})
+        self.assertIs(snapshots.snapshot(), first)
+
+        # Changes are not copied until read
+        with lock:
+            for i in range(1000):
+                snapshots.update({str(i): i})
+            snapshots.pop("a")
+            self.assertIsNone(snapshots._snapshot)
+        self.assertEqual(len(snapshots), 1000)
+        self.assertIn("1", snapshots)
+        self.assertEqual(snapshots["1"], 1)
+
+        second = snapshots.snapshot()
+        self.assertEqual(len(second), 1000)
+        self.assertNotIn("a", second)
+        self.assertIs(snapshots.snapshot(), second)
+
+        # Snapshots already taken are not changed
+        self.assertEqual(first, {"a": 1})
+        with self.assertRaises(TypeError):
+            second["b"] = 2
+
+    # Test that BaseMonitor sends events in batches
+    def testBaseMonitorBatching(self)->None:
+        class FullTestMonitor(BaseMonitor):
+            def start(self):
+                pass
+            def stop(self):
+                pass
+            def _get_valid_pattern_types(self)->List[type]:
+                return [BasePattern]
+            def _get_valid_recipe_types(self)->List[type]:
+                return [BaseRecipe]
+
+        monitor = FullTestMonitor({}, {})
+        self.assertEqual(monitor.batch_size, 1)
+        reader, writer = Pipe()
+        monitor.to_runner_event = writer
+        monitor.send_event_to_runner({"id": 0})
+        self.assertEqual(reader.recv(), {"id": 0})
+
+        monitor = FullTestMonitor({}, {}, batch_size=3, batch_time=0.5)
+        monitor.to_runner_event = writer
+
+        # Full batches are sent immediately
+        for i in range(4):
+            monitor.send_event_to_runner({"id": i})
+        self.assertTrue(reader.poll(0.1))
+        self.assertEqual(reader.recv(), [{"id": 0}, {"id": 1}, {"id": 2}])
+
+        # Others once the batch time has passed
+        self.assertFalse(reader.poll(0.2))
+        self.assertTrue(reader.poll(1))
+        self.assertEqual(reader.recv(), [{"id": 3}])
+
+        # Or when flushed
+        monitor.send_event_to_runner({"id": 4})
+        monitor.flush_events()
+        self.assertEqual(reader.recv(), [{"id": 4}])
+        self.assertIsNone(monitor._batch_timer)
+        monitor.flush_events()
+        self.assertFalse(reader.poll(0.6))
+
+        # Unbatched events do not overtake those waiting in a batch
+        monitor.send_event_to_runner({"id": 5})
+        monitor.batch_size = 1
+        monitor.send_event_to_runner({"id": 6})
+        self.assertEqual(reader.recv(), [{"id": 5}])
+        self.assertEqual(reader.recv(), {"id": 6})
+        self.assertIsNone(monitor._batch_timer)
+
+        with self.assertRaises(ValueError):
+            FullTestMonitor({}, {}, batch_size=0)
+
+        with self.assertRaises(ValueError):
+            FullTestMonitor({}, {}, batch_time=-1)
+
+        with self.assertRaises(TypeError):
+            FullTestMonitor({}, {}, batch_time="1")
+
+    # Test that BaseMonitor sends events from several threads intact
+    def testBaseMonitorConcurrentSends(self)->None:
+        class FullTestMonitor(BaseMonitor):
+            def start(self):
+                pass
+            def stop(self):
+                pass
+            def _get_valid_pattern_types(self)->List[type]:
+                return [BasePattern]
+            def _get_valid_recipe_types(self)->List[type]:
+                return [BaseRecipe]
+
+        monitor = FullTestMonitor({}, {})
+        reader, writer = Pipe()
+        monitor.to_runner_event = writer
+
+        def send_events(sender:int):
+            for i in range(5):
+                monitor.send_event_to_runner(
+                    {"sender": sender, "id": i, "data": "-" * 200000})
+
+        threads = [Thread(target=send_events, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        received = [reader.recv() for _ in range(20)]
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            sorted((e["sender"], e["id"]) for e in received),
+            sorted((s, i) for s in range(4) for i in range(5))
+        )
+        for event in received:
+            self.assertEqual(len(event["data"]), 200000)
+
+    # Test that BaseMonitor releases held events in order, and batched
+    def testBaseMonitorReleaseHeldEvents(self)->None:
+        class FullTestMonitor(BaseMonitor):
+            def start(self):
+                pass
+            def stop(self):
+                pass
+            def _get_valid_pattern_types(self)->List[type]:
+                return [BasePattern]
+            def _get_valid_recipe_types(self)->List[type]:
+                return [BaseRecipe]
+
+        monitor = FullTestMonitor({}, {}, batch_size=2, batch_time=0.1)
+        reader, writer = Pipe()
+        monitor.to_runner_event = writer
+
+        monitor.throttle()
+        for i in range(3):
+            monitor.send_event_to_runner({"id": i})
+        self.assertFalse(reader.poll(0.2))
+
+        # Events sent whilst the held ones are released wait behind them
+        monitor.unthrottle()
+        for i in range(3, 5):
+            monitor.send_event_to_runner({"id": i})
+
+        received = []
+        while reader.poll(1):
+            message = reader.recv()
+            self.assertIsInstance(message, list)
+            self.assertLessEqual(len(message), 2)
+            received.extend(message)
+        self.assertEqual([e["id"] for e in received], list(range(5)))
+        self.assertIsNone(monitor._release_thread)
+        self.assertEqual(len(monitor._held_events), 0)
+
+    # Test that BaseMonitor sends rules by reference, and that they can still
+    # be resolved once removed whilst being sent
+    def testBaseMonitorRuleReferences(self)->None:
+        class FullTestMonitor(BaseMonitor):
+            def start(self):
+                pass
+            def stop(self):
+                pass
+            def _get_valid_pattern_types(self)->List[type]:
+                return [FileEventPattern]
+            def _get_valid_recipe_types(self)->List[type]:
+                return [JupyterNotebookRecipe]
+
+        pattern = FileEventPattern("pattern", "path", "recipe", "file")
+        recipe = JupyterNotebookRecipe("recipe", BAREBONES_NOTEBOOK)
+        monitor = FullTestMonitor(
+            {pattern.name: pattern}, {recipe.name: recipe})
+        reader, writer = Pipe()
+        monitor.to_runner_event = writer
+
+        rule = list(monitor.get_rules().values())[0]
+        self.assertTrue(is_registered_rule(rule))
+        name, version = rule.name, rule.version
+
+        monitor.send_event_to_runner({EVENT_RULE: rule})
+        monitor.remove_recipe(recipe.name)
+        self.assertEqual(len(monitor.get_rules()), 0)
+        del rule
+
+        received = reader.recv()[EVENT_RULE]
+        self.assertEqual(received.name, name)
+        self.assertEqual(received.version, version)
+        self.assertEqual(received.recipe.recipe, BAREBONES_NOTEBOOK)
+
+        # Once unpinned, the removed rule is no longer registered
+        unpin_rule(received)
+        del received
+        with self.assertRaises(KeyError):
+            get_registered_rule(name, version)
+
 
 # TODO test for base functions
 class BaseHandleTests(unittest.TestCase):
@@ -241,3 +474,32 @@ class BaseConductorTests(unittest.TestCase):
                 pass
 
         FullTestConductor()
+
+
+class BaseSchedulerTests(unittest.TestCase):
+    def setUp(self)->None:
+        super().setUp()
+        setup()
+
+    def tearDown(self)->None:
+        super().tearDown()
+        teardown()
+
+    # Test that BaseScheduler instantiation
+    def testBaseScheduler(self)->None:
+        with self.assertRaises(TypeError):
+            BaseScheduler()
+
+        class TestScheduler(BaseScheduler):
+            pass
+
+        with self.assertRaises(NotImplementedError):
+            TestScheduler()
+
+        class FullTestScheduler(BaseScheduler):
+            def _get_group_key(self, job:Dict[str,Any])->Any:
+                pass
+            def _get_group_order(self, keys:List[Any])->List[Any]:
+                pass
+
+        FullTestScheduler()
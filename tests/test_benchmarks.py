@@ -0,0 +1,193 @@
+
+import json
+import os
+import unittest
+
+from meow_base.benchmarks import BenchmarkRecorder, run_scenario, \
+    run_benchmarks, compare_results, read_results, write_results
+from meow_base.benchmarks.runner_benchmark import percentile, \
+    get_scenario_name, DEFAULT_BASELINE, DEFAULT_QUEUE_SIZES, \
+    DEFAULT_COMPONENT_COUNTS, DEFAULT_RATE, DEFAULT_EVENTS
+from shared import TEST_DIR, setup, teardown
+
+
+class BenchmarkTests(unittest.TestCase):
+    def setUp(self)->None:
+        super().setUp()
+        setup()
+
+    def tearDown(self)->None:
+        super().tearDown()
+        teardown()
+
+    # Test percentile uses the nearest rank
+    def testPercentile(self)->None:
+        self.assertIsNone(percentile([], 50))
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([3, 1, 2], 0), 1)
+
+    # Test BenchmarkRecorder records latencies
+    def testBenchmarkRecorder(self)->None:
+        recorder = BenchmarkRecorder(2)
+        self.assertFalse(recorder.done.is_set())
+
+        recorder.job_created("job_one", 1)
+        recorder.job_created("job_two", 2)
+        recorder.job_dispatched("job_one")
+        self.assertFalse(recorder.done.is_set())
+        recorder.job_dispatched("job_two")
+        self.assertTrue(recorder.done.is_set())
+
+        self.assertEqual(len(recorder.latencies()), 2)
+        self.assertEqual(len(recorder.latencies(since=2)), 1)
+
+        self.assertTrue(BenchmarkRecorder(0).done.is_set())
+
+        with self.assertRaises(ValueError):
+            BenchmarkRecorder(-1)
+
+    # Test a scenario dispatches every event to a conductor
+    def testRunScenario(self)->None:
+        result = run_scenario(rate=200, events=20, queue_size=5, handlers=2,
+            conductors=2, work_dir=TEST_DIR, timeout=30)
+
+        self.assertTrue(result["completed"])
+        self.assertEqual(result["dispatched"], 25)
+        self.assertGreater(result["throughput"], 0)
+        self.assertLessEqual(result["latency_p50"], result["latency_p99"])
+        self.assertGreater(result["peak_memory"], 0)
+        json.dumps(result)
+
+        # Events may be sent by the monitor in batches
+        result = run_scenario(rate=200, events=20, batch_size=8, 
+            work_dir=TEST_DIR, trace_memory=False, timeout=30)
+        self.assertTrue(result["completed"])
+        self.assertEqual(result["dispatched"], 20)
+        self.assertEqual(result["batch_size"], 8)
+
+        # Without a rate, the monitor sends every event straight away
+        result = run_scenario(rate=None, events=20, work_dir=TEST_DIR, 
+            trace_memory=False, timeout=30)
+        self.assertTrue(result["completed"])
+        self.assertTrue(result["saturated"])
+        self.assertEqual(result["dispatched"], 20)
+        self.assertGreater(result["throughput"], 0)
+
+        with self.assertRaises(ValueError):
+            run_scenario(handlers=0)
+
+        with self.assertRaises(ValueError):
+            run_scenario(rate=0)
+
+    # Test results are compared against a baseline
+    def testCompareResults(self)->None:
+        name = get_scenario_name(0, 1, 1)
+        baseline = {
+            "results": {
+                name: {
+                    "completed": True,
+                    "dispatched": 10,
+                    "throughput": 100,
+                    "latency_p50": 0.1,
+                    "latency_p99": 0.2,
+                    "peak_memory": 1000
+                }
+            }
+        }
+
+        filepath = os.path.join(TEST_DIR, "baseline.json")
+        write_results(baseline, filepath)
+        self.assertEqual(read_results(filepath), baseline)
+
+        self.assertEqual(compare_results(baseline, baseline), [])
+
+        results = {
+            "results": {
+                name: {
+                    **baseline["results"][name],
+                    "throughput": 90,
+                    "latency_p99": 0.3
+                },
+                "unknown": baseline["results"][name]
+            }
+        }
+        regressions = compare_results(results, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("latency_p99", regressions[0])
+
+        regressions = compare_results(results, baseline, tolerance=0.05)
+        self.assertEqual(len(regressions), 2)
+
+        results["results"][name]["completed"] = False
+        regressions = compare_results(results, baseline, tolerance=1)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("timing out", regressions[0])
+
+        # Small changes in latency are not regressions, however large 
+        # relative to the baseline
+        results["results"][name] = {
+            **baseline["results"][name],
+            "latency_p50": 0.14
+        }
+        self.assertEqual(compare_results(results, baseline), [])
+
+        # Only throughput and memory are compared once events are queued
+        for queued in [{"saturated": True}, {"queue_size": 10}]:
+            results["results"][name] = {
+                **baseline["results"][name],
+                **queued,
+                "throughput": 50,
+                "latency_p99": 10
+            }
+            regressions = compare_results(results, baseline)
+            self.assertEqual(len(regressions), 1)
+            self.assertIn("throughput", regressions[0])
+
+        # Results run with different settings are not compared
+        results["results"][name] = {
+            **baseline["results"][name],
+            "events": 20,
+            "throughput": 50
+        }
+        self.assertEqual(compare_results(results, baseline), [])
+
+    # Test the committed baseline covers every default scenario
+    def testDefaultBaseline(self)->None:
+        baseline = read_results(DEFAULT_BASELINE)
+        self.assertEqual(
+            sorted(baseline["results"].keys()),
+            sorted([get_scenario_name(q, c, c, saturated=s)
+                for q in DEFAULT_QUEUE_SIZES 
+                for c in DEFAULT_COMPONENT_COUNTS
+                for s in [False, True]])
+        )
+        for result in baseline["results"].values():
+            self.assertTrue(result["completed"])
+            self.assertEqual(result["events"], DEFAULT_EVENTS)
+            self.assertEqual(result["rate"], 
+                None if result["saturated"] else DEFAULT_RATE)
+        self.assertEqual(compare_results(baseline, baseline), [])
+
+    # Test benchmarks are run across queue sizes and component counts
+    def testRunBenchmarks(self)->None:
+        results = run_benchmarks(rate=500, events=5, queue_sizes=[0, 5],
+            component_counts=[1, 2], trace_memory=False, timeout=30)
+
+        self.assertEqual(
+            sorted(results["results"].keys()),
+            sorted([get_scenario_name(q, c, c, saturated=s)
+                for q in [0, 5] for c in [1, 2] for s in [False, True]])
+        )
+        for result in results["results"].values():
+            self.assertTrue(result["completed"])
+            self.assertIsNone(result["peak_memory"])
+        self.assertIn("python", results["system"])
+
+        results = run_benchmarks(rate=500, events=5, queue_sizes=[0],
+            component_counts=[1], trace_memory=False, timeout=30, 
+            saturate=False)
+        self.assertEqual(list(results["results"].keys()), 
+            [get_scenario_name(0, 1, 1)])
@@ -1,4 +1,5 @@
 
+import hashlib
 import io
 import json
 import unittest
@@ -14,16 +15,20 @@ from typing import Dict
 from meow_base.core.meow import EVENT_KEYS
 from meow_base.core.rule import Rule
 from meow_base.core.vars import CHAR_LOWERCASE, CHAR_UPPERCASE, \
-    SHA256, EVENT_TYPE, EVENT_PATH, LOCK_EXT, EVENT_RULE, JOB_PARAMETERS, \
+    SHA256, SHA256_MMAP, BLAKE2B, FINGERPRINT, EVENT_TYPE, EVENT_PATH, \
+    LOCK_EXT, EVENT_RULE, JOB_PARAMETERS, \
     PYTHON_FUNC, JOB_ID, JOB_EVENT, JOB_ERROR, STATUS_DONE, \
     JOB_TYPE, JOB_PATTERN, JOB_RECIPE, JOB_RULE, JOB_STATUS, JOB_CREATE_TIME, \
-    JOB_REQUIREMENTS, JOB_TYPE_PAPERMILL, STATUS_CREATING
+    JOB_REQUIREMENTS, JOB_TYPE_PAPERMILL, STATUS_CREATING, JOB_PRIORITY
 from meow_base.functionality.debug import setup_debugging
 from meow_base.functionality.file_io import lines_to_string, make_dir, \
     read_file, read_file_lines, read_notebook, read_yaml, rmtree, write_file, \
     write_notebook, write_yaml, threadsafe_read_status, \
     threadsafe_update_status, threadsafe_write_status
-from meow_base.functionality.hashing import get_hash
+from meow_base.functionality import hashing
+from meow_base.functionality.hashing import HashCache, get_hash, \
+    get_hash_types, register_hash_type, FINGERPRINT_BLOCK_SIZE, \
+    FINGERPRINT_SAMPLES, HASH_CACHE_RACY_TIME, MMAP_MIN_AGE, _HASH_TYPES
 from meow_base.functionality.meow import KEYWORD_BASE, KEYWORD_DIR, \
     KEYWORD_EXTENSION, KEYWORD_FILENAME, KEYWORD_JOB, KEYWORD_PATH, \
     KEYWORD_PREFIX, KEYWORD_REL_DIR, KEYWORD_REL_PATH, \
@@ -43,6 +48,12 @@ from shared import TEST_MONITOR_BASE, COMPLETE_NOTEBOOK, APPENDING_NOTEBOOK, \
     COMPLETE_PYTHON_SCRIPT, valid_recipe_two, valid_recipe_one, \
     valid_pattern_one, valid_pattern_two, setup, teardown
 
+def settle(path:str, age:float=10):
+    """Sets the modification time of a file far enough in the past that a 
+    HashCache will keep its hash."""
+    settled = time() - age
+    os.utime(path, (settled, settled))
+
 class DebugTests(unittest.TestCase):
     def setUp(self)->None:
         super().setUp()
@@ -597,6 +608,205 @@ class HashingTests(unittest.TestCase):
         with self.assertRaises(FileNotFoundError):        
             get_hash(file_path, SHA256)
 
+    # Test that each type of hash produces the expected hash
+    def testGetFileHashTypes(self)->None:
+        file_path = os.path.join(TEST_MONITOR_BASE, "hased_file.txt")
+        with open(file_path, 'w') as hashed_file:
+            hashed_file.write("Some data\n")
+
+        self.assertEqual(get_hash(file_path, SHA256_MMAP), 
+            get_hash(file_path, SHA256))
+        self.assertEqual(get_hash(file_path, BLAKE2B), 
+            hashlib.blake2b(b"Some data\n").hexdigest())
+        self.assertEqual(get_hash(file_path, FINGERPRINT), 
+            hashlib.blake2b(b"10Some data\n").hexdigest())
+        self.assertEqual(get_hash(TEST_MONITOR_BASE, BLAKE2B), 
+            hashlib.blake2b(str(os.listdir(TEST_MONITOR_BASE)).encode()
+                ).hexdigest())
+
+        empty_path = os.path.join(TEST_MONITOR_BASE, "empty.txt")
+        open(empty_path, 'w').close()
+        self.assertEqual(get_hash(empty_path, SHA256_MMAP), 
+            hashlib.sha256().hexdigest())
+
+        with self.assertRaises(KeyError):
+            get_hash(file_path, "md5")
+
+    # Test that sha256_mmap only maps files not recently modified
+    def testGetFileHashSha256Mmap(self)->None:
+        file_path = os.path.join(TEST_MONITOR_BASE, "hased_file.txt")
+        with open(file_path, 'w') as hashed_file:
+            hashed_file.write("Some data\n")
+        expected_hash = get_hash(file_path, SHA256)
+
+        mapped = []
+        mmap = hashing.mmap
+        def tracked_mmap(*args, **kwargs):
+            mapped.append(args)
+            return mmap(*args, **kwargs)
+
+        hashing.mmap = tracked_mmap
+        try:
+            self.assertEqual(get_hash(file_path, SHA256_MMAP), expected_hash)
+            self.assertEqual(mapped, [])
+
+            old = time() - MMAP_MIN_AGE - 1
+            os.utime(file_path, (old, old))
+            self.assertEqual(get_hash(file_path, SHA256_MMAP), expected_hash)
+            self.assertEqual(len(mapped), 1)
+        finally:
+            hashing.mmap = mmap
+
+    # Test that fingerprints only sample large files
+    def testGetFileHashFingerprint(self)->None:
+        file_path = os.path.join(TEST_MONITOR_BASE, "large_file.bin")
+        size = (FINGERPRINT_SAMPLES + 4) * FINGERPRINT_BLOCK_SIZE
+        with open(file_path, 'wb') as hashed_file:
+            hashed_file.write(bytes(size))
+        fingerprint = get_hash(file_path, FINGERPRINT)
+
+        # Changes between sampled blocks are not seen
+        with open(file_path, 'r+b') as hashed_file:
+            hashed_file.seek(FINGERPRINT_BLOCK_SIZE + 1)
+            hashed_file.write(b"1")
+        self.assertEqual(get_hash(file_path, FINGERPRINT), fingerprint)
+
+        # Changes to the sampled blocks, or the size, are
+        with open(file_path, 'r+b') as hashed_file:
+            hashed_file.seek(size - 1)
+            hashed_file.write(b"1")
+        self.assertNotEqual(get_hash(file_path, FINGERPRINT), fingerprint)
+
+        with open(file_path, 'ab') as hashed_file:
+            hashed_file.write(b"1")
+        self.assertNotEqual(get_hash(file_path, FINGERPRINT), fingerprint)
+
+    # Test that new types of hash can be registered
+    def testRegisterHashType(self)->None:
+        file_path = os.path.join(TEST_MONITOR_BASE, "hased_file.txt")
+        with open(file_path, 'w') as hashed_file:
+            hashed_file.write("Some data\n")
+
+        register_hash_type("test_hash", lambda p: "file", lambda p: "dir")
+        try:
+            self.assertIn("test_hash", get_hash_types())
+            self.assertEqual(get_hash(file_path, "test_hash"), "file")
+            self.assertEqual(get_hash(TEST_MONITOR_BASE, "test_hash"), "dir")
+        finally:
+            _HASH_TYPES.pop("test_hash")
+
+        with self.assertRaises(TypeError):
+            register_hash_type("test_hash", "file", lambda p: "dir")
+
+    # Test that HashCache reuses hashes of unchanged files
+    def testHashCache(self)->None:
+        file_path = os.path.join(TEST_MONITOR_BASE, "hased_file.txt")
+        with open(file_path, 'w') as hashed_file:
+            hashed_file.write("Some data\n")
+        settle(file_path)
+        expected_hash = \
+            "8557122088c994ba8aa5540ccbb9a3d2d8ae2887046c2db23d65f40ae63abade"
+
+        cache = HashCache(capacity=2)
+        self.assertEqual(cache.get_hash(file_path, SHA256), expected_hash)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        self.assertEqual(cache.get_hash(file_path, SHA256), expected_hash)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Moved files are still found
+        moved_path = os.path.join(TEST_MONITOR_BASE, "moved_file.txt")
+        os.rename(file_path, moved_path)
+        self.assertEqual(cache.get_hash(moved_path, SHA256), expected_hash)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+        # Changed files are hashed again
+        with open(moved_path, 'w') as hashed_file:
+            hashed_file.write("Other data\n")
+        settle(moved_path)
+        self.assertEqual(cache.get_hash(moved_path, SHA256), 
+            get_hash(moved_path, SHA256))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+        # Least recently used hashes are evicted
+        for i in range(3):
+            other_path = os.path.join(TEST_MONITOR_BASE, f"{i}.txt")
+            with open(other_path, 'w') as hashed_file:
+                hashed_file.write(str(i))
+            settle(other_path)
+            cache.get_hash(other_path, SHA256)
+        self.assertEqual(len(cache), 2)
+        cache.get_hash(moved_path, SHA256)
+        self.assertEqual(cache.misses, 6)
+
+        # Directories and missing files are handled as with get_hash
+        self.assertEqual(cache.get_hash(TEST_MONITOR_BASE, SHA256), 
+            get_hash(TEST_MONITOR_BASE, SHA256))
+        with self.assertRaises(FileNotFoundError):        
+            cache.get_hash(file_path, SHA256)
+
+        with self.assertRaises(ValueError):
+            HashCache(capacity=-1)
+
+    # Test that HashCache keeps hashes within its store
+    def testHashCacheStore(self)->None:
+        store_path = os.path.join(TEST_MONITOR_BASE, "hashes.db")
+        file_path = os.path.join(TEST_MONITOR_BASE, "hased_file.txt")
+        with open(file_path, 'w') as hashed_file:
+            hashed_file.write("Some data\n")
+        settle(file_path)
+
+        cache = HashCache(filepath=store_path)
+        expected_hash = cache.get_hash(file_path, SHA256)
+        cache.close()
+
+        # Without anything held in memory, hashes are read from the store
+        cache = HashCache(capacity=0, filepath=store_path)
+        self.assertEqual(cache.get_hash(file_path, SHA256), expected_hash)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        self.assertEqual(len(cache), 0)
+
+        with open(file_path, 'w') as hashed_file:
+            hashed_file.write("Other data\n")
+        settle(file_path)
+        self.assertNotEqual(cache.get_hash(file_path, SHA256), expected_hash)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.close()
+
+        cache = HashCache(filepath=store_path)
+        cache.get_hash(file_path, SHA256)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        cache.close()
+
+
+    # Test that HashCache does not keep hashes of files modified so recently
+    # that they could be changed again without their modification time
+    def testHashCacheRacilyClean(self)->None:
+        file_path = os.path.join(TEST_MONITOR_BASE, "hased_file.txt")
+        with open(file_path, 'w') as hashed_file:
+            hashed_file.write("Some data\n")
+        written = os.stat(file_path)
+
+        cache = HashCache()
+        self.assertEqual(cache.get_hash(file_path, SHA256), 
+            get_hash(file_path, SHA256))
+        self.assertEqual(len(cache), 0)
+
+        # Rewritten with the same size and modification time
+        with open(file_path, 'w') as hashed_file:
+            hashed_file.write("More data\n")
+        os.utime(file_path, ns=(written.st_atime_ns, written.st_mtime_ns))
+        self.assertEqual(os.stat(file_path).st_size, written.st_size)
+        self.assertEqual(cache.get_hash(file_path, SHA256), 
+            get_hash(file_path, SHA256))
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+        # Once settled, the hash is kept
+        settle(file_path, age=HASH_CACHE_RACY_TIME + 1)
+        cache.get_hash(file_path, SHA256)
+        self.assertEqual(len(cache), 1)
+        cache.get_hash(file_path, SHA256)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
 
 class MeowTests(unittest.TestCase):
     def setUp(self)->None:
@@ -708,6 +918,8 @@ class MeowTests(unittest.TestCase):
         self.assertIsInstance(job_dict[JOB_CREATE_TIME], datetime)
         self.assertIn(JOB_REQUIREMENTS, job_dict)
         self.assertEqual(job_dict[JOB_REQUIREMENTS], {})
+        self.assertIn(JOB_PRIORITY, job_dict)
+        self.assertEqual(job_dict[JOB_PRIORITY], 0)
 
     # Test that replace_keywords replaces MEOW keywords in a given dictionary
     def testReplaceKeywords(self)->None:
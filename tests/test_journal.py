@@ -0,0 +1,301 @@
+
+import os
+import sys
+import unittest
+
+from time import time
+
+from meow_base.conductors import LocalPythonConductor
+from meow_base.core.journal import RunnerJournal
+from meow_base.core.runner import MeowRunner
+from meow_base.core.vars import EVENT_PATH, EVENT_RULE, META_FILE, \
+    JOB_STATUS, STATUS_QUEUED
+from meow_base.functionality.file_io import make_dir, rmtree, \
+    threadsafe_write_status
+from meow_base.functionality.meow import create_rule
+from meow_base.patterns.file_event_pattern import FileEventPattern, \
+    WatchdogMonitor, create_watchdog_event
+from meow_base.recipes.python_recipe import PythonRecipe, PythonHandler
+from shared import TEST_DIR, TEST_MONITOR_BASE, TEST_JOB_QUEUE, \
+    TEST_JOB_OUTPUT, COMPLETE_PYTHON_SCRIPT, setup, teardown
+
+
+def make_event(rule, name:str, hash:str="hash", extras={}):
+    return create_watchdog_event(
+        os.path.join(TEST_MONITOR_BASE, "start", name),
+        rule,
+        TEST_MONITOR_BASE,
+        time(),
+        hash,
+        extras=extras
+    )
+
+
+class Removed:
+    pass
+
+
+class RunnerJournalTests(unittest.TestCase):
+    def setUp(self)->None:
+        super().setUp()
+        setup()
+        self.journal_path = os.path.join(TEST_DIR, "journal")
+        self.pattern = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one",
+            "infile")
+        self.recipe = PythonRecipe("recipe_one", COMPLETE_PYTHON_SCRIPT)
+
+    def tearDown(self)->None:
+        super().tearDown()
+        teardown()
+
+    def make_runner(self, journal:RunnerJournal)->MeowRunner:
+        return MeowRunner(
+            WatchdogMonitor(
+                TEST_MONITOR_BASE,
+                {self.pattern.name: self.pattern},
+                {self.recipe.name: self.recipe}
+            ),
+            PythonHandler(job_queue_dir=TEST_JOB_QUEUE),
+            LocalPythonConductor(),
+            job_queue_dir=TEST_JOB_QUEUE,
+            job_output_dir=TEST_JOB_OUTPUT,
+            journal=journal
+        )
+
+    # Test RunnerJournal created
+    def testRunnerJournalCreation(self)->None:
+        journal = RunnerJournal(self.journal_path)
+        self.assertFalse(journal.exists())
+
+        with self.assertRaises(ValueError):
+            RunnerJournal(self.journal_path, compact_after=-1)
+
+        with self.assertRaises(TypeError):
+            RunnerJournal(self.journal_path, sync=1)
+
+    # Test RunnerJournal records are replayed
+    def testRunnerJournalRecover(self)->None:
+        rule = create_rule(self.pattern, self.recipe)
+
+        journal = RunnerJournal(self.journal_path)
+        self.assertEqual(journal.recover(lambda p, r: rule), ({}, {}))
+
+        events = [make_event(rule, n) for n in ["A.txt", "B.txt", "C.txt"]]
+        for event in events:
+            journal.event_enqueued(event)
+        journal.event_dequeued(events[1])
+        journal.job_enqueued("job_one", {"id": "one"})
+        journal.job_enqueued("job_two", {"id": "two", "func": lambda x: x})
+        journal.job_enqueued("job_three", {"id": "three"})
+        journal.job_dequeued("job_one")
+        journal.close()
+
+        recovered = RunnerJournal(self.journal_path)
+        events_found, jobs_found = recovered.recover(lambda p, r: rule)
+
+        self.assertEqual(
+            [e[EVENT_PATH] for e in events_found.values()],
+            [events[0][EVENT_PATH], events[2][EVENT_PATH]]
+        )
+        for event in events_found.values():
+            self.assertIs(event[EVENT_RULE], rule)
+        self.assertEqual(jobs_found,
+            {"job_two": None, "job_three": {"id": "three"}})
+
+        # Events for rules which no longer exist are dropped
+        recovered.close()
+        dropped = RunnerJournal(self.journal_path)
+        events_found, jobs_found = dropped.recover(lambda p, r: None)
+        self.assertEqual(events_found, {})
+        self.assertEqual(len(jobs_found), 2)
+        dropped.close()
+
+    # Test RunnerJournal ignores partially written records
+    def testRunnerJournalTruncated(self)->None:
+        rule = create_rule(self.pattern, self.recipe)
+
+        journal = RunnerJournal(self.journal_path)
+        journal.recover(lambda p, r: rule)
+        journal.event_enqueued(make_event(rule, "A.txt"))
+        journal.event_enqueued(make_event(rule, "B.txt"))
+        journal.close()
+
+        with open(self.journal_path, "rb") as f:
+            contents = f.read()
+        with open(self.journal_path, "wb") as f:
+            f.write(contents[:-5])
+
+        recovered = RunnerJournal(self.journal_path)
+        events_found, _ = recovered.recover(lambda p, r: rule)
+        self.assertEqual(
+            [os.path.basename(e[EVENT_PATH]) for e in events_found.values()],
+            ["A.txt"]
+        )
+
+        # The journal can be added to after recovery
+        recovered.event_enqueued(make_event(rule, "C.txt"))
+        recovered.close()
+
+        events_found, _ = RunnerJournal(self.journal_path).recover(
+            lambda p, r: rule)
+        self.assertEqual(
+            [os.path.basename(e[EVENT_PATH]) for e in events_found.values()],
+            ["A.txt", "C.txt"]
+        )
+
+    # Test RunnerJournal skips records it cannot read, without losing others
+    def testRunnerJournalUnreadable(self)->None:
+        rule = create_rule(self.pattern, self.recipe)
+
+        journal = RunnerJournal(self.journal_path)
+        journal.recover(lambda p, r: rule)
+        journal.event_enqueued(make_event(rule, "A.txt"))
+        journal.event_enqueued(
+            make_event(rule, "B.txt", extras={"removed": Removed()}))
+        journal.event_enqueued(make_event(rule, "C.txt"))
+        journal.close()
+
+        # Records holding classes that no longer exist are skipped
+        removed = Removed
+        module = sys.modules[removed.__module__]
+        delattr(module, "Removed")
+        try:
+            recovered = RunnerJournal(self.journal_path)
+            events_found, _ = recovered.recover(lambda p, r: rule)
+            recovered.close()
+        finally:
+            setattr(module, "Removed", removed)
+        self.assertEqual(
+            [os.path.basename(e[EVENT_PATH]) for e in events_found.values()],
+            ["A.txt", "C.txt"]
+        )
+        self.assertEqual(recovered.skipped, 1)
+        self.assertIsNone(recovered.damaged_filepath)
+
+        # A damaged journal is kept, rather than compacted over
+        with open(self.journal_path, "rb") as f:
+            contents = f.read()
+        journal = RunnerJournal(self.journal_path)
+        journal.recover(lambda p, r: rule)
+        journal.event_enqueued(make_event(rule, "D.txt"))
+        journal.close()
+        with open(self.journal_path, "rb") as f:
+            damaged = bytearray(f.read())
+        damaged[len(contents)] = 0xff
+        with open(self.journal_path, "wb") as f:
+            f.write(damaged)
+
+        recovered = RunnerJournal(self.journal_path)
+        events_found, _ = recovered.recover(lambda p, r: rule)
+        recovered.close()
+        self.assertEqual(
+            [os.path.basename(e[EVENT_PATH]) for e in events_found.values()],
+            ["A.txt", "C.txt"]
+        )
+        self.assertEqual(recovered.damaged_filepath, 
+            f"{self.journal_path}.damaged")
+        with open(recovered.damaged_filepath, "rb") as f:
+            self.assertEqual(f.read(), damaged)
+
+    # Test RunnerJournal is compacted once it has grown
+    def testRunnerJournalCompaction(self)->None:
+        rule = create_rule(self.pattern, self.recipe)
+
+        journal = RunnerJournal(self.journal_path, compact_after=10)
+        journal.recover(lambda p, r: rule)
+
+        kept = make_event(rule, "kept.txt")
+        journal.event_enqueued(kept)
+        for i in range(100):
+            event = make_event(rule, f"{i}.txt")
+            journal.event_enqueued(event)
+            journal.event_dequeued(event)
+
+        self.assertLessEqual(journal._records, 11)
+        journal.close()
+
+        events_found, _ = RunnerJournal(self.journal_path).recover(
+            lambda p, r: rule)
+        self.assertEqual(
+            [os.path.basename(e[EVENT_PATH]) for e in events_found.values()],
+            ["kept.txt"]
+        )
+
+    # Test a MeowRunner resumes its queues from a journal
+    def testRunnerJournalResume(self)->None:
+        runner = self.make_runner(RunnerJournal(self.journal_path))
+        self.assertTrue(runner.monitors[0].apply_retroactive)
+
+        rule = list(runner.monitors[0]._rules.values())[0]
+        for name in ["A.txt", "B.txt"]:
+            runner._enqueue_event(make_event(rule, name))
+        self.assertIsNotNone(runner._dequeue_event(runner.handlers[0]))
+
+        job_dirs = []
+        for name in ["A.txt", "B.txt"]:
+            job = runner.handlers[0].create_job_metadata_dict(
+                make_event(rule, name), {})
+            job_dir = os.path.join(TEST_JOB_QUEUE, job["id"])
+            make_dir(job_dir)
+            threadsafe_write_status(job, os.path.join(job_dir, META_FILE))
+            runner._enqueue_job(job_dir)
+            job_dirs.append(job_dir)
+        runner.journal.close()
+
+        # Jobs no longer on disk are not resumed
+        rmtree(job_dirs[0])
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        for name in ["A.txt", "B.txt"]:
+            with open(os.path.join(TEST_MONITOR_BASE, "start", name), 
+                    "w") as f:
+                f.write(name)
+
+        resumed = self.make_runner(RunnerJournal(self.journal_path))
+        self.assertTrue(resumed.monitors[0].apply_retroactive)
+
+        new_rule = list(resumed.monitors[0]._rules.values())[0]
+        self.assertNotEqual(new_rule.name, rule.name)
+
+        self.assertEqual(resumed._event_count, 1)
+        event = resumed._dequeue_event(resumed.handlers[0])
+        self.assertEqual(os.path.basename(event[EVENT_PATH]), "B.txt")
+        self.assertIs(event[EVENT_RULE], new_rule)
+
+        # Recovered events are skipped by the check of existing files made 
+        # on starting, unless their file has since changed
+        monitor = resumed.monitors[0]
+        reader = resumed.event_connections[0][0]
+        monitor._apply_retroactive_rules()
+        self.assertTrue(reader.poll(5))
+        self.assertEqual(
+            os.path.basename(reader.recv()[EVENT_PATH]), "A.txt")
+        self.assertFalse(reader.poll(0.5))
+
+        with open(os.path.join(TEST_MONITOR_BASE, "start", "B.txt"), "w") as f:
+            f.write("changed")
+        monitor._apply_retroactive_rules()
+        found = []
+        while reader.poll(0.5):
+            found.append(os.path.basename(reader.recv()[EVENT_PATH]))
+        self.assertEqual(sorted(found), ["A.txt", "B.txt"])
+
+        # Only by that first check
+        self.assertEqual(len(monitor._recovered_events), 1)
+        monitor.start()
+        monitor.stop()
+        self.assertEqual(monitor._recovered_events, set())
+
+        self.assertEqual(list(resumed.job_queue), [job_dirs[1]])
+        self.assertEqual(
+            resumed.job_queue.get_job(job_dirs[1])[JOB_STATUS], STATUS_QUEUED)
+        self.assertEqual(
+            resumed._dequeue_job(resumed.conductors[0]), job_dirs[1])
+        resumed.journal.close()
+
+        # Nothing is left to resume once everything has been dequeued
+        empty = self.make_runner(RunnerJournal(self.journal_path))
+        self.assertEqual(empty.event_queue, {})
+        self.assertEqual(len(empty.job_queue), 0)
+        empty.journal.close()
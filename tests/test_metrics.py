@@ -0,0 +1,238 @@
+
+import json
+import os
+import time
+import unittest
+
+from datetime import datetime, timedelta
+
+from meow_base.conductors import LocalPythonConductor
+from meow_base.core.metrics import Histogram, RunnerMetrics, LATENCY_TOTAL, \
+    TIMESTAMP_JOB_ENDED, TIMESTAMP_JOB_STARTED
+from meow_base.core.runner import MeowRunner
+from meow_base.core.vars import EVENT_TIMESTAMPS, EVENT_TIME, META_FILE, \
+    TIMESTAMP_ENQUEUED, TIMESTAMP_DEQUEUED, TIMESTAMP_MATCHED, \
+    TIMESTAMP_RELEASED, JOB_START_TIME, JOB_END_TIME
+from meow_base.functionality.file_io import make_dir, \
+    threadsafe_update_status, threadsafe_write_status
+from meow_base.patterns.file_event_pattern import FileEventPattern, \
+    WatchdogMonitor, create_watchdog_event
+from meow_base.recipes.python_recipe import PythonRecipe, PythonHandler
+from shared import TEST_DIR, TEST_MONITOR_BASE, TEST_JOB_QUEUE, \
+    TEST_JOB_OUTPUT, COMPLETE_PYTHON_SCRIPT, setup, teardown
+
+
+class HistogramTests(unittest.TestCase):
+    def setUp(self)->None:
+        super().setUp()
+        setup()
+
+    def tearDown(self)->None:
+        super().tearDown()
+        teardown()
+
+    # Test Histogram records values
+    def testHistogramRecord(self)->None:
+        hist = Histogram(bounds=[1, 2, 4, 8])
+
+        self.assertIsNone(hist.percentile(50))
+
+        for value in [0.5, 1.5, 1.5, 3, 3, 3, 7, 7, 7, 20]:
+            hist.record(value)
+
+        self.assertEqual(hist.counts, [1, 2, 3, 3, 1])
+        self.assertEqual(hist.count, 10)
+        self.assertEqual(hist.min, 0.5)
+        self.assertEqual(hist.max, 20)
+        self.assertEqual(hist.percentile(10), 1)
+        self.assertEqual(hist.percentile(50), 4)
+        self.assertEqual(hist.percentile(90), 8)
+        self.assertEqual(hist.percentile(100), 20)
+
+        summary = hist.to_dict()
+        self.assertEqual(summary["count"], 10)
+        self.assertEqual(summary["mean"], 5.35)
+        self.assertEqual(summary["p50"], 4)
+        self.assertEqual(summary["buckets"]["inf"], 1)
+        json.dumps(summary)
+
+
+class RunnerMetricsTests(unittest.TestCase):
+    def setUp(self)->None:
+        super().setUp()
+        setup()
+
+    def tearDown(self)->None:
+        super().tearDown()
+        teardown()
+
+    # Test RunnerMetrics created
+    def testRunnerMetricsCreation(self)->None:
+        RunnerMetrics()
+
+        RunnerMetrics(dump_path=os.path.join(TEST_DIR, "metrics.json"),
+            dump_interval=0.5)
+
+        with self.assertRaises(ValueError):
+            RunnerMetrics(dump_interval=0)
+
+        with self.assertRaises(TypeError):
+            RunnerMetrics(dump_interval="1")
+
+    # Test RunnerMetrics records latencies as events and jobs pass through a
+    # runner
+    def testRunnerMetricsLatencies(self)->None:
+        pattern = FileEventPattern(
+            "pattern_one", os.path.join("start", "A.txt"), "recipe_one",
+            "infile")
+        recipe = PythonRecipe("recipe_one", COMPLETE_PYTHON_SCRIPT)
+
+        metrics = RunnerMetrics()
+        handler = PythonHandler(job_queue_dir=TEST_JOB_QUEUE)
+        conductor = LocalPythonConductor()
+        runner = MeowRunner(
+            WatchdogMonitor(
+                TEST_MONITOR_BASE,
+                {pattern.name: pattern},
+                {recipe.name: recipe}
+            ),
+            handler,
+            conductor,
+            job_queue_dir=TEST_JOB_QUEUE,
+            job_output_dir=TEST_JOB_OUTPUT,
+            metrics=metrics
+        )
+        rule = list(runner.monitors[0]._rules.values())[0]
+
+        now = time.time()
+        event = create_watchdog_event(
+            os.path.join(TEST_MONITOR_BASE, "start", "A.txt"),
+            rule,
+            TEST_MONITOR_BASE,
+            now - 3,
+            "hash",
+            extras={
+                EVENT_TIMESTAMPS: {
+                    TIMESTAMP_RELEASED: now - 2,
+                    TIMESTAMP_MATCHED: now - 1
+                }
+            }
+        )
+        runner._enqueue_event(event)
+        self.assertEqual(metrics.get_gauges()["event_queue"], 1)
+        self.assertEqual(metrics.get_gauges()[
+            f"{runner.monitors[0].name}.settling_paths"], 0)
+
+        event = runner._dequeue_event(handler)
+        self.assertIn(TIMESTAMP_ENQUEUED, event[EVENT_TIMESTAMPS])
+        self.assertIn(TIMESTAMP_DEQUEUED, event[EVENT_TIMESTAMPS])
+
+        hists = metrics.get_histograms(rule.name)
+        self.assertEqual(
+            sorted(hists.keys()),
+            sorted([
+                f"{EVENT_TIME}_to_{TIMESTAMP_RELEASED}",
+                f"{TIMESTAMP_RELEASED}_to_{TIMESTAMP_MATCHED}",
+                f"{TIMESTAMP_MATCHED}_to_{TIMESTAMP_ENQUEUED}",
+                f"{TIMESTAMP_ENQUEUED}_to_{TIMESTAMP_DEQUEUED}",
+            ])
+        )
+        self.assertAlmostEqual(
+            hists[f"{EVENT_TIME}_to_{TIMESTAMP_RELEASED}"].total, 1,
+            places=3)
+
+        job = handler.create_job_metadata_dict(event, {})
+        job_dir = os.path.join(TEST_JOB_QUEUE, job["id"])
+        make_dir(job_dir)
+        threadsafe_write_status(job, os.path.join(job_dir, META_FILE))
+        runner._enqueue_job(job_dir)
+        self.assertEqual(metrics.get_gauges()["job_queue"], 1)
+
+        self.assertEqual(runner._dequeue_job(conductor), job_dir)
+        self.assertEqual(metrics.get_gauges()["job_queue"], 0)
+        self.assertEqual(metrics.get_gauges()["running_jobs"], 1)
+
+        # Times known to the runner are used, rather than reading the job
+        # metadata back from disk
+        threadsafe_update_status(
+            {
+                JOB_START_TIME: datetime.now(),
+                JOB_END_TIME: datetime.now() + timedelta(seconds=100)
+            },
+            os.path.join(job_dir, META_FILE)
+        )
+
+        runner._record_runtime(conductor)
+        self.assertEqual(metrics.get_gauges()["running_jobs"], 0)
+
+        hists = metrics.get_histograms(rule.name)
+        self.assertEqual(hists[LATENCY_TOTAL].count, 1)
+        self.assertLess(
+            hists[f"{TIMESTAMP_JOB_STARTED}_to_{TIMESTAMP_JOB_ENDED}"].total,
+            1
+        )
+        # Event stages are only recorded once
+        self.assertEqual(
+            hists[f"{TIMESTAMP_ENQUEUED}_to_{TIMESTAMP_DEQUEUED}"].count, 1)
+
+        snapshot = metrics.snapshot()
+        self.assertIn(rule.name, snapshot["latencies"])
+        self.assertEqual(snapshot["gauges"]["event_queue"], 0)
+        json.dumps(snapshot)
+
+    # Test RunnerMetrics are periodically dumped while a runner is running
+    def testRunnerMetricsDump(self)->None:
+        pattern = FileEventPattern(
+            "pattern_one", os.path.join("start", "A.txt"), "recipe_one",
+            "infile", parameters={
+                "outfile":os.path.join("{BASE}", "output", "{FILENAME}")
+            })
+        recipe = PythonRecipe("recipe_one", COMPLETE_PYTHON_SCRIPT)
+
+        dump_path = os.path.join(TEST_DIR, "metrics.json")
+        metrics = RunnerMetrics(dump_path=dump_path, dump_interval=0.2)
+        runner = MeowRunner(
+            WatchdogMonitor(
+                TEST_MONITOR_BASE,
+                {pattern.name: pattern},
+                {recipe.name: recipe},
+                settletime=1
+            ),
+            PythonHandler(job_queue_dir=TEST_JOB_QUEUE, pause_time=1),
+            LocalPythonConductor(pause_time=1),
+            job_queue_dir=TEST_JOB_QUEUE,
+            job_output_dir=TEST_JOB_OUTPUT,
+            metrics=metrics
+        )
+        runner.start()
+
+        loops = 0
+        while not os.path.exists(dump_path) and loops < 20:
+            time.sleep(0.1)
+            loops += 1
+        self.assertTrue(os.path.exists(dump_path))
+
+        start_dir = os.path.join(TEST_MONITOR_BASE, "start")
+        make_dir(start_dir)
+        with open(os.path.join(start_dir, "A.txt"), "w") as f:
+            f.write("25000")
+
+        rule = list(runner.monitors[0]._rules.keys())[0]
+        loops = 0
+        while LATENCY_TOTAL not in metrics.get_histograms(rule) \
+                and loops < 60:
+            time.sleep(0.5)
+            loops += 1
+
+        runner.stop()
+
+        with open(dump_path, "r") as f:
+            dumped = json.load(f)
+
+        self.assertIn(rule, dumped["latencies"])
+        latencies = dumped["latencies"][rule]
+        self.assertEqual(latencies[LATENCY_TOTAL]["count"], 1)
+        self.assertIn(f"{EVENT_TIME}_to_{TIMESTAMP_RELEASED}", latencies)
+        self.assertIn(f"{TIMESTAMP_RELEASED}_to_{TIMESTAMP_MATCHED}",
+            latencies)
+        self.assertIn("event_queue", dumped["gauges"])
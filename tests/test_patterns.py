@@ -4,20 +4,32 @@ import os
 import unittest
 
 from datetime import datetime
+from fnmatch import translate
 from multiprocessing import Pipe
+from re import match
+from threading import active_count
 from time import sleep, time
+from typing import List
+from watchdog.events import FileCreatedEvent, FileModifiedEvent, \
+    FileClosedEvent, FileDeletedEvent, \
+    FileMovedEvent, FileSystemEventHandler
 
 from meow_base.core.vars import FILE_CREATE_EVENT, EVENT_TYPE, \
     EVENT_RULE, EVENT_PATH, SWEEP_START, \
-    SWEEP_JUMP, SWEEP_STOP, DIR_EVENTS
-from meow_base.functionality.file_io import make_dir
+    SWEEP_JUMP, SWEEP_STOP, DIR_EVENTS, EVENT_TIME, SHA256, \
+    FILE_MODIFY_EVENT, BLAKE2B, FINGERPRINT
+from meow_base.functionality.file_io import make_dir, rmtree
+from meow_base.functionality.hashing import get_hash
 from meow_base.functionality.meow import create_rule
 from meow_base.patterns.file_event_pattern import FileEventPattern, \
     WatchdogMonitor, _DEFAULT_MASK, WATCHDOG_HASH, WATCHDOG_BASE, \
-    EVENT_TYPE_WATCHDOG, WATCHDOG_EVENT_KEYS, create_watchdog_event
+    EVENT_TYPE_WATCHDOG, WATCHDOG_EVENT_KEYS, RulePathIndex, \
+    WatchdogEventHandler, WatchdogSnapshot, create_watchdog_event
+from meow_base.patterns.polling_file_monitor import DirectoryPoller, \
+    PollingFileMonitor
 from meow_base.recipes.jupyter_notebook_recipe import JupyterNotebookRecipe
 from meow_base.recipes.python_recipe import PythonRecipe
-from shared import BAREBONES_NOTEBOOK, TEST_MONITOR_BASE, \
+from shared import BAREBONES_NOTEBOOK, TEST_MONITOR_BASE, TEST_DIR, \
     COUNTING_PYTHON_SCRIPT, APPENDING_NOTEBOOK, setup, teardown
 
 
@@ -151,6 +163,22 @@ class FileEventPatternTests(unittest.TestCase):
             fep = FileEventPattern("name", "path", "recipe", "file", 
                 event_mask=[FILE_CREATE_EVENT, "nope"])
 
+    # Test FileEventPattern created with valid hash type
+    def testFileEventPatternHashType(self)->None:
+        fep = FileEventPattern("name", "path", "recipe", "file")
+        self.assertEqual(fep.hash_type, SHA256)
+
+        fep = FileEventPattern("name", "path", "recipe", "file", 
+            hash_type=FINGERPRINT)
+        self.assertEqual(fep.hash_type, FINGERPRINT)
+
+        with self.assertRaises(TypeError):
+            FileEventPattern("name", "path", "recipe", "file", hash_type=1)
+
+        with self.assertRaises(ValueError):
+            FileEventPattern("name", "path", "recipe", "file", 
+                hash_type="md5")
+
     # Test FileEventPattern created with valid parameter sweep
     def testFileEventPatternSweep(self)->None:
         sweeps = {
@@ -998,3 +1026,1115 @@ class WatchdogMonitorTests(unittest.TestCase):
 
         self.assertIsInstance(rules, dict)
         self.assertEqual(len(rules), 2)
+
+    # Test WatchdogMonitor holds events whilst throttled
+    def testMonitorThrottle(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", 
+            os.path.join("start", "*.txt"), 
+            "recipe_one", 
+            "infile", 
+            parameters={})
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        for name in ["A.txt", "B.txt"]:
+            with open(os.path.join(TEST_MONITOR_BASE, "start", name), 
+                    "w") as f:
+                f.write(name)
+
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {pattern_one.name: pattern_one},
+            {recipe_one.name: recipe_one}
+        )
+        rule = list(wm._rules.values())[0]
+
+        from_monitor_reader, from_monitor_writer = Pipe()
+        wm.to_runner_event = from_monitor_writer
+
+        wm.throttle()
+        path_a = os.path.join(TEST_MONITOR_BASE, "start", "A.txt")
+        path_b = os.path.join(TEST_MONITOR_BASE, "start", "B.txt")
+        wm._send_match(path_a, rule, 1.0)
+        wm._send_match(path_b, rule, 2.0)
+        wm._send_match(path_a, rule, 3.0)
+
+        self.assertEqual(len(wm._held_events), 2)
+        self.assertEqual(wm._held_events[(path_a, rule.name)], 3.0)
+        self.assertFalse(from_monitor_reader.poll(0.1))
+
+        # Held events for deleted files are dropped when released
+        os.remove(path_b)
+        wm.unthrottle()
+
+        self.assertTrue(from_monitor_reader.poll(3))
+        event = from_monitor_reader.recv()
+        self.assertEqual(event[EVENT_PATH], path_a)
+        self.assertEqual(event[EVENT_RULE].name, rule.name)
+        self.assertEqual(event[EVENT_TIME], 3.0)
+        self.assertEqual(event[WATCHDOG_HASH], get_hash(path_a, SHA256))
+        self.assertFalse(from_monitor_reader.poll(0.5))
+        self.assertEqual(len(wm._held_events), 0)
+
+        # Once unthrottled events are sent directly
+        wm._send_match(path_a, rule, 4.0)
+        self.assertTrue(from_monitor_reader.poll(3))
+        self.assertEqual(from_monitor_reader.recv()[EVENT_TIME], 4.0)
+
+    # Test RulePathIndex only matches rules with a matching path and mask
+    def testRulePathIndex(self)->None:
+        recipe = JupyterNotebookRecipe("recipe_one", BAREBONES_NOTEBOOK)
+        patterns = [
+            FileEventPattern("any", "*", "recipe_one", "infile"),
+            FileEventPattern("start_any", os.path.join("start", "*"), 
+                "recipe_one", "infile"),
+            FileEventPattern("start_txt", os.path.join("start", "*.txt"), 
+                "recipe_one", "infile"),
+            FileEventPattern("exact", os.path.join("start", "A.txt"), 
+                "recipe_one", "infile"),
+            FileEventPattern("nested", 
+                os.path.join("start", "dir", "*", "A.txt"), "recipe_one", 
+                "infile"),
+            FileEventPattern("modified", os.path.join("start", "*.txt"), 
+                "recipe_one", "infile", event_mask=[FILE_MODIFY_EVENT]),
+            FileEventPattern("other", os.path.join("other", "*"), 
+                "recipe_one", "infile")
+        ]
+        rules = [create_rule(p, recipe) for p in patterns]
+
+        index = RulePathIndex()
+        for rule in rules:
+            index.add(rule)
+        self.assertEqual(len(index), len(rules))
+
+        def matched(path, event_types=[FILE_CREATE_EVENT]):
+            return [r.pattern.name 
+                for r in index.get_matches(path, event_types)]
+
+        self.assertEqual(matched(os.path.join("start", "A.txt")), 
+            ["any", "start_any", "start_txt", "exact"])
+        self.assertEqual(matched(os.path.join("start", "B.txt")), 
+            ["any", "start_any", "start_txt"])
+        self.assertEqual(matched(os.path.join("start", "B.csv")), 
+            ["any", "start_any"])
+        self.assertEqual(matched(os.path.join("start", "dir", "x", "A.txt")), 
+            ["any", "start_any", "start_txt", "nested"])
+        self.assertEqual(matched("start"), ["any"])
+        self.assertEqual(matched(os.path.join("start", "A.txt"), 
+            [FILE_MODIFY_EVENT]), 
+            ["any", "start_any", "start_txt", "exact", "modified"])
+        self.assertEqual(matched(os.path.join("start", "A.txt"), 
+            [DIR_EVENTS[0]]), [])
+
+        # Matches are the same as testing every rule directly
+        for path in ["A.txt", os.path.join("other", "x", "y"), 
+                os.path.join("start", "dir", "A.txt")]:
+            expected = [r.pattern.name for r in rules 
+                if FILE_CREATE_EVENT in r.pattern.event_mask 
+                and match(translate(r.pattern.triggering_path), path)]
+            self.assertEqual(matched(path), expected)
+
+        # Removed rules are no longer matched, and empty nodes are dropped
+        index.remove(rules[4].name)
+        index.remove(rules[6].name)
+        self.assertNotIn(rules[4].name, index)
+        self.assertEqual(matched(os.path.join("start", "dir", "x", "A.txt")), 
+            ["any", "start_any", "start_txt"])
+        self.assertNotIn("other", index._root.children)
+        self.assertNotIn("dir", index._root.children["start"].children)
+        index.remove("missing")
+
+        # Copies can be changed without changing the original
+        copied = index.copy()
+        copied.remove(rules[0].name)
+        copied.add(rules[4])
+        self.assertIn(rules[0].name, index)
+        self.assertNotIn(rules[4].name, index)
+        self.assertEqual(matched(os.path.join("start", "dir", "x", "A.txt")),
+            ["any", "start_any", "start_txt"])
+        self.assertEqual(len(copied), len(index))
+
+        # Only the nodes along a changed rule's prefix are copied, and the
+        # original is still unaffected by later changes to either
+        index.add(rules[6])
+        copied = index.copy()
+        self.assertIs(copied._root, index._root)
+        copied.remove(rules[6].name)
+        self.assertIsNot(copied._root, index._root)
+        self.assertIs(copied._root.children["start"],
+            index._root.children["start"])
+        self.assertNotIn("other", copied._root.children)
+        self.assertIn("other", index._root.children)
+        index.remove(rules[3].name)
+        self.assertIn(rules[3].name, copied)
+        self.assertEqual(
+            [r.pattern.name for r in copied.get_matches(
+                os.path.join("start", "A.txt"), [FILE_CREATE_EVENT])],
+            ["any", "start_any", "start_txt", "exact"])
+        self.assertEqual(matched(os.path.join("start", "A.txt")),
+            ["any", "start_any", "start_txt"])
+        self.assertEqual(matched(os.path.join("other", "A.txt")),
+            ["any", "other"])
+
+    # Test WatchdogMonitor matches events without waiting on rule changes
+    def testMonitorLockFreeMatch(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one", 
+            "infile")
+        pattern_two = FileEventPattern(
+            "pattern_two", os.path.join("start", "A.txt"), "recipe_one", 
+            "infile")
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {pattern_one.name: pattern_one},
+            {recipe_one.name: recipe_one},
+            hash_workers=0
+        )
+        from_monitor_reader, from_monitor_writer = Pipe()
+        wm.to_runner_event = from_monitor_writer
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        path = os.path.join(TEST_MONITOR_BASE, "start", "A.txt")
+        with open(path, "w") as f:
+            f.write("A")
+        event = FileCreatedEvent(path)
+        event.time_stamp = time()
+        event.event_type = {"created"}
+
+        rules = wm.get_rules()
+        patterns = wm.get_patterns()
+        self.assertIs(wm.get_rules(), rules)
+
+        # Rules held by readers are not changed by later updates
+        wm._rules_lock.acquire()
+        try:
+            wm.match(event)
+            self.assertTrue(from_monitor_reader.poll(1))
+            from_monitor_reader.recv()
+        finally:
+            wm._rules_lock.release()
+
+        wm.add_pattern(pattern_two)
+        self.assertEqual(len(rules), 1)
+        self.assertEqual(len(patterns), 1)
+        self.assertEqual(len(wm.get_rules()), 2)
+        self.assertEqual(len(wm.get_patterns()), 2)
+        # New rules are applied retroactively
+        self.assertTrue(from_monitor_reader.poll(1))
+        self.assertEqual(
+            from_monitor_reader.recv()[EVENT_RULE].pattern.name, "pattern_two")
+
+        wm.match(event)
+        sent = []
+        while from_monitor_reader.poll(0.1):
+            sent.append(from_monitor_reader.recv()[EVENT_RULE].pattern.name)
+        self.assertEqual(sorted(sent), ["pattern_one", "pattern_two"])
+
+        with self.assertRaises(TypeError):
+            rules["new"] = None
+
+        with self.assertRaises(TypeError):
+            patterns.pop(pattern_one.name)
+
+        wm.remove_recipe(recipe_one.name)
+        self.assertEqual(len(wm.get_rules()), 0)
+        self.assertEqual(len(wm.get_recipes()), 0)
+        self.assertEqual(len(wm._rule_index), 0)
+        wm.match(event)
+        self.assertFalse(from_monitor_reader.poll(0.1))
+
+    # Test WatchdogMonitor keeps its rule index up to date
+    def testMonitorRuleIndex(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one", 
+            "infile")
+        pattern_two = FileEventPattern(
+            "pattern_two", os.path.join("start", "A.txt"), "recipe_one", 
+            "infile")
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {pattern_one.name: pattern_one},
+            {recipe_one.name: recipe_one}
+        )
+        wm.apply_retroactive = False
+        self.assertEqual(len(wm._rule_index), 1)
+
+        wm.add_pattern(pattern_two)
+        self.assertEqual(len(wm._rule_index), 2)
+
+        wm.remove_pattern(pattern_one)
+        self.assertEqual(len(wm._rule_index), 1)
+        self.assertIn(list(wm._rules.keys())[0], wm._rule_index)
+
+        wm.remove_recipe(recipe_one)
+        self.assertEqual(len(wm._rule_index), 0)
+
+    # Test monitor keeps its reverse indexes of definitions up to date
+    def testMonitorReverseIndexes(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one",
+            "infile")
+        pattern_two = FileEventPattern(
+            "pattern_two", os.path.join("start", "A.txt"), "recipe_one",
+            "infile")
+        pattern_three = FileEventPattern(
+            "pattern_three", os.path.join("start", "B.txt"), "recipe_two",
+            "infile")
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+        recipe_two = JupyterNotebookRecipe(
+            "recipe_two", BAREBONES_NOTEBOOK)
+
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {
+                pattern_one.name: pattern_one,
+                pattern_three.name: pattern_three
+            },
+            {recipe_one.name: recipe_one}
+        )
+        wm.apply_retroactive = False
+
+        self.assertEqual(wm._patterns_by_recipe, {
+            "recipe_one": {"pattern_one"},
+            "recipe_two": {"pattern_three"}
+        })
+        self.assertEqual(len(wm._rules_by_pattern), 1)
+        self.assertEqual(len(wm._rules_by_recipe["recipe_one"]), 1)
+
+        wm.add_pattern(pattern_two)
+        self.assertEqual(wm._patterns_by_recipe["recipe_one"],
+            {"pattern_one", "pattern_two"})
+        self.assertEqual(len(wm._rules_by_recipe["recipe_one"]), 2)
+
+        # A recipe arriving later is matched to patterns already waiting on it
+        wm.add_recipe(recipe_two)
+        self.assertEqual(len(wm.get_rules()), 3)
+        self.assertEqual(wm._rules_by_pattern["pattern_three"],
+            wm._rules_by_recipe["recipe_two"])
+
+        wm.remove_pattern(pattern_one)
+        self.assertNotIn("pattern_one", wm._rules_by_pattern)
+        self.assertEqual(wm._patterns_by_recipe["recipe_one"],
+            {"pattern_two"})
+        self.assertEqual(len(wm.get_rules()), 2)
+
+        wm.remove_recipe(recipe_one)
+        self.assertEqual(len(wm.get_rules()), 1)
+        self.assertNotIn("recipe_one", wm._rules_by_recipe)
+        self.assertNotIn("pattern_two", wm._rules_by_pattern)
+        # Patterns stay indexed against their recipe until removed themselves
+        self.assertEqual(wm._patterns_by_recipe["recipe_one"],
+            {"pattern_two"})
+
+        wm.add_recipe(recipe_one)
+        self.assertEqual(len(wm.get_rules()), 2)
+        for rule in wm.get_rules().values():
+            self.assertIn(rule.name,
+                wm._rules_by_pattern[rule.pattern.name])
+            self.assertIn(rule.name,
+                wm._rules_by_recipe[rule.recipe.name])
+
+        # Changing rules elsewhere leaves the rule index for others shared
+        pattern_four = FileEventPattern(
+            "pattern_four", os.path.join("other", "*.txt"), "recipe_one",
+            "infile")
+        start = wm._rule_index._root.children["start"]
+        wm.add_pattern(pattern_four)
+        self.assertIs(wm._rule_index._root.children["start"], start)
+        wm.remove_pattern(pattern_four)
+        self.assertIs(wm._rule_index._root.children["start"], start)
+        self.assertNotIn("other", wm._rule_index._root.children)
+
+    # Test monitor can add many patterns and recipes with a single walk
+    def testMonitorAddInBulk(self)->None:
+        patterns = [
+            FileEventPattern(f"pattern_{i}", os.path.join("start", f"{i}.txt"),
+                "recipe_one" if i % 2 else "recipe_two", "infile")
+            for i in range(10)
+        ]
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+        recipe_two = JupyterNotebookRecipe(
+            "recipe_two", BAREBONES_NOTEBOOK)
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        for i in range(10):
+            with open(os.path.join(TEST_MONITOR_BASE, "start", f"{i}.txt"),
+                    "w") as f:
+                f.write(str(i))
+
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {},
+            {recipe_one.name: recipe_one},
+            hash_workers=2
+        )
+        from_monitor_reader, from_monitor_writer = Pipe()
+        wm.to_runner_event = from_monitor_writer
+
+        with self.assertRaises(TypeError):
+            wm.add_patterns(patterns[0])
+
+        with self.assertRaises(TypeError):
+            wm.add_patterns([patterns[0], recipe_one])
+
+        # Nothing is added if any pattern is already present
+        with self.assertRaises(KeyError):
+            wm.add_patterns([patterns[0], patterns[0]])
+        self.assertEqual(len(wm.get_patterns()), 0)
+
+        walks = []
+        apply_retroactive = wm._apply_retroactive
+        def counting_apply(rules):
+            walks.append(len(rules))
+            apply_retroactive(rules)
+
+        wm._apply_retroactive = counting_apply
+        wm.add_patterns(patterns)
+        self.assertEqual(len(wm.get_patterns()), 10)
+        self.assertEqual(len(wm.get_rules()), 5)
+        self.assertEqual(len(wm._rule_index), 5)
+        self.assertEqual(walks, [5])
+
+        with self.assertRaises(KeyError):
+            wm.add_recipes([recipe_two, recipe_one])
+        self.assertEqual(len(wm.get_recipes()), 1)
+
+        wm.add_recipes([recipe_two])
+        self.assertEqual(len(wm.get_rules()), 10)
+        self.assertEqual(walks, [5, 5])
+
+        events = []
+        while from_monitor_reader.poll(1):
+            events.append(from_monitor_reader.recv())
+        self.assertEqual(
+            sorted(os.path.basename(e[EVENT_PATH]) for e in events),
+            sorted(f"{i}.txt" for i in range(10))
+        )
+
+        # Nothing to add does not walk at all
+        wm.add_patterns([])
+        wm.add_recipes([])
+        self.assertEqual(walks, [5, 5])
+        wm.stop()
+
+    # Test WatchdogEventHandler settles events within a single thread
+    def testEventHandlerDebounce(self)->None:
+        wm = WatchdogMonitor(TEST_MONITOR_BASE, {}, {})
+        matched = []
+        wm.match = matched.append
+
+        handler = WatchdogEventHandler(wm, settletime=1)
+        threads = active_count()
+
+        paths = [os.path.join(TEST_MONITOR_BASE, f"{i}.txt") 
+            for i in range(10)]
+        for _ in range(100):
+            for path in paths:
+                handler.on_created(FileCreatedEvent(path))
+        handler.on_modified(FileModifiedEvent(paths[0]))
+
+        self.assertLessEqual(active_count(), threads + 1)
+        self.assertEqual(matched, [])
+        # Repeated events at a path do not pile up in the debounce heap
+        self.assertEqual(handler.get_gauges(), 
+            {"settling_paths": 10, "scheduled_events": 10})
+
+        sleep(1.5)
+        self.assertEqual(sorted(e.src_path for e in matched), sorted(paths))
+        for event in matched:
+            self.assertTrue(hasattr(event, "release_time"))
+            self.assertGreaterEqual(event.release_time - event.time_stamp, 1)
+        self.assertEqual(
+            [e.event_type for e in matched if e.src_path == paths[0]][0],
+            {"created", "modified"}
+        )
+
+        # Events still settling when stopped are sent straight away
+        late_path = os.path.join(TEST_MONITOR_BASE, "late.txt")
+        handler.on_created(FileCreatedEvent(late_path))
+        handler.on_modified(FileModifiedEvent(late_path))
+        handler.stop()
+        self.assertEqual(len(matched), 11)
+        self.assertEqual(matched[-1].src_path, late_path)
+        self.assertEqual(matched[-1].event_type, {"created", "modified"})
+        self.assertEqual(active_count(), threads)
+
+        # But none are accepted afterwards
+        handler.on_created(FileCreatedEvent(late_path))
+        sleep(1.5)
+        self.assertEqual(len(matched), 11)
+
+    # Test WatchdogEventHandler forgets paths once they have settled
+    def testEventHandlerBounded(self)->None:
+        wm = WatchdogMonitor(TEST_MONITOR_BASE, {}, {})
+        matched = []
+        wm.match = matched.append
+
+        handler = WatchdogEventHandler(wm, settletime=1, max_settling=5)
+        self.assertEqual(handler.get_gauges(), 
+            {"settling_paths": 0, "scheduled_events": 0})
+
+        paths = [os.path.join(TEST_MONITOR_BASE, f"{i}.txt") 
+            for i in range(8)]
+        for path in paths:
+            handler.on_created(FileCreatedEvent(path))
+
+        # The three least recently changed paths are released early
+        sleep(0.5)
+        self.assertEqual([e.src_path for e in matched], paths[:3])
+        self.assertEqual(matched[0].event_type, {"created"})
+        self.assertEqual(handler.get_gauges()["settling_paths"], 5)
+
+        sleep(1)
+        self.assertEqual(sorted(e.src_path for e in matched), sorted(paths))
+        self.assertEqual(handler.get_gauges(), 
+            {"settling_paths": 0, "scheduled_events": 0})
+
+        # Settled paths start afresh
+        handler.on_modified(FileModifiedEvent(paths[0]))
+        sleep(1.5)
+        self.assertEqual(len(matched), 9)
+        self.assertEqual(matched[-1].event_type, {"modified"})
+        self.assertEqual(wm.get_gauges()["settling_paths"], 0)
+        handler.stop()
+
+        with self.assertRaises(ValueError):
+            WatchdogEventHandler(wm, max_settling=-1)
+
+        # Paths released before their heap entries are due leave no more 
+        # skipped entries than there are settling paths
+        handler = WatchdogEventHandler(wm, settletime=5, max_settling=5)
+        for i in range(50):
+            handler.on_created(FileCreatedEvent(paths[i % 8]))
+            handler.on_closed(FileClosedEvent(paths[i % 8]))
+            self.assertLessEqual(handler.get_gauges()["scheduled_events"], 
+                2 * max(1, handler.get_gauges()["settling_paths"]))
+        sleep(0.5)
+        self.assertEqual(len(matched), 59)
+        handler.stop()
+
+    # Test WatchdogEventHandler settles paths once they stop changing
+    def testEventHandlerAdaptive(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("big", "*"), "recipe_one", "infile",
+            min_settletime=0.2, max_settletime=0.5)
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {pattern_one.name: pattern_one},
+            {recipe_one.name: recipe_one}
+        )
+        matched = []
+        wm.match = matched.append
+
+        handler = WatchdogEventHandler(wm, adaptive_settle=True)
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "big"))
+        def path(*parts):
+            return os.path.join(TEST_MONITOR_BASE, *parts)
+
+        def write_slowly(filepath, duration):
+            end = time() + duration
+            with open(filepath, "w") as f:
+                while time() < end:
+                    f.write("-" * 100)
+                    f.flush()
+                    sleep(0.01)
+            return time()
+
+        # Small files are released within milliseconds
+        with open(path("A.txt"), "w") as f:
+            f.write("A")
+        handler.on_created(FileCreatedEvent(path("A.txt")))
+        sleep(0.2)
+        self.assertEqual([e.src_path for e in matched], [path("A.txt")])
+        self.assertLess(matched[0].release_time - matched[0].time_stamp, 0.2)
+        self.assertEqual(matched[0].event_type, {"created"})
+
+        # Paths no longer present need not settle
+        handler.on_deleted(FileDeletedEvent(path("gone.txt")))
+        sleep(0.2)
+        self.assertEqual(matched[-1].src_path, path("gone.txt"))
+
+        # Files still being written are not released
+        handler.on_created(FileCreatedEvent(path("B.txt")))
+        finished = write_slowly(path("B.txt"), 0.5)
+        loops = 0
+        while matched[-1].src_path != path("B.txt") and loops < 20:
+            sleep(0.1)
+            loops += 1
+        self.assertEqual(matched[-1].src_path, path("B.txt"))
+        self.assertGreaterEqual(matched[-1].release_time, finished)
+
+        # Closing a written file releases it straight away
+        handler.on_created(FileCreatedEvent(path("C.txt")))
+        handler.on_closed(FileClosedEvent(path("C.txt")))
+        sleep(0.05)
+        self.assertEqual(matched[-1].src_path, path("C.txt"))
+        self.assertEqual(matched[-1].event_type, {"created", "closed"})
+        count = len(matched)
+        sleep(0.2)
+        self.assertEqual(len(matched), count)
+
+        # Patterns may set their own bounds
+        with open(path("big", "A.txt"), "w") as f:
+            f.write("A")
+        handler.on_created(FileCreatedEvent(path("big", "A.txt")))
+        sleep(0.3)
+        self.assertEqual(len(matched), count)
+        sleep(0.5)
+        self.assertEqual(matched[-1].src_path, path("big", "A.txt"))
+        self.assertGreaterEqual(
+            matched[-1].release_time - matched[-1].time_stamp, 0.2)
+
+        # Paths are released once their longest settle time has passed
+        handler.on_created(FileCreatedEvent(path("big", "B.txt")))
+        finished = write_slowly(path("big", "B.txt"), 1)
+        self.assertEqual(matched[-1].src_path, path("big", "B.txt"))
+        self.assertLess(matched[-1].release_time, finished)
+        self.assertGreaterEqual(
+            matched[-1].release_time - matched[-1].time_stamp, 0.5)
+        handler.stop()
+
+        with self.assertRaises(TypeError):
+            WatchdogEventHandler(wm, adaptive_settle=1)
+
+        with self.assertRaises(ValueError):
+            WatchdogEventHandler(wm, adaptive_settle=True, min_settletime=0)
+
+        with self.assertRaises(ValueError):
+            WatchdogEventHandler(wm, adaptive_settle=True,
+                min_settletime=2, max_settletime=1)
+
+        with self.assertRaises(ValueError):
+            FileEventPattern("pattern_two", "A.txt", "recipe_one", "infile",
+                min_settletime=2, max_settletime=1)
+
+        with self.assertRaises(TypeError):
+            FileEventPattern("pattern_two", "A.txt", "recipe_one", "infile",
+                max_settletime="1")
+
+    # Test WatchdogMonitor hashes matched files once, without blocking
+    def testMonitorHashPool(self)->None:
+        import meow_base.functionality.hashing as hashing
+
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one", 
+            "infile")
+        pattern_two = FileEventPattern(
+            "pattern_two", os.path.join("start", "A.txt"), "recipe_one", 
+            "infile")
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        path = os.path.join(TEST_MONITOR_BASE, "start", "A.txt")
+        with open(path, "w") as f:
+            f.write("A")
+
+        hashed = []
+        get_file_hash = hashing.get_file_hash
+        def slow_hash(path, hash, hint=""):
+            hashed.append(path)
+            sleep(0.5)
+            return get_file_hash(path, hash, hint=hint)
+
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {pattern_one.name: pattern_one, pattern_two.name: pattern_two},
+            {recipe_one.name: recipe_one},
+            hash_workers=2
+        )
+        from_monitor_reader, from_monitor_writer = Pipe()
+        wm.to_runner_event = from_monitor_writer
+
+        event = FileCreatedEvent(path)
+        event.time_stamp = time()
+        event.event_type = {"created"}
+
+        hashing.get_file_hash = slow_hash
+        try:
+            started = time()
+            wm.match(event)
+            self.assertLess(time() - started, 0.25)
+            # Rules can be changed whilst the file is being hashed
+            self.assertTrue(wm._rules_lock.acquire(timeout=0.1))
+            wm._rules_lock.release()
+
+            events = []
+            for _ in range(2):
+                self.assertTrue(from_monitor_reader.poll(3))
+                events.append(from_monitor_reader.recv())
+            self.assertEqual(hashed, [path])
+            self.assertEqual(
+                sorted(e[EVENT_RULE].pattern.name for e in events),
+                ["pattern_one", "pattern_two"])
+            self.assertEqual(events[0][WATCHDOG_HASH], events[1][WATCHDOG_HASH])
+
+            # Files that have gone by the time they are hashed are skipped
+            os.remove(path)
+            wm.match(event)
+            wm.stop()
+            self.assertFalse(from_monitor_reader.poll(0.1))
+        finally:
+            hashing.get_file_hash = get_file_hash
+
+        # Without workers, files are hashed as they are matched
+        with open(path, "w") as f:
+            f.write("A")
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {pattern_one.name: pattern_one},
+            {recipe_one.name: recipe_one},
+            hash_workers=0
+        )
+        wm.to_runner_event = from_monitor_writer
+        wm.match(event)
+        self.assertTrue(from_monitor_reader.poll(0))
+        self.assertIsNone(wm._hash_pool)
+
+        with self.assertRaises(ValueError):
+            WatchdogMonitor(TEST_MONITOR_BASE, {}, {}, hash_workers=-1)
+
+    # Test WatchdogMonitor hashes files with the hash type of each rule
+    def testMonitorHashTypes(self)->None:
+        patterns = {}
+        for name, hash_type in [("pattern_one", SHA256), 
+                ("pattern_two", BLAKE2B), ("pattern_three", BLAKE2B)]:
+            patterns[name] = FileEventPattern(
+                name, os.path.join("start", "*.txt"), "recipe_one", "infile",
+                hash_type=hash_type)
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        path = os.path.join(TEST_MONITOR_BASE, "start", "A.txt")
+        with open(path, "w") as f:
+            f.write("A")
+
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            patterns,
+            {recipe_one.name: recipe_one},
+            hash_workers=0
+        )
+        from_monitor_reader, from_monitor_writer = Pipe()
+        wm.to_runner_event = from_monitor_writer
+
+        event = FileCreatedEvent(path)
+        event.time_stamp = time()
+        event.event_type = {"created"}
+        wm.match(event)
+
+        hashes = {}
+        while from_monitor_reader.poll(0.1):
+            sent = from_monitor_reader.recv()
+            hashes[sent[EVENT_RULE].pattern.name] = sent[WATCHDOG_HASH]
+        self.assertEqual(hashes, {
+            "pattern_one": get_hash(path, SHA256),
+            "pattern_two": get_hash(path, BLAKE2B),
+            "pattern_three": get_hash(path, BLAKE2B)
+        })
+        self.assertEqual(wm.hash_cache.misses, 2)
+        wm.stop()
+
+    # Test WatchdogMonitor walks existing files once for all retroactive rules
+    def testMonitorRetroactiveWalk(self)->None:
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+        patterns = [
+            FileEventPattern("pattern_one", os.path.join("start", "*.txt"), 
+                "recipe_one", "infile"),
+            FileEventPattern("pattern_two", os.path.join("start", "A.txt"), 
+                "recipe_one", "infile"),
+            FileEventPattern("pattern_three", "top", "recipe_one", 
+                "dir_to_count", event_mask=DIR_EVENTS),
+            FileEventPattern("pattern_four", os.path.join("start", "*.txt"), 
+                "recipe_one", "infile", event_mask=[FILE_CREATE_EVENT])
+        ]
+
+        for dir_name in ["start", "top", os.path.join("ignored", "deep")]:
+            make_dir(os.path.join(TEST_MONITOR_BASE, dir_name))
+        for path in [os.path.join("start", "A.txt"), 
+                os.path.join("start", "B.txt"), 
+                os.path.join("start", "C.csv"), 
+                os.path.join("ignored", "deep", "A.txt")]:
+            with open(os.path.join(TEST_MONITOR_BASE, path), "w") as f:
+                f.write("-")
+
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {p.name: p for p in patterns},
+            {recipe_one.name: recipe_one},
+            hash_workers=2
+        )
+        from_monitor_reader, from_monitor_writer = Pipe()
+        wm.to_runner_event = from_monitor_writer
+
+        scanned = []
+        scandir = os.scandir
+        def counting_scandir(path):
+            scanned.append(path)
+            return scandir(path)
+
+        os.scandir = counting_scandir
+        try:
+            wm._apply_retroactive_rules()
+        finally:
+            os.scandir = scandir
+
+        # Directories no rule could match within are not entered
+        self.assertEqual(sorted(scanned), sorted([TEST_MONITOR_BASE, 
+            os.path.join(TEST_MONITOR_BASE, "start"), 
+            os.path.join(TEST_MONITOR_BASE, "top")]))
+
+        events = []
+        while from_monitor_reader.poll(1):
+            events.append(from_monitor_reader.recv())
+        self.assertEqual(
+            sorted((e[EVENT_RULE].pattern.name, 
+                os.path.relpath(e[EVENT_PATH], TEST_MONITOR_BASE)) 
+                for e in events),
+            [
+                ("pattern_one", os.path.join("start", "A.txt")), 
+                ("pattern_one", os.path.join("start", "B.txt")), 
+                ("pattern_three", "top"), 
+                ("pattern_two", os.path.join("start", "A.txt"))
+            ]
+        )
+
+        # Single rules only send their own events
+        rule_one = [r for r in wm._rules.values() 
+            if r.pattern.name == "pattern_one"][0]
+        wm._apply_retroactive_rule(rule_one)
+        events = []
+        while from_monitor_reader.poll(1):
+            events.append(from_monitor_reader.recv())
+        self.assertEqual(len(events), 2)
+        self.assertTrue(all(e[EVENT_RULE].name == rule_one.name for e in events))
+        wm.stop()
+
+        index = RulePathIndex()
+        self.assertFalse(index.may_match_within(""))
+        index.add(rule_one)
+        self.assertTrue(index.may_match_within(""))
+        self.assertTrue(index.may_match_within("start"))
+        self.assertTrue(index.may_match_within(os.path.join("start", "sub")))
+        self.assertFalse(index.may_match_within("top"))
+
+    # Test WatchdogSnapshot records the rules triggered by each path
+    def testWatchdogSnapshot(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one", 
+            "infile")
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+        rule = create_rule(pattern_one, recipe_one)
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        path = os.path.join(TEST_MONITOR_BASE, "start", "A.txt")
+        with open(path, "w") as f:
+            f.write("A")
+
+        def get_version():
+            st = os.stat(path)
+            return (st.st_size, st.st_mtime_ns)
+
+        filepath = os.path.join(TEST_DIR, "snapshot.json")
+        snapshot = WatchdogSnapshot(filepath, interval=3600)
+        self.assertFalse(snapshot.is_unchanged(path, rule))
+        self.assertIsNone(snapshot.get_hash(path, rule))
+
+        snapshot.record(path, rule, "hash", get_version())
+        self.assertTrue(snapshot.is_unchanged(path, rule))
+        self.assertEqual(snapshot.get_hash(path, rule), "hash")
+        # Only written once the interval has passed, or when saved
+        self.assertFalse(os.path.exists(filepath))
+        snapshot.save()
+        self.assertTrue(os.path.exists(filepath))
+
+        # Rules are found by name in later runs
+        loaded = WatchdogSnapshot(filepath)
+        self.assertEqual(len(loaded), 1)
+        self.assertTrue(
+            loaded.is_unchanged(path, create_rule(pattern_one, recipe_one)))
+
+        # Though not if the pattern or recipe has since been changed
+        changed_recipe = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK, parameters={"a": 1})
+        self.assertFalse(loaded.is_unchanged(path, 
+            create_rule(pattern_one, changed_recipe)))
+        self.assertIsNone(loaded.get_hash(path, 
+            create_rule(pattern_one, changed_recipe)))
+
+        with open(path, "a") as f:
+            f.write("A")
+        self.assertFalse(loaded.is_unchanged(path, rule))
+        self.assertEqual(loaded.get_hash(path, rule), "hash")
+
+        loaded.forget(path)
+        self.assertEqual(len(loaded), 0)
+
+        # The version recorded is that given, not whatever the path is now
+        snapshot = WatchdogSnapshot(filepath, interval=0)
+        version = get_version()
+        with open(path, "a") as f:
+            f.write("A")
+        snapshot.record(path, rule, "other", version)
+        self.assertEqual(WatchdogSnapshot(filepath).get_hash(path, rule), 
+            "other")
+        self.assertFalse(WatchdogSnapshot(filepath).is_unchanged(path, rule))
+
+        with self.assertRaises(ValueError):
+            WatchdogSnapshot(filepath, interval=-1)
+
+    # Test WatchdogMonitor only sends retroactive events for new or changed
+    # files, when given a snapshot
+    def testMonitorSnapshot(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one", 
+            "infile")
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        paths = [os.path.join(TEST_MONITOR_BASE, "start", f"{c}.txt") 
+            for c in "ABC"]
+        for path in paths:
+            with open(path, "w") as f:
+                f.write("-")
+
+        filepath = os.path.join(TEST_DIR, "snapshot.json")
+        def run_monitor()->List[str]:
+            wm = WatchdogMonitor(
+                TEST_MONITOR_BASE,
+                {pattern_one.name: pattern_one},
+                {recipe_one.name: recipe_one},
+                snapshot=WatchdogSnapshot(filepath)
+            )
+            from_monitor_reader, from_monitor_writer = Pipe()
+            wm.to_runner_event = from_monitor_writer
+            wm._apply_retroactive_rules()
+            wm.stop()
+            sent = []
+            while from_monitor_reader.poll(0.1):
+                sent.append(from_monitor_reader.recv()[EVENT_PATH])
+            return sorted(sent)
+
+        self.assertEqual(run_monitor(), paths)
+        self.assertEqual(run_monitor(), [])
+
+        # Changed and new files are sent, but those only touched are not
+        with open(paths[0], "w") as f:
+            f.write("changed")
+        os.utime(paths[1], ns=(0, 0))
+        new_path = os.path.join(TEST_MONITOR_BASE, "start", "D.txt")
+        with open(new_path, "w") as f:
+            f.write("-")
+        self.assertEqual(run_monitor(), [paths[0], new_path])
+        self.assertEqual(run_monitor(), [])
+
+        # Updating a recipe at runtime applies it to existing files again
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {pattern_one.name: pattern_one},
+            {recipe_one.name: recipe_one},
+            snapshot=WatchdogSnapshot(filepath)
+        )
+        from_monitor_reader, from_monitor_writer = Pipe()
+        wm.to_runner_event = from_monitor_writer
+        wm.update_recipe(JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK, parameters={"a": 1}))
+        wm.stop()
+        sent = []
+        while from_monitor_reader.poll(0.1):
+            sent.append(from_monitor_reader.recv()[EVENT_PATH])
+        self.assertEqual(sorted(sent), sorted(paths + [new_path]))
+
+    # Test DirectoryPoller finds changes by comparing against what it last saw
+    def testDirectoryPoller(self)->None:
+        class RecordingHandler(FileSystemEventHandler):
+            def __init__(self):
+                self.events = []
+            def on_any_event(self, event):
+                self.events.append((event.event_type, event.is_directory,
+                    os.path.relpath(event.src_path, TEST_MONITOR_BASE)))
+
+        handler = RecordingHandler()
+        poller = DirectoryPoller(handler, TEST_MONITOR_BASE, 
+            full_scan_every=4)
+        poller.index()
+        self.assertFalse(poller.poll())
+
+        start_dir = os.path.join(TEST_MONITOR_BASE, "start")
+        path = os.path.join(start_dir, "A.txt")
+        make_dir(start_dir)
+        with open(path, "w") as f:
+            f.write("A")
+        # Old enough that further changes would alter the modification times
+        os.utime(start_dir, (1, 1))
+        os.utime(TEST_MONITOR_BASE, (1, 1))
+
+        self.assertTrue(poller.poll())
+        self.assertEqual(handler.events, [
+            ("created", True, "start"),
+            ("created", False, os.path.join("start", "A.txt"))
+        ])
+        self.assertEqual(poller.get_gauges()["polled_dirs"], 2)
+
+        # Files edited in place are only seen when every file is checked
+        handler.events = []
+        with open(path, "a") as f:
+            f.write("A")
+        self.assertFalse(poller.poll())
+        self.assertTrue(poller.poll())
+        self.assertEqual(handler.events, 
+            [("modified", False, os.path.join("start", "A.txt"))])
+
+        handler.events = []
+        os.remove(path)
+        self.assertTrue(poller.poll())
+        self.assertEqual(handler.events, 
+            [("deleted", False, os.path.join("start", "A.txt"))])
+
+        handler.events = []
+        rmtree(start_dir)
+        self.assertTrue(poller.poll())
+        self.assertEqual(handler.events, [("deleted", True, "start")])
+        self.assertFalse(poller.poll())
+
+        with self.assertRaises(ValueError):
+            DirectoryPoller(handler, TEST_MONITOR_BASE, min_interval=0)
+
+        with self.assertRaises(ValueError):
+            DirectoryPoller(handler, TEST_MONITOR_BASE, min_interval=2, 
+                max_interval=1)
+
+        with self.assertRaises(TypeError):
+            DirectoryPoller(None, TEST_MONITOR_BASE)
+
+    # Test PollingFileMonitor sends events for changes found by polling
+    def testPollingFileMonitor(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one", 
+            "infile")
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        old_path = os.path.join(TEST_MONITOR_BASE, "start", "A.txt")
+        with open(old_path, "w") as f:
+            f.write("A")
+
+        pfm = PollingFileMonitor(
+            TEST_MONITOR_BASE,
+            {pattern_one.name: pattern_one},
+            {recipe_one.name: recipe_one},
+            min_poll_interval=0.1,
+            max_poll_interval=0.4
+        )
+        from_monitor_reader, from_monitor_writer = Pipe()
+        pfm.to_runner_event = from_monitor_writer
+        pfm.start()
+
+        # Existing files are only sent retroactively
+        self.assertTrue(from_monitor_reader.poll(3))
+        self.assertEqual(from_monitor_reader.recv()[EVENT_PATH], old_path)
+
+        # The time between polls grows whilst nothing changes
+        sleep(1)
+        self.assertEqual(pfm.get_gauges()["poll_interval"], 0.4)
+        self.assertEqual(pfm.get_gauges()["polled_dirs"], 2)
+
+        new_path = os.path.join(TEST_MONITOR_BASE, "start", "B.txt")
+        with open(new_path, "w") as f:
+            f.write("B")
+
+        self.assertTrue(from_monitor_reader.poll(5))
+        event = from_monitor_reader.recv()
+        self.assertEqual(event[EVENT_PATH], new_path)
+        self.assertEqual(event[EVENT_TYPE], EVENT_TYPE_WATCHDOG)
+        self.assertEqual(event[WATCHDOG_HASH], get_hash(new_path, SHA256))
+        self.assertFalse(from_monitor_reader.poll(2))
+
+        pfm.stop()
+        self.assertIsNone(pfm.monitor._poll_thread)
+
+    # Test WatchdogMonitor ignores events at excluded paths
+    def testMonitorExcludes(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", "*", "recipe_one", "infile")
+        recipe_one = JupyterNotebookRecipe(
+            "recipe_one", BAREBONES_NOTEBOOK)
+
+        with self.assertRaises(TypeError):
+            WatchdogMonitor(TEST_MONITOR_BASE, {}, {}, excludes="tmp")
+
+        wm = WatchdogMonitor(
+            TEST_MONITOR_BASE,
+            {pattern_one.name: pattern_one},
+            {recipe_one.name: recipe_one},
+            hash_workers=0,
+            excludes=["tmp", "*.swp"]
+        )
+        wm.add_excludes([
+            os.path.abspath(os.path.join(TEST_MONITOR_BASE, "queue[1]")),
+            os.path.abspath(TEST_DIR)
+        ])
+        self.assertEqual(wm.excludes, ["tmp", "*.swp", "queue[[]1]"])
+
+        def path(*parts):
+            return os.path.join(TEST_MONITOR_BASE, *parts)
+
+        self.assertTrue(wm.is_excluded(path("tmp")))
+        self.assertTrue(wm.is_excluded(path("tmp", "deep", "A.txt")))
+        self.assertTrue(wm.is_excluded(path("start", ".A.txt.swp")))
+        self.assertTrue(wm.is_excluded(path("queue[1]", "job")))
+        self.assertFalse(wm.is_excluded(path("tmpfile")))
+        self.assertFalse(wm.is_excluded(path("queue1")))
+        self.assertFalse(wm.is_excluded(path("start", "A.txt")))
+
+        # Excluded events never reach the debounce stage
+        handler = wm.event_handler
+        handler.handle_event(FileCreatedEvent(path("tmp", "A.txt")))
+        handler.handle_event(FileMovedEvent(
+            path("start", "A.swp"), path("tmp", "A.txt")))
+        self.assertEqual(handler.get_gauges()["settling_paths"], 0)
+
+        handler.handle_event(FileMovedEvent(
+            path("start", "A.swp"), path("start", "A.txt")))
+        handler.handle_event(FileCreatedEvent(path("start", "B.txt")))
+        self.assertEqual(handler.get_gauges()["settling_paths"], 2)
+        handler.stop()
+
+        # Excluded paths are not walked retroactively
+        for dir_name in ["start", "tmp", "queue[1]"]:
+            make_dir(path(dir_name))
+            with open(path(dir_name, "A.txt"), "w") as f:
+                f.write("A")
+        from_monitor_reader, from_monitor_writer = Pipe()
+        wm.to_runner_event = from_monitor_writer
+        wm._apply_retroactive_rules()
+        events = []
+        while from_monitor_reader.poll(0.5):
+            events.append(from_monitor_reader.recv())
+        self.assertEqual([e[EVENT_PATH] for e in events],
+            [path("start", "A.txt")])
+
+        # Excluded paths are not polled
+        poller = DirectoryPoller(FileSystemEventHandler(), TEST_MONITOR_BASE,
+            is_excluded=wm.is_excluded)
+        poller.index()
+        self.assertEqual(sorted(poller._dirs.keys()),
+            sorted([TEST_MONITOR_BASE, path("start")]))
@@ -1,10 +1,14 @@
 
+import os
+import pickle
 import unittest
 
-from meow_base.core.rule import Rule
+from meow_base.core.rule import Rule, register_rule, is_registered_rule, \
+    pin_rule, unpin_rule
+from meow_base.functionality.file_io import read_yaml, write_yaml
 from meow_base.patterns.file_event_pattern import FileEventPattern
 from meow_base.recipes.jupyter_notebook_recipe import JupyterNotebookRecipe
-from shared import BAREBONES_NOTEBOOK, setup, teardown
+from shared import BAREBONES_NOTEBOOK, TEST_DIR, setup, teardown
 
 class CorrectnessTests(unittest.TestCase):
     def setUp(self)->None:
@@ -90,3 +94,68 @@ class CorrectnessTests(unittest.TestCase):
 
         self.assertEqual(fejnr.recipe, jnr)
 
+    # Test registered Rule is pickled as a reference, and others in full
+    def testRulePickling(self)->None:
+        fep = FileEventPattern("name", "path", "recipe", "file")
+        jnr = JupyterNotebookRecipe("recipe", BAREBONES_NOTEBOOK)
+
+        fejnr = Rule(fep, jnr)
+
+        by_value = pickle.dumps({"rule": fejnr})
+        unpickled = pickle.loads(by_value)["rule"]
+        self.assertIsInstance(unpickled, Rule)
+        self.assertIsNot(unpickled, fejnr)
+        self.assertEqual(unpickled.version, fejnr.version)
+        self.assertEqual(unpickled.recipe.recipe, BAREBONES_NOTEBOOK)
+
+        register_rule(fejnr)
+        self.assertTrue(is_registered_rule(fejnr))
+
+        by_reference = pickle.dumps({"rule": fejnr})
+        self.assertLess(len(by_reference), len(by_value))
+        self.assertIs(pickle.loads(by_reference)["rule"], fejnr)
+
+        # A pinned rule can still be resolved once no longer used elsewhere
+        name, version = fejnr.name, fejnr.version
+        pin_rule(fejnr)
+        del fejnr
+        unpickled = pickle.loads(by_reference)["rule"]
+        self.assertEqual(unpickled.name, name)
+        self.assertEqual(unpickled.version, version)
+        unpin_rule(unpickled)
+        del unpickled
+
+        with self.assertRaises(KeyError):
+            pickle.loads(by_reference)
+
+    # Test registered Rule is written to yaml as a reference
+    def testRuleYaml(self)->None:
+        fep = FileEventPattern("name", "path", "recipe", "file")
+        jnr = JupyterNotebookRecipe("recipe", BAREBONES_NOTEBOOK)
+
+        fejnr = Rule(fep, jnr)
+        register_rule(fejnr)
+
+        filepath = os.path.join(TEST_DIR, "rule.yml")
+        write_yaml({"rule": fejnr}, filepath)
+
+        with open(filepath, "r") as f:
+            self.assertNotIn("cells", f.read())
+
+        self.assertIs(read_yaml(filepath)["rule"], fejnr)
+
+        # Once no longer registered, the reference itself is read
+        name, version = fejnr.name, fejnr.version
+        del fejnr
+        self.assertEqual(read_yaml(filepath)["rule"], 
+            {"name": name, "version": version})
+
+        # Unregistered rules are written in full
+        unregistered = Rule(fep, jnr)
+        write_yaml({"rule": unregistered}, filepath)
+
+        read = read_yaml(filepath)["rule"]
+        self.assertIsInstance(read, Rule)
+        self.assertIsNot(read, unregistered)
+        self.assertEqual(read.name, unregistered.name)
+        self.assertEqual(read.recipe.recipe, unregistered.recipe.recipe)
@@ -5,6 +5,7 @@ import unittest
 import subprocess
 import time
 import shutil
+import threading
 
 from multiprocessing import Pipe
 from random import shuffle
@@ -18,16 +19,20 @@ from meow_base.core.base_monitor import BaseMonitor
 from meow_base.conductors import LocalPythonConductor
 from meow_base.conductors import LocalBashConductor
 from meow_base.conductors import RemoteSlurmConductor
-from meow_base.core.vars import JOB_TYPE_PAPERMILL, JOB_ERROR, \
+from meow_base.core.vars import JOB_TYPE_PAPERMILL, JOB_ERROR, JOB_STATUS, \
+    STATUS_QUEUED, EVENT_PATH, \
     META_FILE, JOB_TYPE_PYTHON, JOB_TYPE_BASH, JOB_CREATE_TIME, DEFAULT_JOB_OUTPUT_DIR_REMOTE, \
     DEFAULT_JOB_QUEUE_DIR_REMOTE
+from meow_base.core.metrics import RunnerMetrics
 from meow_base.core.runner import MeowRunner
 from meow_base.functionality.file_io import make_dir, read_file, \
-    read_notebook, read_yaml, write_file, lines_to_string
-from meow_base.functionality.meow import create_parameter_sweep
+    read_notebook, read_yaml, write_file, lines_to_string, \
+    threadsafe_write_status, rmtree
+from meow_base.functionality.meow import create_parameter_sweep, \
+    create_rule
 from meow_base.functionality.requirements import create_python_requirements
 from meow_base.patterns.file_event_pattern import WatchdogMonitor, \
-    FileEventPattern
+    FileEventPattern, create_watchdog_event
 from meow_base.recipes.jupyter_notebook_recipe import PapermillHandler, \
     JupyterNotebookRecipe
 from meow_base.recipes.python_recipe import PythonHandler, PythonRecipe
@@ -2491,7 +2496,454 @@ class MeowTests(unittest.TestCase):
         ct = runner.get_conductor_by_type(LocalPythonConductor)
         self.assertIn(ct, conductors)
 
+    # Test that events are only given to handlers that can process them
+    def testMeowRunnerEventBucketing(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "A.txt"), "recipe_one", 
+            "infile")
+        pattern_two = FileEventPattern(
+            "pattern_two", os.path.join("start", "B.txt"), "recipe_two", 
+            "infile")
+        recipe_one = PythonRecipe("recipe_one", COMPLETE_PYTHON_SCRIPT)
+        recipe_two = BashRecipe("recipe_two", COMPLETE_BASH_SCRIPT)
+        rule_one = create_rule(pattern_one, recipe_one)
+        rule_two = create_rule(pattern_two, recipe_two)
+
+        python_handler = PythonHandler(name="python")
+        bash_handler = BashHandler(name="bash")
+        papermill_handler = PapermillHandler(name="papermill")
+
+        runner = MeowRunner(
+            WatchdogMonitor(TEST_MONITOR_BASE, {}, {}), 
+            [ python_handler, bash_handler, papermill_handler ], 
+            LocalPythonConductor()
+        )
+
+        events = []
+        for i, rule in enumerate([rule_one, rule_two, rule_one, rule_two]):
+            event = create_watchdog_event(
+                os.path.join(TEST_MONITOR_BASE, "start", f"{i}.txt"),
+                rule,
+                TEST_MONITOR_BASE,
+                time.time(),
+                "hash"
+            )
+            events.append(event)
+            runner._enqueue_event(event)
+        runner._enqueue_event("not an event")
+
+        self.assertEqual(len(runner.event_queue), 3)
+
+        self.assertIsNone(runner._dequeue_event(papermill_handler))
+        self.assertIs(runner._dequeue_event(python_handler), events[0])
+        self.assertIs(runner._dequeue_event(bash_handler), events[1])
+        self.assertIs(runner._dequeue_event(python_handler), events[2])
+        self.assertIsNone(runner._dequeue_event(python_handler))
+        self.assertIs(runner._dequeue_event(bash_handler), events[3])
+        self.assertIsNone(runner._dequeue_event(bash_handler))
+
+        self.assertEqual(len(runner.event_queue), 1)
+        self.assertEqual(list(runner.event_queue[None]), ["not an event"])
+
+    # Test that queued job definitions are cached within the runner
+    def testMeowRunnerJobCache(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "A.txt"), "recipe_one", 
+            "infile")
+        recipe_one = PythonRecipe("recipe_one", COMPLETE_PYTHON_SCRIPT)
+        rule_one = create_rule(pattern_one, recipe_one)
+
+        handler = PythonHandler(job_queue_dir=TEST_JOB_QUEUE)
+        python_conductor = LocalPythonConductor()
+        bash_conductor = LocalBashConductor()
+
+        runner = MeowRunner(
+            WatchdogMonitor(TEST_MONITOR_BASE, {}, {}), 
+            handler, 
+            [ python_conductor, bash_conductor ],
+            job_queue_dir=TEST_JOB_QUEUE,
+            job_output_dir=TEST_JOB_OUTPUT
+        )
+
+        event = create_watchdog_event(
+            os.path.join(TEST_MONITOR_BASE, "start", "A.txt"),
+            rule_one,
+            TEST_MONITOR_BASE,
+            time.time(),
+            "hash"
+        )
+        job = handler.create_job_metadata_dict(event, {})
+        job_dir = os.path.join(TEST_JOB_QUEUE, job["id"])
+        make_dir(job_dir)
+        metafile = os.path.join(job_dir, META_FILE)
+        threadsafe_write_status(job, metafile)
+
+        runner._enqueue_job(job_dir)
+
+        self.assertEqual(list(runner.job_queue), [job_dir])
+        self.assertEqual(
+            runner.job_queue.get_job(job_dir)[JOB_STATUS], STATUS_QUEUED)
+        self.assertEqual(read_yaml(metafile)[JOB_STATUS], STATUS_QUEUED)
+
+        # Dispatch should not need to read the job definitions again
+        os.remove(metafile)
+
+        self.assertIsNone(runner._dequeue_job(bash_conductor))
+        self.assertEqual(runner._dequeue_job(python_conductor), job_dir)
+        self.assertEqual(len(runner.job_queue), 0)
+
+    # Test that a push dispatch runner holds requests until work arrives
+    def testMeowRunnerPushDispatch(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "A.txt"), "recipe_one", 
+            "infile")
+        recipe_one = PythonRecipe("recipe_one", COMPLETE_PYTHON_SCRIPT)
+        rule_one = create_rule(pattern_one, recipe_one)
+
+        monitor = WatchdogMonitor(TEST_MONITOR_BASE, {}, {})
+        handler = PythonHandler(pause_time=0)
+
+        runner = MeowRunner(
+            monitor, 
+            handler, 
+            LocalPythonConductor(pause_time=0),
+            push_dispatch=True
+        )
+        self.assertTrue(runner.push_dispatch)
+
+        worker = threading.Thread(
+            target=runner.run_monitor_handler_interaction,
+            daemon=True
+        )
+        worker.start()
+
+        # Repeated prompts should not result in repeated requests
+        self.assertIsNone(handler.prompt_runner_for_event())
+        self.assertIsNone(handler.prompt_runner_for_event())
+
+        loops = 0
+        while not runner._idle_handlers and loops < 30:
+            time.sleep(0.1)
+            loops += 1
+        self.assertEqual(len(runner._idle_handlers), 1)
+
+        event = create_watchdog_event(
+            os.path.join(TEST_MONITOR_BASE, "start", "A.txt"),
+            rule_one,
+            TEST_MONITOR_BASE,
+            time.time(),
+            "hash"
+        )
+        monitor.send_event_to_runner(event)
+
+        self.assertTrue(handler.to_runner_event.poll(3))
+        received = handler.to_runner_event.recv()
+        self.assertEqual(received[EVENT_PATH], event[EVENT_PATH])
+        self.assertEqual(runner._idle_handlers, [])
+        self.assertEqual(runner.event_queue, {})
+
+        runner._stop_mon_han_pipe[1].send(1)
+        worker.join()
+
+    # Test that a runner accepts batches of events from monitors
+    def testMeowRunnerEventBatches(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one", 
+            "infile")
+        recipe_one = PythonRecipe("recipe_one", COMPLETE_PYTHON_SCRIPT)
+        rule_one = create_rule(pattern_one, recipe_one)
+
+        monitor = WatchdogMonitor(TEST_MONITOR_BASE, {}, {}, batch_size=10, 
+            batch_time=0.2)
+        runner = MeowRunner(
+            monitor, 
+            PythonHandler(pause_time=0), 
+            LocalPythonConductor(pause_time=0)
+        )
+
+        worker = threading.Thread(
+            target=runner.run_monitor_handler_interaction,
+            daemon=True
+        )
+        worker.start()
+
+        events = [
+            create_watchdog_event(
+                os.path.join(TEST_MONITOR_BASE, "start", f"{i}.txt"),
+                rule_one,
+                TEST_MONITOR_BASE,
+                time.time(),
+                "hash"
+            ) for i in range(15)
+        ]
+        for event in events:
+            monitor.send_event_to_runner(event)
+
+        loops = 0
+        while runner._event_count < 10 and loops < 10:
+            time.sleep(0.01)
+            loops += 1
+        self.assertEqual(runner._event_count, 10)
+
+        loops = 0
+        while runner._event_count < 15 and loops < 30:
+            time.sleep(0.1)
+            loops += 1
+        self.assertEqual(runner._event_count, 15)
+        queued = [e for bucket in runner.event_queue.values() for e in bucket]
+        self.assertEqual([e[EVENT_PATH] for e in queued], 
+            [e[EVENT_PATH] for e in events])
+
+        # Single events are still accepted
+        monitor.batch_size = 1
+        monitor.send_event_to_runner(events[0])
+        loops = 0
+        while runner._event_count < 16 and loops < 30:
+            time.sleep(0.1)
+            loops += 1
+        self.assertEqual(runner._event_count, 16)
+
+        runner._stop_mon_han_pipe[1].send(1)
+        worker.join()
+
+    # Test that a runner stops its monitors reacting to its own files
+    def testMeowRunnerExcludesOwnFiles(self)->None:
+        job_queue_dir = os.path.join(TEST_MONITOR_BASE, "job_queue")
+        job_output_dir = os.path.join(TEST_MONITOR_BASE, "job_output")
+        make_dir(TEST_MONITOR_BASE)
+
+        monitor = WatchdogMonitor(TEST_MONITOR_BASE, {}, {})
+        MeowRunner(
+            monitor,
+            PythonHandler(pause_time=0),
+            LocalPythonConductor(pause_time=0),
+            job_queue_dir=job_queue_dir,
+            job_output_dir=job_output_dir
+        )
+
+        self.assertEqual(monitor.excludes,
+            ["job_queue", "job_output", "*.lock"])
+        self.assertTrue(monitor.is_excluded(
+            os.path.join(job_queue_dir, "job_one", "job.yml")))
+        self.assertTrue(monitor.is_excluded(
+            os.path.join(TEST_MONITOR_BASE, "start", "A.txt.lock")))
+        self.assertFalse(monitor.is_excluded(
+            os.path.join(TEST_MONITOR_BASE, "start", "A.txt")))
+
+        # Directories outside of the monitored one are not excluded
+        monitor = WatchdogMonitor(TEST_MONITOR_BASE, {}, {})
+        MeowRunner(
+            monitor,
+            PythonHandler(pause_time=0),
+            LocalPythonConductor(pause_time=0),
+            job_queue_dir=TEST_JOB_QUEUE,
+            job_output_dir=TEST_JOB_OUTPUT
+        )
+        self.assertEqual(monitor.excludes, ["*.lock"])
+
+    # Test that a runner with bounded queues throttles its monitors and 
+    # handlers
+    def testMeowRunnerBackpressure(self)->None:
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "*.txt"), "recipe_one", 
+            "infile")
+        recipe_one = PythonRecipe("recipe_one", COMPLETE_PYTHON_SCRIPT)
+
+        make_dir(os.path.join(TEST_MONITOR_BASE, "start"))
+        for name in ["A.txt", "B.txt", "C.txt"]:
+            write_file(name, os.path.join(TEST_MONITOR_BASE, "start", name))
+
+        monitor = WatchdogMonitor(
+            TEST_MONITOR_BASE, 
+            {pattern_one.name: pattern_one}, 
+            {recipe_one.name: recipe_one}
+        )
+        rule_one = list(monitor._rules.values())[0]
+        handler = PythonHandler(job_queue_dir=TEST_JOB_QUEUE, pause_time=0)
+
+        with self.assertRaises(ValueError):
+            MeowRunner(monitor, handler, LocalPythonConductor(), 
+                event_high_water=2, event_low_water=2)
+
+        with self.assertRaises(ValueError):
+            MeowRunner(monitor, handler, LocalPythonConductor(), 
+                job_high_water=-1)
+
+        runner = MeowRunner(
+            monitor, 
+            handler, 
+            LocalPythonConductor(),
+            job_queue_dir=TEST_JOB_QUEUE,
+            job_output_dir=TEST_JOB_OUTPUT,
+            event_high_water=2,
+            job_high_water=1
+        )
+        self.assertEqual(runner.event_low_water, 1)
+        self.assertEqual(runner.job_low_water, 0)
+
+        events = [
+            create_watchdog_event(
+                os.path.join(TEST_MONITOR_BASE, "start", name),
+                rule_one,
+                TEST_MONITOR_BASE,
+                time.time(),
+                "hash"
+            ) for name in ["A.txt", "B.txt"]
+        ]
+        for event in events:
+            runner._enqueue_event(event)
+        self.assertTrue(runner._events_throttled)
+        self.assertTrue(monitor._throttled.is_set())
+
+        # Whilst throttled, the monitor holds repeated events compactly
+        monitor._apply_retroactive_rules()
+        monitor._apply_retroactive_rules()
+        self.assertEqual(len(monitor._held_events), 3)
+        monitor_reader = runner.event_connections[0][0]
+        self.assertFalse(monitor_reader.poll(0.1))
+
+        self.assertIsNotNone(runner._dequeue_event(handler))
+        self.assertFalse(runner._events_throttled)
+        self.assertIsNotNone(runner._dequeue_event(handler))
+
+        # Once unthrottled, held events are sent to the runner
+        received = []
+        while len(received) < 3 and monitor_reader.poll(3):
+            received.append(monitor_reader.recv())
+        self.assertEqual(len(received), 3)
+        self.assertEqual(
+            sorted(os.path.basename(e[EVENT_PATH]) for e in received),
+            ["A.txt", "B.txt", "C.txt"]
+        )
+        self.assertEqual(len(monitor._held_events), 0)
+
+        # Once the job queue is full, handlers are not given events
+        job = handler.create_job_metadata_dict(events[0], {})
+        job_dir = os.path.join(TEST_JOB_QUEUE, job["id"])
+        make_dir(job_dir)
+        threadsafe_write_status(job, os.path.join(job_dir, META_FILE))
+
+        runner._enqueue_job(job_dir)
+        self.assertTrue(runner._jobs_throttled)
+
+        runner._enqueue_event(received[0])
+        worker = threading.Thread(
+            target=runner.run_monitor_handler_interaction,
+            daemon=True
+        )
+        worker.start()
+
+        handler.to_runner_event.send(1)
+        self.assertTrue(handler.to_runner_event.poll(3))
+        self.assertEqual(handler.to_runner_event.recv(), 1)
+
+        self.assertEqual(runner._dequeue_job(runner.conductors[0]), job_dir)
+        self.assertFalse(runner._jobs_throttled)
+
+        handler.to_runner_event.send(1)
+        self.assertTrue(handler.to_runner_event.poll(3))
+        self.assertEqual(
+            handler.to_runner_event.recv()[EVENT_PATH], received[0][EVENT_PATH])
+
+        runner._stop_mon_han_pipe[1].send(1)
+        worker.join()
+
+    # Test that a multiprocess runner runs each component in its own process
+    def testMeowRunnerMultiprocess(self)->None:
+        # Other tests in this class leave files behind in the shared test 
+        # directories, so this one uses its own
+        base = os.path.join(TEST_DIR, "multiprocess")
+        monitor_base = os.path.join(base, "monitor_base")
+        job_queue = os.path.join(base, "job_queue")
+        job_output = os.path.join(base, "job_output")
+        for path in [monitor_base, job_queue, job_output]:
+            make_dir(path, ensure_clean=True)
+
+        pattern_one = FileEventPattern(
+            "pattern_one", os.path.join("start", "A.txt"), "recipe_one", 
+            "infile", 
+            parameters={
+                "num":1000,
+                "outfile":os.path.join("{BASE}", "output", "{FILENAME}")
+            })
+        recipe = PythonRecipe("recipe_one", COMPLETE_PYTHON_SCRIPT)
+
+        runner = MeowRunner(
+            WatchdogMonitor(
+                monitor_base,
+                {pattern_one.name: pattern_one},
+                {recipe.name: recipe},
+                settletime=1
+            ), 
+            PythonHandler(job_queue_dir=job_queue, pause_time=1),
+            LocalPythonConductor(pause_time=1),
+            job_queue_dir=job_queue,
+            job_output_dir=job_output,
+            multiprocess=True,
+            metrics=RunnerMetrics()
+        )
+        self.assertTrue(runner.multiprocess)
+        gauge = f"{runner.monitors[0].name}.settling_paths"
+
+        runner.start()
+
+        processes = [p for p, _ in runner._processes.values()]
+        self.assertEqual(len(processes), 3)
+        pids = {p.pid for p in processes}
+        self.assertEqual(len(pids), 3)
+        self.assertNotIn(os.getpid(), pids)
+        for process in processes:
+            self.assertTrue(process.is_alive())
+
+        # Monitor processes would not see changes to their definitions
+        pattern_two = FileEventPattern(
+            "pattern_two", os.path.join("start", "B.txt"), "recipe_one", 
+            "infile")
+        monitor = runner.monitors[0]
+        with self.assertRaises(RuntimeWarning):
+            monitor.add_pattern(pattern_two)
+        with self.assertRaises(RuntimeWarning):
+            monitor.update_recipe(recipe)
+        with self.assertRaises(RuntimeWarning):
+            monitor.remove_pattern(pattern_one.name)
+        self.assertEqual(list(monitor.get_patterns()), [pattern_one.name])
+        self.assertEqual(list(monitor.get_recipes()), [recipe.name])
+
+        start_dir = os.path.join(monitor_base, "start")
+        make_dir(start_dir)
+        with open(os.path.join(start_dir, "A.txt"), "w") as f:
+            f.write("25000")
+
+        # Monitor gauges are reported by the monitor process, as the copy of
+        # the monitor within this process never sees any events
+        loops = 0
+        while runner.metrics.get_gauges()[gauge] == 0 and loops < 10:
+            time.sleep(0.05)
+            loops += 1
+        self.assertGreater(runner.metrics.get_gauges()[gauge], 0)
+        self.assertEqual(monitor.get_gauges()["settling_paths"], 0)
+
+        output = os.path.join(monitor_base, "output", "A.txt")
+        loops = 0
+        while not os.path.exists(output) and loops < 60:
+            time.sleep(0.5)
+            loops += 1
+
+        runner.stop()
+        self.assertEqual(runner.metrics.get_gauges()[gauge], 0)
+
+        self.assertTrue(os.path.exists(output))
+        self.assertEqual(read_file(output), "131125.0")
+        self.assertEqual(runner._processes, {})
+        for process in processes:
+            self.assertFalse(process.is_alive())
+
+        # Once stopped, definitions can be changed again
+        monitor.add_pattern(pattern_two)
+        self.assertIn(pattern_two.name, monitor.get_patterns())
+
+        rmtree(base)
+
     # TODO test getting job cannot handle
-    # TODO test getting event cannot handle
     # TODO tests runner job queue dir
     # TODO tests runner job output dir
@@ -0,0 +1,258 @@
+
+import unittest
+
+from typing import Any, Dict
+
+from meow_base.core.vars import JOB_PATTERN, JOB_PRIORITY, JOB_RULE
+from meow_base.schedulers import FifoScheduler, PriorityScheduler, \
+    ShortestRuntimeScheduler, FairShareScheduler
+from shared import setup, teardown
+
+
+def make_job(pattern:str="pattern", rule:str="rule", priority:int=0
+        )->Dict[str,Any]:
+    return {
+        JOB_PATTERN: pattern,
+        JOB_RULE: rule,
+        JOB_PRIORITY: priority
+    }
+
+
+class FifoSchedulerTests(unittest.TestCase):
+    def setUp(self)->None:
+        super().setUp()
+        setup()
+
+    def tearDown(self)->None:
+        super().tearDown()
+        teardown()
+
+    # Test FifoScheduler created
+    def testFifoSchedulerCreation(self)->None:
+        FifoScheduler()
+
+    # Test FifoScheduler offers jobs in the order they were added
+    def testFifoSchedulerOrder(self)->None:
+        scheduler = FifoScheduler()
+
+        scheduler.add_job("a", make_job(rule="one", priority=0))
+        scheduler.add_job("b", make_job(rule="two", priority=5))
+        scheduler.add_job("c", make_job(rule="one", priority=1))
+
+        self.assertEqual(len(scheduler), 3)
+        self.assertIn("b", scheduler)
+        self.assertEqual(list(scheduler), ["a", "b", "c"])
+
+        self.assertEqual(scheduler.remove_job("b"), 
+            make_job(rule="two", priority=5))
+        self.assertEqual(list(scheduler), ["a", "c"])
+        self.assertNotIn("b", scheduler)
+
+        with self.assertRaises(KeyError):
+            scheduler.remove_job("b")
+
+        with self.assertRaises(KeyError):
+            scheduler.add_job("a", make_job())
+
+
+class PrioritySchedulerTests(unittest.TestCase):
+    def setUp(self)->None:
+        super().setUp()
+        setup()
+
+    def tearDown(self)->None:
+        super().tearDown()
+        teardown()
+
+    # Test PriorityScheduler created
+    def testPrioritySchedulerCreation(self)->None:
+        PriorityScheduler()
+
+    # Test PriorityScheduler offers highest priority jobs first
+    def testPrioritySchedulerOrder(self)->None:
+        scheduler = PriorityScheduler()
+
+        scheduler.add_job("a", make_job(priority=0))
+        scheduler.add_job("b", make_job(priority=5))
+        scheduler.add_job("c", make_job(priority=-1))
+        scheduler.add_job("d", make_job(priority=5))
+        scheduler.add_job("e", {})
+
+        self.assertEqual(list(scheduler), ["b", "d", "a", "e", "c"])
+
+        scheduler.remove_job("b")
+        scheduler.remove_job("d")
+
+        self.assertEqual(list(scheduler), ["a", "e", "c"])
+
+
+class ShortestRuntimeSchedulerTests(unittest.TestCase):
+    def setUp(self)->None:
+        super().setUp()
+        setup()
+
+    def tearDown(self)->None:
+        super().tearDown()
+        teardown()
+
+    # Test ShortestRuntimeScheduler created
+    def testShortestRuntimeSchedulerCreation(self)->None:
+        ShortestRuntimeScheduler()
+
+        ShortestRuntimeScheduler(default_runtime=10, smoothing=1)
+
+        with self.assertRaises(TypeError):
+            ShortestRuntimeScheduler(default_runtime="10")
+
+        with self.assertRaises(ValueError):
+            ShortestRuntimeScheduler(smoothing=0)
+
+        with self.assertRaises(ValueError):
+            ShortestRuntimeScheduler(smoothing=1.5)
+
+    # Test ShortestRuntimeScheduler offers jobs from faster rules first
+    def testShortestRuntimeSchedulerOrder(self)->None:
+        scheduler = ShortestRuntimeScheduler(default_runtime=5)
+
+        scheduler.add_job("a", make_job(rule="slow"))
+        scheduler.add_job("b", make_job(rule="fast"))
+        scheduler.add_job("c", make_job(rule="unknown"))
+        scheduler.add_job("d", make_job(rule="slow"))
+
+        scheduler.record_runtime(make_job(rule="slow"), 10)
+        scheduler.record_runtime(make_job(rule="fast"), 1)
+
+        self.assertEqual(list(scheduler), ["b", "c", "a", "d"])
+
+        # Moving average means one fast run does not make a rule fast
+        scheduler.record_runtime(make_job(rule="slow"), 0)
+        self.assertEqual(scheduler.expected_runtimes["slow"], 5)
+        self.assertEqual(list(scheduler), ["b", "a", "d", "c"])
+
+
+class FairShareSchedulerTests(unittest.TestCase):
+    def setUp(self)->None:
+        super().setUp()
+        setup()
+
+    def tearDown(self)->None:
+        super().tearDown()
+        teardown()
+
+    # Test FairShareScheduler created
+    def testFairShareSchedulerCreation(self)->None:
+        FairShareScheduler()
+
+        FairShareScheduler(weights={"pattern": 2.0})
+
+        FairShareScheduler(weights={"pattern": 2})
+
+        with self.assertRaises(TypeError):
+            FairShareScheduler(weights={"pattern": "2"})
+
+        with self.assertRaises(ValueError):
+            FairShareScheduler(weights={"pattern": 0.0})
+
+        with self.assertRaises(ValueError):
+            FairShareScheduler(weights={"pattern": -1})
+
+        FairShareScheduler(half_life=10)
+
+        with self.assertRaises(TypeError):
+            FairShareScheduler(half_life="10")
+
+        with self.assertRaises(ValueError):
+            FairShareScheduler(half_life=0)
+
+    # Test FairShareScheduler alternates between rules
+    def testFairShareSchedulerOrder(self)->None:
+        scheduler = FairShareScheduler()
+
+        for i in range(3):
+            scheduler.add_job(f"one_{i}", make_job(rule="one"))
+        for i in range(3):
+            scheduler.add_job(f"two_{i}", make_job(rule="two"))
+
+        dispatched = []
+        while len(scheduler):
+            job_dir = next(iter(scheduler))
+            job = scheduler.remove_job(job_dir)
+            scheduler.job_dispatched(job_dir, job)
+            dispatched.append(job_dir)
+
+        self.assertEqual(dispatched, 
+            ["one_0", "two_0", "one_1", "two_1", "one_2", "two_2"])
+
+    # Test FairShareScheduler weights shares by pattern
+    def testFairShareSchedulerWeights(self)->None:
+        scheduler = FairShareScheduler(weights={"heavy": 2.0})
+
+        for i in range(4):
+            scheduler.add_job(f"heavy_{i}", make_job(pattern="heavy", 
+                rule="heavy_rule"))
+        for i in range(2):
+            scheduler.add_job(f"light_{i}", make_job(pattern="light", 
+                rule="light_rule"))
+
+        dispatched = []
+        while len(scheduler):
+            job_dir = next(iter(scheduler))
+            job = scheduler.remove_job(job_dir)
+            scheduler.job_dispatched(job_dir, job)
+            dispatched.append(job_dir)
+
+        self.assertEqual(dispatched, ["heavy_0", "light_0", "heavy_1", 
+            "heavy_2", "light_1", "heavy_3"])
+
+    # Test a rule that was idle cannot starve other rules on return
+    def testFairShareSchedulerIdleRule(self)->None:
+        scheduler = FairShareScheduler()
+
+        for i in range(5):
+            scheduler.add_job(f"one_{i}", make_job(rule="one"))
+
+        for _ in range(3):
+            job_dir = next(iter(scheduler))
+            scheduler.job_dispatched(job_dir, scheduler.remove_job(job_dir))
+
+        scheduler.add_job("two_0", make_job(rule="two"))
+        scheduler.add_job("two_1", make_job(rule="two"))
+
+        dispatched = []
+        while len(scheduler):
+            job_dir = next(iter(scheduler))
+            scheduler.job_dispatched(job_dir, scheduler.remove_job(job_dir))
+            dispatched.append(job_dir)
+
+        self.assertEqual(dispatched, ["one_3", "two_0", "one_4", "two_1"])
+
+    # Test usage decays, and rules are forgotten once it has decayed away
+    def testFairShareSchedulerDecay(self)->None:
+        scheduler = FairShareScheduler(half_life=10)
+
+        for i in range(4):
+            scheduler.add_job(f"one_{i}", make_job(rule="one"))
+        for _ in range(4):
+            job_dir = next(iter(scheduler))
+            scheduler.job_dispatched(job_dir, scheduler.remove_job(job_dir))
+        key = ("pattern", "one")
+        self.assertAlmostEqual(scheduler._usage[key], 4, places=3)
+
+        # One half life later, past jobs count for half as much
+        scheduler._decayed_at -= 10
+        scheduler.add_job("two_0", make_job(rule="two"))
+        self.assertAlmostEqual(scheduler._usage[key], 2, places=3)
+
+        # Rules without queued jobs are forgotten once their usage has
+        # decayed away, but not those still queueing
+        scheduler.add_job("one_4", make_job(rule="one"))
+        scheduler._decayed_at -= 1000
+        scheduler.job_dispatched("two_0", scheduler.remove_job("two_0"))
+        self.assertEqual(sorted(scheduler._usage.keys()), 
+            [key, ("pattern", "two")])
+        self.assertAlmostEqual(scheduler._usage[("pattern", "two")], 1, 
+            places=3)
+        scheduler.remove_job("one_4")
+        scheduler._decayed_at -= 1000
+        scheduler._decay()
+        self.assertEqual(scheduler._usage, {})